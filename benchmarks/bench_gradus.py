@@ -0,0 +1,324 @@
+# file: benchmarks/bench_gradus.py
+# -*- coding: utf-8 -*-
+"""
+Headless benchmarks for Gradus hot paths (timeit based, no display needed).
+
+  python benchmarks/bench_gradus.py                       # table
+  python benchmarks/bench_gradus.py --json bench.json     # + machine-readable results
+  python benchmarks/bench_gradus.py --compare bench.json  # ratio vs an earlier run
+  python benchmarks/bench_gradus.py -k bot --quick        # subset, small sizes
+
+Cases carry an `impl` tag ("v3" / "v4") where both versions have the code path,
+so a run shows version3 vs version4 side by side. --max-regression makes the
+exit status non-zero when a case got slower than the compared run by that fraction.
+"""
+
+import argparse, json, os, platform, random, statistics, subprocess, sys, tempfile, time, timeit, types
+from html.parser import HTMLParser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("GRADUS_KDF_ITERATIONS", "1000")   # account setup is not what we measure
+
+import version3_Peter_Zhang as v3
+import version4_Peter_Zhang as v4
+
+FIXTURES = os.path.join(HERE, "fixtures")
+CASES = []   # (name, impl, setup(params) -> (fn, ops, extra))
+
+def case(name, impl="v4"):
+    def deco(setup): CASES.append((name, impl, setup)); return setup
+    return deco
+
+# ---------------- data ----------------
+SUBJECTS = ["English","Mathematics","Physics","Chemistry","Biology","Calculus","Statistics","History","Geography","Economics"]
+MESSAGES = ["What is NCEA?", "My name is Aroha", "I like Science", "My score is 300 for Engineering",
+            "suggest a job", "What is a rank score?", "my score for commerce", "hello there", "/help"]
+
+def fake_grades(n, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        l = rng.randint(1,3)
+        out.append({"title": f"{rng.choice(SUBJECTS)} {l}.{rng.randint(1,9)}", "level": l,
+                    "credits": rng.randint(2,6), "grade": rng.choice("AMEN")})
+    return out
+
+def fake_chat(lines, seed=2):
+    rng = random.Random(seed)
+    return "".join(f"[12:{i%60:02d}] {'You' if i%2==0 else 'FROST'}: {rng.choice(MESSAGES)}\n" for i in range(lines))
+
+def _tmp(params, name): return os.path.join(params["tmp"], name)
+
+# ---------------- storage ----------------
+@case("store.save_state", "v4")
+def _(p):
+    path = _tmp(p, "users_v4.json")
+    for f in (path, path+".lock"):
+        if os.path.exists(f): os.remove(f)
+    store = v4.UserStore(path)
+    with store._transaction() as users:   # bulk-seed without N rewrites
+        for i in range(p["users"]):
+            users[f"user{i:05d}"] = {"salt":"00", "pw":"x", "v":1,
+                                     "state":{"dark":False, "chat_history":fake_chat(p["chat"]//10, i), "grades":fake_grades(20, i)}}
+    st = store.get_state("demo"); st["chat_history"] = fake_chat(p["chat"]); st["grades"] = fake_grades(200)
+    def fn(): store.save_state("demo", st)
+    fn()
+    return fn, 1, {"file_bytes": os.path.getsize(path)}
+
+def _big_store(p):
+    return {"users": {f"user{i:05d}": {"salt":"00"*16, "pw":"pbkdf2_sha256$200000$"+"ab"*32, "v":3,
+                                       "state":{"dark":False, "chat_history":fake_chat(p["chat"]//10, i),
+                                                "grades":fake_grades(40, i), "bot":{"name":None, "field":None}}}
+                      for i in range(p["users"])}}
+
+for _fmt in ("json", "binary"):
+    @case("store.write", _fmt)
+    def _(p, fmt=_fmt):
+        data = _big_store(p); path = _tmp(p, f"big.{fmt}")
+        def fn(): v4.write_store(path, data, fmt)
+        fn()
+        return fn, 1, {"file_bytes": os.path.getsize(path)}
+
+    @case("store.read", _fmt)
+    def _(p, fmt=_fmt):
+        path = _tmp(p, f"big_read.{fmt}"); v4.write_store(path, _big_store(p), fmt)
+        def fn(): v4.read_store(path)
+        return fn, 1, {"file_bytes": os.path.getsize(path)}
+
+@case("store.save_state", "v3")
+def _(p):
+    old = os.getcwd(); os.chdir(p["tmp"])
+    app = types.SimpleNamespace(dark=False, username="demo", chat_history=fake_chat(p["chat"]),
+                                grades=fake_grades(200), set_status=lambda m: None)
+    def fn():
+        cwd = os.getcwd(); os.chdir(p["tmp"])
+        try: v3.App._save_state(app)   # single-user state file, as version3 stores it
+        finally: os.chdir(cwd)
+    fn(); size = os.path.getsize(v3.STATE_FILE); os.chdir(old)
+    return fn, 1, {"file_bytes": size}
+
+# ---------------- bot ----------------
+def _bot_case(mod):
+    def setup(p):
+        bot = mod.ChatBot(); msgs = MESSAGES * (p["replies"]//len(MESSAGES))
+        def fn():
+            for m in msgs: bot.reply(m)
+        return fn, len(msgs), {}
+    return setup
+case("bot.reply", "v3")(_bot_case(v3))
+case("bot.reply", "v4")(_bot_case(v4))
+
+@case("bot.reply+rank", "v4")
+def _(p):
+    bot = v4.ChatBot(v4.RankScore(fake_grades(300))); msgs = ["what is my rank score", "my score for engineering"] * (p["replies"]//2)
+    def fn():
+        for m in msgs: bot.reply(m)
+    return fn, len(msgs), {}
+
+# ---------------- grades ----------------
+@case("grades.add")
+def _(p):
+    rows = fake_grades(p["grades"])
+    def fn():
+        grades = []; rank = v4.RankScore()
+        for r in rows:
+            g = v4.make_grade(r["title"], r["level"], r["credits"], r["grade"]); grades.append(g); rank.add(g)
+    return fn, len(rows), {}
+
+@case("grades.filter")
+def _(p):
+    grades = fake_grades(p["grades"])
+    def fn(): return [g for g in grades if "phys" in g["title"].lower()]   # Grades.apply_filter
+    return fn, len(grades), {}
+
+@case("grades.totals")
+def _(p):
+    grades = fake_grades(p["grades"])
+    def fn(): v4.grade_totals(grades); v4.endorsements(grades); v4.RankScore(grades).score
+    return fn, len(grades), {}
+
+@case("bot.fuzzy")
+def _(p):   # a university-sized catalogue: the name lookup a reply does when no name is spelled exactly
+    rng = random.Random(6); kinds = ["Bachelor of", "Master of", "Graduate Diploma in", "Postgraduate Certificate in"]
+    areas = SUBJECTS + ["Software Engineering", "Marine Biology", "Health Sciences", "Data Science", "Architecture", "Law", "Nursing"]
+    courses = {f"{k} {a}": rng.randint(150, 320) for k in kinds for a in areas}
+    careers = {f"Field {i}": [f"{a} {r}" for a in rng.sample(areas, 5) for r in rng.sample(["Analyst","Engineer","Officer","Advisor"], 1)]
+               for i in range(100)}
+    cat = v4.Catalogue({"courses": courses, "careers": careers, "faq": {}}, "bench")
+    msgs = ["my score is 250 for bachelor of sofware engineering", "I like marine biolgy", "I want to be a data sciense analyts",
+            "what is ncea", "tell me more about the masters of enginering please"] * (p["replies"]//50)
+    matcher = cat.matcher()   # built lazily; keep that out of the timing
+    def fn():
+        for m in msgs: matcher.find(m)
+    return fn, len(msgs), {"names": len(matcher.names)}
+
+# ---------------- cohort analytics ----------------
+def _cohort_users(p):
+    return {f"user{i:05d}": {"state": {"grades": fake_grades(30, i)}} for i in range(p["users"])}
+
+@case("cohort.summary", "rollup")
+def _(p):
+    r = v4.build_cohort(_cohort_users(p)); courses = {"Science": 280, "Commerce": 210, "Engineering": 260}
+    def fn(): v4.CohortStats(r).summary(courses)
+    return fn, 1, {"users": p["users"]}
+
+@case("cohort.summary", "scan")
+def _(p):
+    users = _cohort_users(p); courses = {"Science": 280, "Commerce": 210, "Engineering": 260}
+    def fn(): v4.CohortStats(v4.build_cohort(users)).summary(courses)   # what every query would cost without rollups
+    return fn, 1, {"users": p["users"]}
+
+@case("cohort.update")
+def _(p):
+    n = v4.build_cohort(_cohort_users(p))["n"]; old, new = fake_grades(30, 0), fake_grades(31, 0)
+    def fn():   # two save_state adjustments: add a grade, then take it back
+        for a, b in ((old, new), (new, old)):
+            v4._cohort_apply(n, v4.cohort_counts(a), -1); v4._cohort_apply(n, v4.cohort_counts(b), +1)
+    return fn, 2, {}
+
+# ---------------- careers ----------------
+@case("careers.recommend", "numpy" if v4.np is not None else "stdlib")
+def _(p):
+    rng = random.Random(3); subjects = [s.lower() for s in SUBJECTS] + [f"subject {i}" for i in range(30)]
+    m = v4.CareerMatrix.from_rows((f"career {i}", rng.choice(["Science","Commerce","Engineering"]),
+                                   {s: rng.randint(1,5) for s in rng.sample(subjects, 4)}) for i in range(p["careers"]))
+    students = [v4.subject_strengths(fake_grades(40, seed)) for seed in range(20)]
+    def fn():
+        for st in students: m.recommend(st, 10)
+    return fn, len(students), {"careers": p["careers"]}
+
+@case("standards.suggest")
+def _(p):
+    rng = random.Random(4); words = "demonstrate understanding apply analyse investigate evaluate solving problems methods systems aspects".split()
+    ix = v4.StandardsIndex([(f"AS{90000+i}", rng.choice(SUBJECTS), f"{rng.randint(1,3)}.{rng.randint(1,15)}",
+                             " ".join(rng.choice(words) for _ in range(8)), rng.randint(1,3), rng.randint(2,6)) for i in range(p["grades"]*2)])
+    queries = ["ph", "phys", "physics 3", "demo und", "9012", "apply meth sys", "a b"]
+    def fn():
+        for q in queries: ix.suggest(q)
+    return fn, len(queries), {"entries": p["grades"]*2}
+
+# ---------------- CSV ----------------
+@case("csv.export")
+def _(p):
+    grades = fake_grades(p["grades"]); path = _tmp(p, "grades_out.csv")
+    def fn(): v4.write_grades_csv(path, grades)
+    return fn, len(grades), {}
+
+@case("csv.import")
+def _(p):
+    path = _tmp(p, "grades_in.csv"); v4.write_grades_csv(path, fake_grades(p["grades"]))
+    def fn(): v4.read_grades_csv(path)
+    return fn, p["grades"], {}
+
+@case("grades.ingest")
+def _(p):
+    folder = _tmp(p, "term"); os.makedirs(folder, exist_ok=True)
+    per = max(1, p["grades"]//40)
+    for i in range(40): v4.write_grades_csv(os.path.join(folder, f"student{i:02d}.csv"), fake_grades(per, i))
+    existing = fake_grades(per, 0)   # one file's rows are already recorded
+    def fn(): v4.ingest_grades([folder], existing, workers=4)
+    return fn, 40*per, {}
+
+# ---------------- scraper parsing (WEB.PY / scrape_links) ----------------
+def _fixtures():
+    out = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), encoding="utf-8") as f: out.append(f.read())
+    return out
+
+@case("scrape.parse", "bs4")
+def _(p):
+    try: from bs4 import BeautifulSoup
+    except ImportError: return None   # optional dependency; case is skipped
+    pages = _fixtures()
+    def fn():
+        for html in pages:
+            soup = BeautifulSoup(html, "html.parser")
+            [(a.get_text(strip=True), a["href"]) for a in soup.find_all("a", href=True)]
+            [(a.get_text(strip=True), a["href"]) for a in soup.find_all("a", href=True, class_="listing-item__link")]
+    return fn, len(pages), {}
+
+class _Links(HTMLParser):# stdlib equivalent of the two find_all calls in scrape_links
+    def __init__(self): super().__init__(); self.links = []; self._a = None
+    def handle_starttag(self, tag, attrs):
+        if tag=="a":
+            d = dict(attrs)
+            if d.get("href"): self._a = [d["href"], "listing-item__link" in (d.get("class") or "").split(), []]
+    def handle_data(self, data):
+        if self._a is not None: self._a[2].append(data)
+    def handle_endtag(self, tag):
+        if tag=="a" and self._a is not None:
+            href, listing, text = self._a; self.links.append(("".join(text).strip(), href, listing)); self._a = None
+
+@case("scrape.parse", "stdlib")
+def _(p):
+    pages = _fixtures()
+    def fn():
+        for html in pages: pr = _Links(); pr.feed(html); pr.close()
+    return fn, len(pages), {}
+
+# ---------------- runner ----------------
+def _git_rev():
+    try: return subprocess.run(["git","rev-parse","--short","HEAD"], cwd=HERE, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError): return None
+
+def run(params:dict, select:str="", repeat:int=5)->dict:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        params = dict(params, tmp=tmp)
+        for name, impl, setup in CASES:
+            if select and select not in f"{name}[{impl}]": continue
+            built = setup(params)
+            if built is None: results.append({"case":name, "impl":impl, "skipped":True}); continue
+            fn, ops, extra = built
+            times = timeit.Timer(fn).repeat(repeat=repeat, number=1)
+            best, med = min(times), statistics.median(times)
+            results.append({"case":name, "impl":impl, "ops":ops, "best_s":best, "median_s":med,
+                            "ops_per_s": ops/best if best else None, **extra})
+    params.pop("tmp", None)
+    return {"python": platform.python_version(), "platform": platform.platform(), "git": _git_rev(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "params": params, "repeat": repeat, "results": results}
+
+def compare(now:dict, before:dict, max_regression:float|None)->bool:
+    old = {(r["case"], r["impl"]): r for r in before.get("results",[]) if not r.get("skipped")}
+    ok = True
+    print(f"\n{'case':<26}{'before ms':>12}{'now ms':>12}{'ratio':>9}")
+    for r in now["results"]:
+        o = old.get((r["case"], r["impl"]))
+        if r.get("skipped") or not o: continue
+        ratio = r["best_s"]/o["best_s"] if o["best_s"] else float("inf")
+        flag = ""
+        if max_regression is not None and ratio > 1+max_regression: flag = "  REGRESSION"; ok = False
+        print(f"{r['case']+'['+r['impl']+']':<26}{o['best_s']*1000:12.3f}{r['best_s']*1000:12.3f}{ratio:9.2f}{flag}")
+    return ok
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gradus benchmark suite.")
+    ap.add_argument("-k", default="", help="only cases whose 'name[impl]' contains this")
+    ap.add_argument("--quick", action="store_true", help="small sizes, 3 repeats")
+    ap.add_argument("--users", type=int, default=500); ap.add_argument("--chat", type=int, default=5000)
+    ap.add_argument("--grades", type=int, default=20000); ap.add_argument("--replies", type=int, default=9000)
+    ap.add_argument("--careers", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="earlier --json output to compare against")
+    ap.add_argument("--max-regression", type=float, help="e.g. 0.25: fail if a case is >25%% slower")
+    a = ap.parse_args(argv)
+    params = {"users":a.users, "chat":a.chat, "grades":a.grades, "replies":a.replies, "careers":a.careers}
+    if a.quick: params = {k: max(1, v//10) for k,v in params.items()}
+    res = run(params, a.k, 3 if a.quick else a.repeat)
+    print(f"{'case':<26}{'ops':>8}{'best ms':>12}{'median ms':>12}{'ops/s':>14}")
+    for r in res["results"]:
+        label = f"{r['case']}[{r['impl']}]"
+        if r.get("skipped"): print(f"{label:<26}{'skipped (missing dependency)':>46}"); continue
+        print(f"{label:<26}{r['ops']:>8}{r['best_s']*1000:12.3f}{r['median_s']*1000:12.3f}{r['ops_per_s']:14.0f}")
+    if a.json:
+        with open(a.json,"w",encoding="utf-8") as f: json.dump(res, f, indent=2)
+    if a.compare:
+        with open(a.compare,encoding="utf-8") as f: before = json.load(f)
+        if not compare(res, before, a.max_regression): sys.exit(1)
+
+if __name__=="__main__":
+    main()
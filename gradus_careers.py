@@ -0,0 +1,47 @@
+# file: gradus_careers.py
+# -*- coding: utf-8 -*-
+"""
+Gradus career matrix — build the compact career × subject matrix offline, and query it.
+
+  python gradus_careers.py build                          # career_subjects.csv -> career_subjects.gmx
+  python gradus_careers.py build --csv big.csv -o big.gmx
+  python gradus_careers.py recommend --user demo -k 5 [--field Science]
+
+The Tk app and the server load the .gmx when it is newer than the CSV, and fall back
+to parsing the CSV otherwise.
+"""
+
+import argparse, os, sys, time
+
+from version4_Peter_Zhang import CAREER_CSV, UserStore, USERS_FILE, CareerMatrix, career_matrix, subject_strengths
+
+def build(csv_path:str, out:str)->CareerMatrix:
+    t = time.perf_counter(); m = CareerMatrix.read_csv(csv_path); m.save(out)
+    print(f"{len(m.careers)} careers × {len(m.subjects)} subjects -> {out} "
+          f"({os.path.getsize(out)/1024:.1f} KiB, {time.perf_counter()-t:.2f}s)", file=sys.stderr)
+    return m
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Build / query the career recommendation matrix.")
+    sub=ap.add_subparsers(dest="cmd", required=True)
+    b=sub.add_parser("build", help="compile the CSV into a .gmx matrix")
+    b.add_argument("--csv", default=CAREER_CSV, help="career,field,subjects CSV (default: %(default)s)")
+    b.add_argument("-o","--output", help="default: the CSV path with .gmx")
+    r=sub.add_parser("recommend", help="top careers for a user's recorded grades")
+    r.add_argument("--user", required=True)
+    r.add_argument("--users", default=USERS_FILE, help="user store (default: %(default)s)")
+    r.add_argument("--csv", default=CAREER_CSV)
+    r.add_argument("-k", type=int, default=10)
+    r.add_argument("--field")
+    a=ap.parse_args(argv)
+    if a.cmd=="build":
+        build(a.csv, a.output or os.path.splitext(a.csv)[0]+".gmx"); return
+    m = career_matrix(a.csv)
+    if m is None: sys.exit(f"no career data at {a.csv}")
+    grades = UserStore(a.users).get_state(a.user)["grades"]
+    for rec in m.recommend(subject_strengths(grades), a.k, a.field):
+        why = ", ".join(f"{s} {share:.0%}" for s,share in rec["because"])
+        print(f"{rec['score']:6.1%}  {rec['career']} ({rec['field']})  — {why}")
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,57 @@
+# file: gradus_cohort.py
+# -*- coding: utf-8 -*-
+"""
+Gradus cohort analytics — credits per level, grade mix and course eligibility across
+every account, read from the rollups UserStore keeps up to date on each save.
+
+  python gradus_cohort.py                  # tables
+  python gradus_cohort.py --json           # the same as JSON
+  python gradus_cohort.py --verify         # compare the rollups with a full scan
+  python gradus_cohort.py --rebuild        # throw the rollups away and rescan
+
+gradus_report.py has the per-student rows; this tool only reads aggregates.
+"""
+
+import argparse, json, sys, time
+
+from version4_Peter_Zhang import (USERS_FILE, CATALOGUE, COHORT_BUCKET, COHORT_BUCKETS, UserStore,
+                                  CohortStats, build_cohort)
+
+def print_tables(c:CohortStats, courses:dict):
+    print(f"{c.users} accounts, {c.graded} with grades\n")
+    mix = c.mix()
+    print(f"{'level':<6}{'total':>9}{'mean':>8}   {'A':>5}{'M':>5}{'E':>5}{'N':>5}   accounts per {COHORT_BUCKET} credits (0 … {COHORT_BUCKET*COHORT_BUCKETS}+)")
+    for l, st in c.credits().items():
+        tot = sum(mix[l].values()) or 1
+        shares = "".join(f"{mix[l][g]/tot:>5.0%}" for g in "AMEN")
+        print(f"L{l:<5}{st['total']:>9}{st['mean']:>8.1f}   {shares}   {' '.join(map(str, st['hist']))}")
+    print(f"\n{'course':<20}{'needs':>6}{'eligible':>10}{'rate':>7}")
+    for course, e in c.eligibility(courses).items():
+        print(f"{course:<20}{e['need']:>6}{e['eligible']:>10}{e['rate']:>7.1%}")
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Cohort-wide credit / grade / eligibility distributions.")
+    ap.add_argument("--users", default=USERS_FILE, help="user store (default: %(default)s)")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--verify", action="store_true", help="exit 1 if the rollups differ from a full scan")
+    ap.add_argument("--rebuild", action="store_true")
+    a=ap.parse_args(argv)
+    store = UserStore(a.users)
+    if a.rebuild:
+        with store._transaction() as users: store.data.pop("cohort", None)
+    t = time.perf_counter(); c = store.cohort(); ms = (time.perf_counter()-t)*1000
+    if a.verify:
+        full = build_cohort(store.data["users"])
+        bad = {k for k in set(full["n"])|set(c.n) if full["n"].get(k,0)!=c.n.get(k,0)}
+        if full["users"]!=c.users: bad.add("users")
+        for k in sorted(bad): print(f"mismatch {k}: rollup {c.n.get(k, c.users if k=='users' else 0)}, "
+                                    f"scan {full['n'].get(k, full['users'] if k=='users' else 0)}", file=sys.stderr)
+        print(f"rollups {'differ' if bad else 'match'} a full scan of {full['users']} accounts", file=sys.stderr)
+        if bad: sys.exit(1)
+    courses = dict(CATALOGUE.courses)
+    if a.json: print(json.dumps(c.summary(courses), indent=2))
+    else: print_tables(c, courses)
+    print(f"query {ms:.2f} ms", file=sys.stderr)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,328 @@
+# file: gradus_crawl.py
+# -*- coding: utf-8 -*-
+"""
+Gradus study-option crawler — a resumable version of WEB.PY's scrape_links.
+
+  python gradus_crawl.py crawl https://www.auckland.ac.nz/en/study/study-options/find-a-study-option.html \
+         --dir crawl_uoa --depth 2 --workers 4
+  python gradus_crawl.py crawl <same url> --dir crawl_uoa     # after Ctrl+C / a crash: carries on
+  python gradus_crawl.py dump --dir crawl_uoa                 # "text: href" lines, like WEB.PY printed
+  python gradus_crawl.py standin --port 8800 --fail-rate 0.2  # local stand-in site with injected failures
+  python gradus_crawl.py selftest                             # interrupt + resume against the stand-in
+
+State lives in --dir:
+  pages.jsonl      one line per fetched page: url, depth, status, links  (append-only, never refetched)
+  errors.jsonl     one line per failed attempt                           (append-only)
+  checkpoint.json  frontier heap, seen / done hash sets and the byte offsets of both logs it covers
+On start the checkpoint is loaded and the log tails after its offsets are replayed, so
+whatever finished before an interruption is kept. A torn last line is cut off first.
+"""
+
+import argparse, array, base64, hashlib, heapq, http.server, json, os, random, shutil, sys, threading, time
+import urllib.error, urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urldefrag, urlsplit
+
+LISTING_CLASS = "listing-item__link"
+USER_AGENT = "GradusCrawler/1.0 (+study-option research)"
+TRANSIENT = {408, 425, 429, 500, 502, 503, 504}   # retried; other 4xx/5xx are given up on at once
+
+def url_key(url:str)->int:# 64-bit hash: the seen / done sets hold these, not the URLs
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+def normalize(base:str, href:str)->str|None:# absolute, fragment-free http(s) URL, or None
+    url, _ = urldefrag(urljoin(base, href.strip()))
+    p = urlsplit(url)
+    if p.scheme not in ("http","https") or not p.netloc: return None
+    return p._replace(scheme=p.scheme.lower(), netloc=p.netloc.lower()).geturl()
+
+class LinkParser(HTMLParser):# (text, href, is_listing) for every <a href>, as scrape_links' two find_all calls
+    def __init__(self): super().__init__(); self.links = []; self._a = None
+    def handle_starttag(self, tag, attrs):
+        if tag=="a":
+            d = dict(attrs)
+            if d.get("href"): self._a = [d["href"], LISTING_CLASS in (d.get("class") or "").split(), []]
+    def handle_data(self, data):
+        if self._a is not None: self._a[2].append(data)
+    def handle_endtag(self, tag):
+        if tag=="a" and self._a is not None:
+            href, listing, text = self._a; self.links.append((" ".join("".join(text).split()), href, listing)); self._a = None
+
+def _pack(keys)->str: return base64.b64encode(array.array("Q", sorted(keys)).tobytes()).decode("ascii")
+def _unpack(s:str)->set:
+    a = array.array("Q"); a.frombytes(base64.b64decode(s)); return set(a)
+
+class CrawlFrontier:
+    """
+    Priority queue of (priority, seq, url, depth) plus seen / done sets of url_key()s.
+    Lower priority is fetched first: depth*10, minus 5 for listing links, plus 3 per
+    failed attempt. Children are only queued on hosts of the seeds and up to max_depth.
+    """
+    def __init__(self, path:str, seeds=(), max_depth:int=2, max_retries:int=3, checkpoint_every:int=50):
+        self.dir = path; self.max_depth = max_depth; self.max_retries = max_retries; self.every = checkpoint_every
+        os.makedirs(path, exist_ok=True)
+        self.pages_path, self.errors_path = os.path.join(path,"pages.jsonl"), os.path.join(path,"errors.jsonl")
+        self.ckpt_path = os.path.join(path,"checkpoint.json")
+        self.heap, self.seq, self.seen, self.done, self.attempts, self.gave_up = [], 0, set(), set(), {}, set()
+        self.inflight = {}; self.hosts = set(); self._since = 0; self.resumed = 0
+        self._load()
+        for s in seeds:
+            u = normalize(s, s)
+            if u: self.hosts.add(urlsplit(u).netloc); self.push(u, 0)
+        self.pages = open(self.pages_path, "a", encoding="utf-8"); self.errors = open(self.errors_path, "a", encoding="utf-8")
+
+    # --- persistence ---
+    @staticmethod
+    def _tail(path:str, offset:int):# complete JSON lines after `offset`; a torn last line is truncated away
+        if not os.path.exists(path): return
+        with open(path, "r+b") as f:
+            f.seek(offset); data = f.read(); keep = data.rfind(b"\n")+1
+            if keep < len(data): f.truncate(offset+keep)
+        for line in data[:keep].splitlines():
+            if line.strip(): yield json.loads(line)
+
+    def _load(self):
+        off_p = off_e = 0
+        if os.path.exists(self.ckpt_path):
+            with open(self.ckpt_path, "r", encoding="utf-8") as f: ck = json.load(f)
+            self.heap = [tuple(e) for e in ck["heap"]]; heapq.heapify(self.heap); self.seq = ck["seq"]
+            self.seen, self.done, self.gave_up = _unpack(ck["seen"]), _unpack(ck["done"]), _unpack(ck["gave_up"])
+            self.attempts = {int(k):v for k,v in ck["attempts"].items()}; self.hosts = set(ck["hosts"])
+            off_p, off_e = ck["pages_offset"], ck["errors_offset"]
+        for rec in self._tail(self.errors_path, off_e): self._on_error(rec)
+        for rec in self._tail(self.pages_path, off_p): self._on_page(rec); self.resumed += 1
+        # the checkpoint's heap no longer knows which of its entries finished after it was written
+        self.heap = [e for e in self.heap if url_key(e[2]) not in self.done and url_key(e[2]) not in self.gave_up]
+        heapq.heapify(self.heap)
+
+    def checkpoint(self):
+        self.pages.flush(); self.errors.flush(); os.fsync(self.pages.fileno()); os.fsync(self.errors.fileno())
+        ck = {"heap": self.heap + [(p, s, u, d) for u,(p,s,d) in self.inflight.items()], "seq": self.seq,
+              "seen": _pack(self.seen), "done": _pack(self.done), "gave_up": _pack(self.gave_up),
+              "attempts": self.attempts, "hosts": sorted(self.hosts),
+              "pages_offset": self.pages.tell(), "errors_offset": self.errors.tell()}
+        tmp = f"{self.ckpt_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(ck, f)
+        os.replace(tmp, self.ckpt_path); self._since = 0
+
+    def close(self):
+        self.checkpoint(); self.pages.close(); self.errors.close()
+
+    # --- queue ---
+    def push(self, url:str, depth:int, listing:bool=False):
+        k = url_key(url)
+        if k in self.seen or depth > self.max_depth or urlsplit(url).netloc not in self.hosts: return
+        self.seen.add(k); self.seq += 1
+        heapq.heappush(self.heap, (depth*10 - (5 if listing else 0), self.seq, url, depth))
+
+    def pop(self):# -> (url, depth) or None
+        while self.heap:
+            p, s, url, depth = heapq.heappop(self.heap)
+            k = url_key(url)
+            if k in self.done or k in self.gave_up: continue
+            self.inflight[url] = (p, s, depth); return url, depth
+        return None
+
+    def _on_page(self, rec:dict):
+        self.done.add(url_key(rec["url"])); self.inflight.pop(rec["url"], None)
+        for _, href, listing in rec["links"]:
+            self.push(href, rec["depth"]+1, listing)
+
+    def _on_error(self, rec:dict):
+        k = url_key(rec["url"]); self.attempts[k] = n = self.attempts.get(k,0)+1
+        if rec["permanent"] or n >= self.max_retries: self.gave_up.add(k)
+
+    def complete(self, url:str, depth:int, status:int, links:list):
+        rec = {"url":url, "depth":depth, "status":status, "links":links}
+        self.pages.write(json.dumps(rec, ensure_ascii=False)+"\n"); self.pages.flush()
+        self._on_page(rec); self._tick()
+
+    def failed(self, url:str, depth:int, error:str, permanent:bool):
+        rec = {"url":url, "depth":depth, "error":error, "permanent":permanent, "time":time.time()}
+        self.errors.write(json.dumps(rec)+"\n"); self.errors.flush()
+        p, s, _ = self.inflight.pop(url); self._on_error(rec)
+        if url_key(url) not in self.gave_up:   # retry later: behind pages of the same depth
+            heapq.heappush(self.heap, (p+3, s, url, depth))
+        self._tick()
+
+    def _tick(self):
+        self._since += 1
+        if self._since >= self.every: self.checkpoint()
+
+    def stats(self)->dict:
+        return {"done": len(self.done), "queued": len(self.heap), "gave_up": len(self.gave_up), "seen": len(self.seen)}
+
+# ---------------- fetching ----------------
+def fetch(url:str, timeout:float=10.0)->tuple[int,str]:# (status, body); network errors raise OSError
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return r.status, r.read().decode(r.headers.get_content_charset() or "utf-8", "replace")
+    except urllib.error.HTTPError as e: return e.code, ""
+
+def _fetch_links(url:str, timeout:float)->tuple[int,list]:
+    status, body = fetch(url, timeout)
+    if status!=200: return status, []
+    p = LinkParser(); p.feed(body); p.close()
+    out = []
+    for text, href, listing in p.links:
+        u = normalize(url, href)
+        if u: out.append((text, u, listing))
+    return status, out
+
+def crawl(frontier:CrawlFrontier, workers:int=4, timeout:float=10.0, delay:float=0.0, max_pages:int|None=None,
+          stop:threading.Event|None=None, log=None)->dict:
+    """Fetch until the frontier is empty, max_pages pages completed or `stop` is set. Never raises on HTTP errors."""
+    log = log or (lambda msg: None); stop = stop or threading.Event(); n = 0; pending = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gradus-crawl") as pool:
+        while not stop.is_set() and (max_pages is None or n < max_pages):
+            while len(pending) < workers and (max_pages is None or n+len(pending) < max_pages):
+                item = frontier.pop()
+                if item is None: break
+                pending[pool.submit(_fetch_links, item[0], timeout)] = item
+                if delay: time.sleep(delay)
+            if not pending: break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                url, depth = pending.pop(fut)
+                try: status, links = fut.result()
+                except (OSError, ValueError) as e:   # timeouts, resets, DNS, bad URLs
+                    frontier.failed(url, depth, f"{type(e).__name__}: {e}", permanent=False); log(f"retry  {url}: {e}"); continue
+                if status==200:
+                    frontier.complete(url, depth, status, links); n += 1; log(f"ok     {url} ({len(links)} links)")
+                else:
+                    frontier.failed(url, depth, f"HTTP {status}", permanent=status not in TRANSIENT); log(f"HTTP {status} {url}")
+        for fut in wait(pending).done:   # let in-flight fetches land before stopping
+            url, depth = pending[fut]
+            try: status, links = fut.result()
+            except (OSError, ValueError): continue
+            if status==200: frontier.complete(url, depth, status, links); n += 1
+    frontier.checkpoint()
+    return dict(frontier.stats(), fetched=n)
+
+def iter_results(path:str):# (page url, text, href, is_listing) from pages.jsonl; nothing before the first fetch
+    try: f = open(os.path.join(path,"pages.jsonl"), "r", encoding="utf-8")
+    except FileNotFoundError: return
+    with f:
+        for line in f:
+            if line.endswith("\n"):
+                rec = json.loads(line)
+                for text, href, listing in rec["links"]: yield rec["url"], text, href, listing
+
+# ---------------- local stand-in site ----------------
+class StandIn:
+    """
+    Study-options look-alike on 127.0.0.1 for testing: an index linking to `options`
+    option pages, each with `listings` listing-item__link pages. Failure injection:
+    fail_rate (random 500/503), flaky (path -> first n requests answer 503), dead paths
+    (404), slow paths (sleep past the client timeout). `hits` counts 200s per path.
+    """
+    INDEX = "/en/study/study-options/find-a-study-option.html"
+    def __init__(self, options:int=30, listings:int=5, fail_rate:float=0.0, seed:int=1, flaky=None, dead=(), slow=(), slow_s:float=2.0, port:int=0):
+        self.options, self.listings, self.fail_rate = options, listings, fail_rate
+        self.rng = random.Random(seed); self.flaky = dict(flaky or {}); self.dead, self.slow, self.slow_s = set(dead), set(slow), slow_s
+        self.hits, self.lock = {}, threading.Lock()
+        site = self
+        class H(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *a): pass
+            def do_GET(self): site._serve(self)
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), H); self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start(); return self
+    def stop(self): self.httpd.shutdown(); self.httpd.server_close()
+
+    def page(self, path:str)->str|None:
+        nav = '<nav><a href="/en.html">Home</a> <a href="%s">Study options</a> <a href="#top">Top</a></nav>' % self.INDEX
+        if path==self.INDEX:
+            items = "".join(f'<li><a href="/en/study/study-options/find-a-study-option/option-{i}.html">Option {i}</a></li>' for i in range(self.options))
+            return f"<html><body>{nav}<ul>{items}</ul></body></html>"
+        if path.startswith("/en/study/study-options/find-a-study-option/option-"):
+            i = path.rsplit("-",1)[1].split(".")[0]
+            items = "".join(f'<a class="listing-item__link" href="/en/study/programmes/p{i}-{j}.html">Programme {i}.{j}</a>' for j in range(self.listings))
+            return f"<html><body>{nav}<h1>Option {i}</h1>{items}</body></html>"
+        if path.startswith("/en/study/programmes/") or path=="/en.html":
+            return f"<html><body>{nav}<p>{path}</p><a href='mailto:x@example.com'>mail</a></body></html>"
+        return None
+
+    def _serve(self, h):
+        path = h.path.split("?")[0]
+        with self.lock:
+            flaky = self.flaky.get(path, 0)
+            if flaky: self.flaky[path] = flaky-1
+            roll = self.rng.random()
+        if path in self.slow: time.sleep(self.slow_s)
+        body = self.page(path)
+        status = 404 if body is None or path in self.dead else 503 if flaky else 500 if roll < self.fail_rate else 200
+        if status==200:
+            with self.lock: self.hits[path] = self.hits.get(path,0)+1
+        out = (body if status==200 else f"<h1>{status}</h1>").encode("utf-8")
+        try:
+            h.send_response(status); h.send_header("Content-Type","text/html; charset=utf-8"); h.send_header("Content-Length",str(len(out)))
+            h.end_headers(); h.wfile.write(out)
+        except (BrokenPipeError, ConnectionResetError): pass   # the client timed out first
+
+def selftest(tmp:str)->bool:
+    """Crawl the stand-in with failures, stop part-way, resume; every page must be fetched exactly once."""
+    site = StandIn(options=40, listings=6, fail_rate=0.15, flaky={StandIn.INDEX: 2},
+                   dead={"/en/study/programmes/p3-0.html"}, slow={"/en/study/programmes/p5-5.html"}, slow_s=1.5).start()
+    try:
+        seed = site.url + StandIn.INDEX; d = os.path.join(tmp, "crawl")
+        f = CrawlFrontier(d, [seed], max_depth=2, max_retries=6, checkpoint_every=7)
+        ok = []
+        def keep_old_checkpoint(msg):# a crash after page 60 leaves the checkpoint from around page 45 behind
+            ok.append(msg.startswith("ok"))
+            if sum(ok)==45 and os.path.exists(f.ckpt_path): shutil.copy(f.ckpt_path, f.ckpt_path+".old")
+        first = crawl(f, workers=4, timeout=0.5, max_pages=60, log=keep_old_checkpoint); f.pages.close(); f.errors.close()
+        os.replace(f.ckpt_path+".old", f.ckpt_path)
+        with open(f.pages_path, "a", encoding="utf-8") as torn: torn.write('{"url": "http://127.0.0.1/half-writ')
+        f = CrawlFrontier(d, [seed], max_depth=2, max_retries=6, checkpoint_every=7)
+        second = crawl(f, workers=4, timeout=0.5); f.close()
+        expected = 1 + 1 + 40 + 40*6 - 2   # index, /en.html, options, programmes; minus the dead and the slow one
+        twice = {p:n for p,n in site.hits.items() if n>1 and p not in site.slow}   # slow answers land after the timeout
+        print(f"first run {first}, resumed {f.resumed} pages, second run {second}", file=sys.stderr)
+        print(f"pages done {second['done']} (expected {expected}), fetched twice: {twice or 'none'}", file=sys.stderr)
+        return f.resumed>0 and second["done"]==expected and not twice and second["gave_up"]==2
+    finally:
+        site.stop()
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Resumable study-option crawler.")
+    sub=ap.add_subparsers(dest="cmd", required=True)
+    c=sub.add_parser("crawl"); c.add_argument("seeds", nargs="+")
+    c.add_argument("--dir", default="crawl_state"); c.add_argument("--depth", type=int, default=2)
+    c.add_argument("--workers", type=int, default=4); c.add_argument("--timeout", type=float, default=10.0)
+    c.add_argument("--delay", type=float, default=0.0, help="seconds between requests (politeness)")
+    c.add_argument("--retries", type=int, default=3); c.add_argument("--max-pages", type=int)
+    c.add_argument("--checkpoint-every", type=int, default=50, help="pages between checkpoints")
+    d=sub.add_parser("dump"); d.add_argument("--dir", default="crawl_state"); d.add_argument("--listings", action="store_true")
+    s=sub.add_parser("standin"); s.add_argument("--port", type=int, default=0); s.add_argument("--fail-rate", type=float, default=0.1)
+    s.add_argument("--options", type=int, default=30); s.add_argument("--listings", type=int, default=5)
+    sub.add_parser("selftest")
+    a=ap.parse_args(argv)
+    if a.cmd=="crawl":
+        f = CrawlFrontier(a.dir, a.seeds, a.depth, a.retries, a.checkpoint_every)
+        if f.resumed or f.done: print(f"resuming: {f.stats()}", file=sys.stderr)
+        stop = threading.Event()
+        try: res = crawl(f, a.workers, a.timeout, a.delay, a.max_pages, stop, log=lambda m: print(m, file=sys.stderr))
+        except KeyboardInterrupt: stop.set(); res = f.stats(); print("interrupted; run again to resume", file=sys.stderr)
+        finally: f.close()
+        print(json.dumps(res), file=sys.stderr)
+    elif a.cmd=="dump":
+        if not os.path.exists(os.path.join(a.dir,"pages.jsonl")): print(f"no pages fetched yet in {a.dir}", file=sys.stderr)
+        for _, text, href, listing in iter_results(a.dir):
+            if listing or not a.listings: print(f"{text}: {href}")
+    elif a.cmd=="standin":
+        site = StandIn(a.options, a.listings, a.fail_rate, port=a.port)
+        print(f"stand-in site: {site.url}{StandIn.INDEX}", file=sys.stderr)
+        try: site.httpd.serve_forever()
+        except KeyboardInterrupt: pass
+    else:
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp: ok = selftest(tmp)
+        print("selftest OK" if ok else "selftest FAILED", file=sys.stderr); sys.exit(0 if ok else 1)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,36 @@
+# file: gradus_ingest.py
+# -*- coding: utf-8 -*-
+"""
+Gradus grade ingest — load a folder (or list) of grade CSVs into one account, skipping
+results that are already recorded, so the same term's files can be re-run safely.
+
+  python gradus_ingest.py --user aroha exports/term3/
+  python gradus_ingest.py --user aroha a.csv b.csv --dry-run
+"""
+
+import argparse, os, sys, time
+
+from version4_Peter_Zhang import USERS_FILE, UserStore, ingest_grades
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Bulk-import grade CSVs (Title, Level, Credits, Grade) with de-duplication.")
+    ap.add_argument("paths", nargs="+", help="CSV files and/or folders of CSVs")
+    ap.add_argument("--user", required=True)
+    ap.add_argument("--users", default=USERS_FILE, help="user store (default: %(default)s)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--processes", action="store_true", help="parse in processes instead of threads")
+    ap.add_argument("--dry-run", action="store_true")
+    a=ap.parse_args(argv)
+    store = UserStore(a.users)
+    if store.credentials(a.user) is None: sys.exit(f"no account {a.user} in {a.users}")
+    st = store.get_state(a.user)
+    t = time.perf_counter()
+    res = ingest_grades(a.paths, st["grades"], a.workers, a.processes)
+    if res["inserted"] and not a.dry_run:
+        st["grades"] += res["inserted"]; store.save_state(a.user, st)   # save_state merges with concurrent edits
+    for f, line, why in res["rejected"]: print(f"rejected {f}{f':{line}' if line else ''}: {why}", file=sys.stderr)
+    print(f"{res['files']} files: {len(res['inserted'])} inserted, {res['duplicates']} duplicate, "
+          f"{len(res['rejected'])} rejected{' (dry run)' if a.dry_run else ''} in {time.perf_counter()-t:.2f}s", file=sys.stderr)
+
+if __name__=="__main__":
+    main()
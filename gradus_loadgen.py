@@ -0,0 +1,80 @@
+# file: gradus_loadgen.py
+# -*- coding: utf-8 -*-
+"""
+Load generator for gradus_server.py — keep-alive clients hammering a request mix,
+reporting requests/sec and latency percentiles.
+
+  python gradus_server.py --port 8765 &
+  python gradus_loadgen.py --port 8765 -c 50 -d 10
+"""
+
+import argparse, asyncio, json, random, sys, time
+
+MIX = [  # (weight, method, path, body)
+    (4, "POST",   "/chat",   {"text": "My score is 300 for Engineering"}),
+    (2, "POST",   "/chat",   {"text": "What is NCEA?"}),
+    (3, "GET",    "/check?course=Science", None),
+    (2, "GET",    "/grades", None),
+    (1, "GET",    "/careers?field=Commerce", None),
+]
+
+class Client:
+    def __init__(self, host, port): self.host, self.port = host, port; self.r = self.w = None; self.token = None
+
+    async def call(self, method, path, body=None)->tuple[int,dict]:
+        if self.w is None: self.r, self.w = await asyncio.open_connection(self.host, self.port)
+        raw = json.dumps(body).encode() if body is not None else b""
+        hdr = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(raw)}\r\n"
+        if self.token: hdr += f"Authorization: Bearer {self.token}\r\n"
+        self.w.write(hdr.encode("latin-1") + b"\r\n" + raw); await self.w.drain()
+        head = (await self.r.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = {k.strip().lower(): v.strip() for k,_,v in (l.partition(":") for l in head[1:] if l)}
+        data = await self.r.readexactly(int(headers.get("content-length","0")))
+        if headers.get("connection","").lower()=="close": self.w.close(); self.r = self.w = None
+        return int(head[0].split()[1]), json.loads(data or b"{}")
+
+    def close(self):
+        if self.w: self.w.close()
+
+async def worker(c:Client, until:float, lat:list, errors:list, weights, rng):
+    while time.perf_counter() < until:
+        _, method, path, body = rng.choices(MIX, weights)[0]
+        t = time.perf_counter()
+        try:
+            status, _ = await c.call(method, path, body)
+            if status!=200: errors.append(status)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            errors.append(type(e).__name__); c.close(); c.r = c.w = None
+        lat.append(time.perf_counter()-t)
+
+async def run(host, port, clients, seconds, username, password, seed=1):
+    cs = [Client(host, port) for _ in range(clients)]
+    for c in cs:
+        status, res = await c.call("POST", "/login", {"username": username, "password": password})
+        if status!=200: raise SystemExit(f"login failed: {status} {res}")
+        c.token = res["token"]
+    lat, errors = [], []; weights = [m[0] for m in MIX]
+    t0 = time.perf_counter(); until = t0 + seconds
+    await asyncio.gather(*(worker(c, until, lat, errors, weights, random.Random(seed+i)) for i,c in enumerate(cs)))
+    dt = time.perf_counter()-t0
+    for c in cs: c.close()
+    lat.sort(); pct = lambda p: lat[min(len(lat)-1, int(p*len(lat)))]*1000 if lat else 0.0
+    return {"requests": len(lat), "seconds": round(dt,3), "rps": round(len(lat)/dt,1), "errors": len(errors),
+            "p50_ms": round(pct(.50),2), "p95_ms": round(pct(.95),2), "p99_ms": round(pct(.99),2)}
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Load test for the Gradus HTTP server.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("-c","--clients", type=int, default=20, help="concurrent keep-alive connections")
+    ap.add_argument("-d","--duration", type=float, default=5.0, help="seconds")
+    ap.add_argument("--user", default="demo"); ap.add_argument("--password", default="student123")
+    ap.add_argument("--json", action="store_true", help="print the result as JSON")
+    a=ap.parse_args(argv)
+    res = asyncio.run(run(a.host, a.port, a.clients, a.duration, a.user, a.password))
+    if a.json: print(json.dumps(res)); return
+    print(f"{res['requests']} requests in {res['seconds']}s: {res['rps']} req/s, {res['errors']} errors")
+    print(f"latency p50 {res['p50_ms']} ms • p95 {res['p95_ms']} ms • p99 {res['p99_ms']} ms")
+
+if __name__=="__main__":
+    main(sys.argv[1:])
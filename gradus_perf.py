@@ -0,0 +1,149 @@
+# file: gradus_perf.py
+# -*- coding: utf-8 -*-
+"""
+Gradus hot-path instrumentation: named timers, counters and value histograms.
+
+  from gradus_perf import METRICS
+  @METRICS.timed("bot.reply")
+  def reply(...): ...
+  with METRICS.timer("store.save"): ...
+  METRICS.observe("store.bytes", n)
+
+Each stat keeps count / total / max plus the most recent samples, from which
+p50 / p95 are read. Recording costs a couple of perf_counter() calls and a
+deque append, so it stays on in normal use.
+
+LagWatchdog watches a Tk (or any after()-driven) event loop and attributes
+stalls to the callback that was running, by sampling the UI thread's stack.
+"""
+
+import collections, functools, json, os, sys, threading, time
+
+WINDOW = 2048   # recent samples kept per stat for percentiles
+
+class Stat:
+    __slots__ = ("count","total","max","recent")
+    def __init__(self): self.count=0; self.total=0.0; self.max=0.0; self.recent=collections.deque(maxlen=WINDOW)
+
+    def add(self, v:float):
+        self.count += 1; self.total += v; self.recent.append(v)
+        if v > self.max: self.max = v
+
+    def pct(self, p:float)->float:
+        xs = sorted(self.recent)
+        return xs[min(len(xs)-1, int(p*len(xs)))] if xs else 0.0
+
+    def summary(self)->dict:
+        return {"count":self.count, "mean":self.total/self.count if self.count else 0.0,
+                "p50":self.pct(.50), "p95":self.pct(.95), "max":self.max, "total":self.total}
+
+class Metrics:
+    def __init__(self):
+        self.stats = collections.defaultdict(Stat)   # timers hold seconds; observe() holds raw values
+        self.counters = collections.Counter()
+        self.lock = threading.Lock()                 # the HTTP server records from worker threads
+
+    def observe(self, name:str, value:float):
+        with self.lock: self.stats[name].add(value)
+
+    def count(self, name:str, n:int=1):
+        with self.lock: self.counters[name] += n
+
+    def timer(self, name:str): return _Timer(self, name)
+
+    def timed(self, name:str):
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*a, **kw):
+                t = time.perf_counter()
+                try: return fn(*a, **kw)
+                finally: self.observe(name, time.perf_counter()-t)
+            return wrapper
+        return deco
+
+    def snapshot(self)->dict:
+        with self.lock:
+            return {"stats": {k: s.summary() for k,s in sorted(self.stats.items())},
+                    "counters": dict(sorted(self.counters.items()))}
+
+    def dump_json(self, path:str, **extra):# extra top-level keys, e.g. stalls=[...]
+        with open(path,"w",encoding="utf-8") as f: json.dump({**self.snapshot(), **extra}, f, indent=2)
+
+    def reset(self):
+        with self.lock: self.stats.clear(); self.counters.clear()
+
+class _Timer:
+    __slots__ = ("m","name","t")
+    def __init__(self, m, name): self.m=m; self.name=name
+    def __enter__(self): self.t = time.perf_counter(); return self
+    def __exit__(self, *exc): self.m.observe(self.name, time.perf_counter()-self.t)
+
+METRICS = Metrics()
+
+# ---------------- event-loop watchdog ----------------
+class LagWatchdog:
+    """
+    Heartbeat on the UI thread (via `after(ms, fn)`, e.g. Tk's) plus a sampler thread.
+    The heartbeat records its drift as "tk.lag". While a beat is overdue by more than
+    `threshold` seconds, the sampler grabs the UI thread's stack every `sample` seconds;
+    when the loop recovers the stall is logged with its duration, the Tk callback that
+    was running and the innermost frame seen most often.
+    """
+    def __init__(self, after, cancel=None, interval:float=0.1, threshold:float=0.2, sample:float=0.02,
+                 log=None, metrics:Metrics=METRICS):
+        self.after, self.cancel = after, cancel
+        self.interval, self.threshold, self.sample = interval, threshold, sample
+        self.log = log or (lambda msg: print(msg, file=sys.stderr))
+        self.metrics = metrics
+        self.stalls = collections.deque(maxlen=50)   # recent stall records (dicts), newest last
+        self.ui = threading.get_ident()
+        self.last = time.perf_counter(); self._job = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="gradus-lag", daemon=True)
+
+    def start(self):
+        self._job = self.after(int(self.interval*1000), self._beat); self._thread.start(); return self
+
+    def stop(self):
+        self._stop.set()
+        if self._job is not None and self.cancel: self.cancel(self._job)
+        self._job = None
+
+    def _beat(self):# UI thread
+        now = time.perf_counter()
+        self.metrics.observe("tk.lag", max(0.0, now-self.last-self.interval))
+        self.last = now
+        if not self._stop.is_set(): self._job = self.after(int(self.interval*1000), self._beat)
+
+    def _watch(self):# sampler thread
+        stall_from, samples = None, collections.Counter()
+        while not self._stop.wait(self.sample):
+            last = self.last; late = time.perf_counter()-last-self.interval
+            if stall_from is None:
+                if late > self.threshold: stall_from = last; samples.clear()
+                else: continue
+            if last != stall_from:   # a beat got through: the stall is over
+                self._report(last-stall_from-self.interval, samples); stall_from = None; continue
+            frame = sys._current_frames().get(self.ui)
+            if frame is not None: samples[_where(frame)] += 1
+
+    def _report(self, dur:float, samples:collections.Counter):
+        (callback, inner), n = samples.most_common(1)[0] if samples else (("?","?"), 0)
+        rec = {"time": time.strftime("%H:%M:%S"), "ms": round(dur*1000,1), "callback": callback,
+               "where": inner, "samples": sum(samples.values()), "share": round(n/max(1,sum(samples.values())),2)}
+        self.stalls.append(rec)
+        self.metrics.count("tk.stalls"); self.metrics.observe("tk.stall", dur)
+        self.log(f"[lag] UI stalled {rec['ms']:.0f} ms in {callback} at {inner} ({n}/{rec['samples']} samples)")
+
+_STDLIB = os.path.dirname(os.__file__)
+
+def _where(frame)->tuple[str,str]:# (Tk callback being run, innermost non-stdlib frame)
+    inner, callback, f = None, None, frame
+    while f is not None:
+        code = f.f_code
+        if inner is None and not code.co_filename.startswith(_STDLIB): inner = f"{code.co_name} ({os.path.basename(code.co_filename)}:{f.f_lineno})"
+        up = f.f_back
+        if up is not None and up.f_code.co_name=="__call__" and up.f_code.co_filename.endswith(os.path.join("tkinter","__init__.py")):
+            callback = getattr(f.f_code, "co_qualname", code.co_name)
+        f = up
+    return callback or "?", inner or f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
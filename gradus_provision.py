@@ -0,0 +1,82 @@
+# file: gradus_provision.py
+# -*- coding: utf-8 -*-
+"""
+Gradus bulk provisioning — create every account on a school roster with one store write.
+
+  python gradus_provision.py roster.csv                       # username[,password] columns
+  python gradus_provision.py roster.csv --credentials out.csv # write generated passwords here
+  python gradus_provision.py roster.csv --dry-run --workers 4
+
+Rows are validated in one pass (USERNAME_RE, password length, duplicates in the roster,
+accounts already in the store). Passwords are hashed in a process pool and all new
+accounts are committed in a single UserStore transaction. Rows without a password get a
+random one, which is only written to --credentials; without it such a roster is refused
+before anything is hashed.
+"""
+
+import argparse, csv, os, secrets, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from version4_Peter_Zhang import USERS_FILE, USERNAME_RE, KDF_ITERATIONS, UserStore, _hash_pw
+
+def hash_password(pw:str)->tuple[str,str]:# (salt, hash); runs in a worker
+    salt = secrets.token_hex(16)
+    return salt, _hash_pw(pw, salt)
+
+def read_roster(path:str, existing)->tuple[list, list]:
+    """-> ([(username, password, generated)], [(line, username, problem)])"""
+    ok, bad, seen = [], [], set()
+    with open(path,"r",newline="",encoding="utf-8-sig") as f:
+        for line, r in enumerate(csv.DictReader(f), start=2):
+            u = (r.get("username") or "").strip(); pw = r.get("password") or ""
+            if not USERNAME_RE.match(u): bad.append((line, u, "username must be 3–32 letters/digits/_"))
+            elif u in seen: bad.append((line, u, "duplicate in roster"))
+            elif u in existing: bad.append((line, u, "already exists"))
+            elif pw and len(pw)<8: bad.append((line, u, "password shorter than 8 characters"))
+            else:
+                seen.add(u); ok.append((u, pw or secrets.token_urlsafe(9), not pw))
+    return ok, bad
+
+def provision(store:UserStore, roster:str, workers:int|None=None, chunksize:int=16, dry_run:bool=False,
+              generated_ok:bool=True)->dict:
+    """ValueError, before any hashing, if rows need a generated password and generated_ok is false."""
+    store._refresh()
+    rows, bad = read_roster(roster, store.data["users"])
+    gen = sum(g for _,_,g in rows)
+    if gen and not generated_ok: raise ValueError(f"{gen} roster rows have no password and the generated ones would be lost")
+    t0 = time.perf_counter()
+    if workers==1: hashed = list(map(hash_password, (pw for _,pw,_ in rows)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashed = list(pool.map(hash_password, (pw for _,pw,_ in rows), chunksize=chunksize))
+    t1 = time.perf_counter()
+    taken = [] if dry_run else store.add_users((u, salt, h) for (u,_,_),(salt,h) in zip(rows, hashed))
+    t2 = time.perf_counter()
+    bad += [(None, u, "created by someone else meanwhile") for u in taken]
+    return {"rows": rows, "bad": bad, "created": 0 if dry_run else len(rows)-len(taken),
+            "hash_s": t1-t0, "write_s": t2-t1}
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Create accounts from a roster CSV (username[,password]).")
+    ap.add_argument("roster")
+    ap.add_argument("--users", default=USERS_FILE, help="user store (default: %(default)s)")
+    ap.add_argument("--credentials", help="write username,password for generated passwords here")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="hashing processes; 1 = no pool")
+    ap.add_argument("--chunksize", type=int, default=16)
+    ap.add_argument("--dry-run", action="store_true", help="validate and hash, but write nothing")
+    a=ap.parse_args(argv)
+    try: res = provision(UserStore(a.users), a.roster, a.workers, a.chunksize, a.dry_run,
+                         generated_ok=a.dry_run or bool(a.credentials))
+    except ValueError as e: sys.exit(f"{e} (use --credentials)")
+    for line, u, why in res["bad"]: print(f"skipped {u or '?'}{f' (line {line})' if line else ''}: {why}", file=sys.stderr)
+    gen = [(u,pw) for u,pw,g in res["rows"] if g]
+    if gen and not a.dry_run:
+        with open(a.credentials,"w",newline="",encoding="utf-8") as f:
+            w=csv.writer(f); w.writerow(["username","password"]); w.writerows(gen)
+    n = len(res["rows"]); per_k = lambda s: s/n*1000 if n else 0.0
+    print(f"{res['created']} created, {len(res['bad'])} skipped{' (dry run)' if a.dry_run else ''}; "
+          f"hash {res['hash_s']:.2f}s ({per_k(res['hash_s']):.2f}s/1k users, {KDF_ITERATIONS} iterations, {a.workers} workers), "
+          f"write {res['write_s']*1000:.0f} ms ({per_k(res['write_s'])*1000:.0f} ms/1k users)", file=sys.stderr)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,70 @@
+# file: gradus_report.py
+# -*- coding: utf-8 -*-
+"""
+Gradus cohort report — rank score, per-level credits and endorsements for every
+account in the user store, computed in a process pool and streamed to CSV / JSON Lines.
+
+  python gradus_report.py                         # CSV to stdout, all cores
+  python gradus_report.py -f jsonl -o cohort.jsonl --workers 4
+"""
+
+import argparse, collections, csv, itertools, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from version4_Peter_Zhang import USERS_FILE, RankScore, grade_totals, endorsements, iter_store_users
+
+FIELDS = ["username","rank_score","rank_credits","l1","l2","l3","total","cert_endorsements","course_endorsements"]
+
+def report_row(item)->dict:# (username, grades) -> one report row; runs in a worker
+    username, grades = item
+    rank = RankScore(grades); lv = grade_totals(grades); en = endorsements(grades)
+    return {"username":username, "rank_score":rank.score, "rank_credits":rank.credits,
+            "l1":lv[1], "l2":lv[2], "l3":lv[3], "total":lv["all"],
+            "cert_endorsements":";".join(f"L{l}:{e}" for l,e in sorted(en["cert"].items())),
+            "course_endorsements":";".join(f"L{l} {s}:{e}" for (l,s),e in sorted(en["course"].items()))}
+
+def report_rows(chunk:list)->list:# one task = a batch of users, to keep pickling per task down
+    return [report_row(item) for item in chunk]
+
+def iter_users(path:str):# yields (username, grades) straight from the store file (binary or JSON)
+    for name,u in iter_store_users(path):
+        yield name, (u.get("state") or {}).get("grades",[]) or []
+
+def run_report(path:str, out, fmt="csv", workers=None, chunksize=64)->tuple[int,float]:
+    """Stream report rows to `out`; returns (rows written, seconds).
+    At most a few chunks per worker are in flight, so memory does not grow with the store."""
+    t0=time.perf_counter(); n=0
+    if fmt=="csv":
+        w=csv.DictWriter(out, fieldnames=FIELDS); w.writeheader(); emit=w.writerow
+    else:
+        emit=lambda row: out.write(json.dumps(row, ensure_ascii=False)+"\n")
+    if workers==1:
+        rows=map(report_row, iter_users(path))
+        for row in rows: emit(row); n+=1
+    else:
+        window = 4*(workers or os.cpu_count() or 1); users = iter_users(path); pending = collections.deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                while len(pending)<window and (chunk:=list(itertools.islice(users, chunksize))):
+                    pending.append(pool.submit(report_rows, chunk))
+                if not pending: break
+                for row in pending.popleft().result(): emit(row); n+=1
+    return n, time.perf_counter()-t0
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Cohort rank score / endorsement report.")
+    ap.add_argument("--users", default=USERS_FILE, help="user store (default: %(default)s)")
+    ap.add_argument("-f","--format", choices=["csv","jsonl"], default="csv")
+    ap.add_argument("-o","--output", help="output file (default: stdout)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="processes; 1 = no pool")
+    ap.add_argument("--chunksize", type=int, default=64, help="users per task sent to a worker")
+    a=ap.parse_args(argv)
+    out=open(a.output,"w",newline="",encoding="utf-8") if a.output else sys.stdout
+    try:
+        n,dt=run_report(a.users, out, a.format, a.workers, a.chunksize)
+    finally:
+        if a.output: out.close()
+    print(f"{n} users in {dt:.2f}s ({n/dt if dt else 0:.0f} users/s, {a.workers} workers)", file=sys.stderr)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,249 @@
+# file: gradus_server.py
+# -*- coding: utf-8 -*-
+"""
+Gradus headless server — HTTP/JSON over asyncio, same UserStore / ChatBot as the Tk app.
+
+  python gradus_server.py --port 8765 --workers 8
+
+  POST   /login      {"username","password"}        -> {"token"}
+  POST   /logout
+  GET    /grades                                     -> {"grades", "totals"}
+  POST   /grades     {"title","level","credits","grade"}
+  DELETE /grades/<i>
+  GET    /check?course=Engineering[&score=300]       -> rank score vs course threshold
+  GET    /careers[?field=Science]
+  POST   /chat       {"text"}                        -> {"reply"}
+
+Courses, careers and FAQ come from the catalogue file, re-checked every second.
+Every call except /login sends "Authorization: Bearer <token>". Connections are
+kept alive; blocking work (store reads/writes) runs in a bounded thread pool and
+password checks in the Credentials pool. Each session works on its own copy of the
+user's state; writes re-read, change and save that copy under a per-user lock.
+Sessions and their FROST conversations live in a BotPool: idle ones are evicted
+(only token -> username is kept) and reloaded from the store on the next call.
+A token unused for --token-ttl seconds is forgotten and the client must log in again.
+"""
+
+import argparse, asyncio, collections, copy, datetime, json, secrets, sys, time, weakref
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+
+from version4_Peter_Zhang import (USERS_FILE, CATALOGUE, CATALOGUE_POLL_MS, UserStore, Credentials, BotPool,
+                                  RankScore, make_grade, grade_totals)
+
+MAX_BODY = 64*1024
+REASONS = {200:"OK", 400:"Bad Request", 401:"Unauthorized", 404:"Not Found", 405:"Method Not Allowed",
+           413:"Payload Too Large", 500:"Internal Server Error"}
+
+class HttpError(Exception):
+    def __init__(self, status:int, msg:str): super().__init__(msg); self.status = status
+
+class ApiSession:# one logged-in client: a private copy of its state and rank engine (the bot lives in GradusServer.bots)
+    __slots__ = ("token","username","state","rank","lock")
+    def __init__(self, token:str, username:str, state:dict, lock:asyncio.Lock):
+        self.token = token; self.username = username; self.state = state
+        self.rank = RankScore(state["grades"])
+        self.lock = lock   # shared by every session of this user: serialises read-modify-write
+
+class GradusServer:
+    def __init__(self, store:UserStore, workers:int=8, bot_ttl:float=1800, max_bots:int=10000,
+                 token_ttl:float=8*3600, clock=time.monotonic):
+        self.store = store; self.token_ttl = token_ttl; self.clock = clock
+        self.bots = BotPool(bot_ttl, max_bots, on_evict=self._bot_evicted)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gradus-io")
+        self.creds = Credentials(store, workers=max(1, workers//2))
+        self.tokens = collections.OrderedDict()   # token -> (username, last used); least recently used first
+        self.sessions = {}   # token -> ApiSession, only while its bot is in self.bots
+        self._locks = weakref.WeakValueDictionary()   # username -> asyncio.Lock, alive while a session holds it
+        self.routes = {("POST","/login"):self.login, ("POST","/logout"):self.logout,
+                       ("GET","/grades"):self.grades, ("POST","/grades"):self.add_grade,
+                       ("DELETE","/grades"):self.del_grade, ("GET","/check"):self.check,
+                       ("GET","/careers"):self.careers, ("POST","/chat"):self.chat}
+
+    async def io(self, fn, *args):# run blocking store work in the bounded pool
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    def close(self): self.pool.shutdown(wait=False); self.creds.close()
+
+    async def watch_catalogue(self):# swap in catalogue edits; a stat per tick when nothing changed
+        while True:
+            await asyncio.sleep(CATALOGUE_POLL_MS/1000)
+            if CATALOGUE.reload_if_changed(): print(f"catalogue reloaded from {CATALOGUE.current.source}", file=sys.stderr)
+
+    # --- handlers: (session | None, body dict, query dict, path arg) -> (status, obj) ---
+    def _user_lock(self, username:str)->asyncio.Lock:
+        lock = self._locks.get(username)
+        if lock is None: lock = self._locks[username] = asyncio.Lock()
+        return lock
+
+    def _copy_state(self, username:str)->dict:# worker thread: get_state hands out the store's live dict
+        return copy.deepcopy(self.store.get_state(username))
+
+    async def login(self, _, body, q, arg):
+        u, p = str(body.get("username","")).strip(), str(body.get("password",""))
+        if not await asyncio.wrap_future(self.creds.verify_future(u, p)):   # the loop keeps serving meanwhile
+            raise HttpError(401, "Invalid username or password.")
+        token = secrets.token_urlsafe(24); self._expire(); self.tokens[token] = (u, self.clock())
+        sess = await self._hydrate(token, u)
+        self.bots.get(token, sess.rank, sess.state.get("bot"))   # enter the pool, so eviction covers it
+        return 200, {"token": token}
+
+    async def logout(self, sess, body, q, arg):
+        self.tokens.pop(sess.token, None); self.sessions.pop(sess.token, None); self.bots.drop(sess.token)
+        return 200, {"ok": True}
+
+    def _expire(self, now:float|None=None):# forget tokens idle past token_ttl, oldest first
+        now = self.clock() if now is None else now
+        while self.tokens:
+            token, (_, seen) = next(iter(self.tokens.items()))
+            if now-seen<=self.token_ttl: break
+            del self.tokens[token]; self.sessions.pop(token, None); self.bots.drop(token)
+
+    async def _hydrate(self, token:str, username:str)->ApiSession:# (re)load a session from the store
+        st = await self.io(self._copy_state, username)
+        return self.sessions.setdefault(token, ApiSession(token, username, st, self._user_lock(username)))
+
+    def _bot_evicted(self, token, snap):# state (bot included) was saved with the last write; just forget it
+        self.sessions.pop(token, None)
+
+    def _adopt(self, sess, st:dict, fresh:bool=False, op=None):# loop thread: take a new copy, keep rank in step
+        if fresh and op: getattr(sess.rank, op[0])(op[1])   # only our own change since the last copy
+        elif st["grades"]!=sess.state["grades"]: sess.rank.reset(st["grades"])
+        sess.state = st
+
+    async def _update(self, sess, mutate):
+        """Re-read the user's state, apply mutate(state) -> (rank op | None, result), save; one writer per user."""
+        async with sess.lock:
+            def job():
+                st = self._copy_state(sess.username); fresh = st["grades"]==sess.state["grades"]
+                op, res = mutate(st)
+                return copy.deepcopy(self.store.save_state(sess.username, st)), fresh, op, res
+            st, fresh, op, res = await self.io(job)
+            self._adopt(sess, st, fresh, op)
+            return res
+
+    async def _reload(self, sess):# pick up other sessions' / processes' writes before answering
+        self._adopt(sess, await self.io(self._copy_state, sess.username))
+
+    async def grades(self, sess, body, q, arg):
+        await self._reload(sess)
+        return 200, {"grades": sess.state["grades"], "totals": grade_totals(sess.state["grades"])}
+
+    async def add_grade(self, sess, body, q, arg):
+        try: g = make_grade(body.get("title",""), body.get("level",0), body.get("credits",0), body.get("grade",""))
+        except (TypeError, ValueError) as e: raise HttpError(400, str(e))
+        def add(st): st["grades"].append(g); return ("add", g), len(st["grades"])-1
+        i = await self._update(sess, add)
+        return 200, {"index": i, "rank_score": sess.rank.score}
+
+    async def del_grade(self, sess, body, q, arg):
+        def delete(st):
+            gs = st["grades"]
+            if not arg.isdigit() or int(arg)>=len(gs): raise HttpError(404, "No such grade.")
+            return ("remove", gs.pop(int(arg))), None
+        await self._update(sess, delete)
+        return 200, {"rank_score": sess.rank.score}
+
+    async def check(self, sess, body, q, arg):
+        if not q.get("score"): await self._reload(sess)
+        c = q.get("course",""); courses = CATALOGUE.courses
+        if c not in courses: raise HttpError(400, f"course must be one of {', '.join(courses)}")
+        try: s = int(q["score"]) if q.get("score") else sess.rank.score
+        except ValueError: raise HttpError(400, "score must be a whole number")
+        need = courses[c]
+        return 200, {"course": c, "score": s, "need": need, "ok": s>=need, "short": max(0, need-s)}
+
+    async def careers(self, sess, body, q, arg):
+        f = q.get("field"); careers = CATALOGUE.careers
+        if f and f not in careers: raise HttpError(400, f"field must be one of {', '.join(careers)}")
+        return 200, {"careers": {f: careers[f]} if f else dict(careers)}
+
+    async def chat(self, sess, body, q, arg):
+        text = str(body.get("text","")).strip()
+        if not text: raise HttpError(400, "text is required")
+        await self._reload(sess)   # the bot answers score questions from the rank engine
+        reply = self.bots.reply(sess.token, text, sess.rank, sess.state.get("bot"))
+        snap = self.bots.snapshot(sess.token)
+        ts = datetime.datetime.now().strftime("%H:%M")   # same line format as the FROST page
+        def log(st): st["bot"] = snap; st["chat_history"] += f"[{ts}] You: {text}\n[{ts}] FROST: {reply}\n"; return None, None
+        await self._update(sess, log)
+        return 200, {"reply": reply}
+
+    # --- HTTP plumbing ---
+    async def dispatch(self, method, target, headers, raw):
+        url = urlsplit(target); parts = url.path.rstrip("/").split("/")
+        path, arg = ("/"+parts[1] if len(parts)>1 else "/"), "/".join(parts[2:])
+        h = self.routes.get((method, path))
+        if h is None:
+            raise HttpError(405 if any(p==path for _,p in self.routes) else 404, "No such endpoint.")
+        sess = None
+        if path!="/login":
+            auth = headers.get("authorization","")
+            token = auth[7:] if auth.startswith("Bearer ") else ""
+            now = self.clock(); self._expire(now)
+            if token not in self.tokens: raise HttpError(401, "Login required.")
+            u, _ = self.tokens[token]; self.tokens[token] = (u, now); self.tokens.move_to_end(token)
+            sess = self.sessions.get(token)
+            if sess is None:
+                sess = await self._hydrate(token, u)
+                if token not in self.tokens: self.sessions.pop(token, None); raise HttpError(401, "Login required.")   # logged out meanwhile
+            self.bots.get(token, sess.rank, sess.state.get("bot"))   # touch: the pool's TTL/LRU evicts idle sessions
+        try: body = json.loads(raw) if raw else {}
+        except ValueError: raise HttpError(400, "Body must be JSON.")
+        if not isinstance(body, dict): raise HttpError(400, "Body must be a JSON object.")
+        return await h(sess, body, dict(parse_qsl(url.query)), arg)
+
+    async def handle(self, reader, writer):# one keep-alive connection
+        try:
+            while True:
+                try: head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError): break
+                lines = head.decode("latin-1").split("\r\n")
+                try: method, target, version = lines[0].split(" ", 2)
+                except ValueError: break
+                headers = {k.strip().lower(): v.strip() for k,_,v in (l.partition(":") for l in lines[1:] if l)}
+                n = int(headers.get("content-length","0") or 0)
+                try:
+                    if n>MAX_BODY: raise HttpError(413, "Body too large.")
+                    raw = await reader.readexactly(n) if n else b""
+                    status, obj = await self.dispatch(method.upper(), target, headers, raw)
+                except HttpError as e: status, obj = e.status, {"error": str(e)}
+                except asyncio.IncompleteReadError: break
+                except Exception as e: status, obj = 500, {"error": f"{type(e).__name__}: {e}"}
+                keep = headers.get("connection","").lower()!="close" and version!="HTTP/1.0" and status!=413
+                out = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {REASONS.get(status,'')}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(out)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n"
+                             .encode("latin-1") + out)
+                await writer.drain()
+                if not keep: break
+        finally:
+            writer.close()
+
+async def serve(host:str, port:int, store:UserStore, workers:int, bot_ttl:float=1800, max_bots:int=10000,
+                token_ttl:float=8*3600):
+    app = GradusServer(store, workers, bot_ttl, max_bots, token_ttl)
+    CATALOGUE.current   # compile/map it now rather than on the first request
+    srv = await asyncio.start_server(app.handle, host, port, backlog=1024)
+    print(f"Gradus API on http://{host}:{port}  ({workers} I/O workers)", file=sys.stderr)
+    watch = asyncio.create_task(app.watch_catalogue())
+    try:
+        async with srv: await srv.serve_forever()
+    finally:
+        watch.cancel(); app.close()
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Gradus headless HTTP/JSON server.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--users", default=USERS_FILE, help="user store (default: %(default)s)")
+    ap.add_argument("--workers", type=int, default=8, help="threads for blocking store I/O")
+    ap.add_argument("--bot-ttl", type=float, default=1800, help="seconds before an idle session is evicted")
+    ap.add_argument("--max-bots", type=int, default=10000, help="sessions kept in memory")
+    ap.add_argument("--token-ttl", type=float, default=8*3600, help="seconds a login token stays valid unused")
+    a=ap.parse_args(argv)
+    try: asyncio.run(serve(a.host, a.port, UserStore(a.users), a.workers, a.bot_ttl, a.max_bots, a.token_ttl))
+    except KeyboardInterrupt: pass
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,50 @@
+# file: gradus_store.py
+# -*- coding: utf-8 -*-
+"""
+Gradus store tool — inspect the user store and move it between the binary and JSON formats.
+
+  python gradus_store.py info                          # format, size, accounts, grades, titles
+  python gradus_store.py export -o users_debug.json    # readable copy; the store is untouched
+  python gradus_store.py convert --to json             # rewrite in place (under the store lock)
+  python gradus_store.py convert --to binary
+  python gradus_store.py role alice adviser            # advisers see the Cohort page; "student" reverts
+
+The app reads either format and saves a store in the format it already has; only new
+stores take GRADUS_STORE_FORMAT (json unless set to binary).
+"""
+
+import argparse, os, sys, time
+
+from version4_Peter_Zhang import USERS_FILE, ROLES, UserStore, read_store, store_format, write_store
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Inspect / export / convert the Gradus user store.")
+    ap.add_argument("--users", default=USERS_FILE, help="user store (default: %(default)s)")
+    sub=ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info")
+    e=sub.add_parser("export", help="write a JSON copy"); e.add_argument("-o","--output", required=True)
+    c=sub.add_parser("convert", help="rewrite the store in another format"); c.add_argument("--to", choices=["binary","json"], required=True)
+    r=sub.add_parser("role", help="make an account an adviser or a student"); r.add_argument("username"); r.add_argument("role", choices=ROLES)
+    a=ap.parse_args(argv)
+    if not os.path.exists(a.users): sys.exit(f"no store at {a.users}")
+    if a.cmd=="info":
+        fmt = store_format(a.users)
+        t = time.perf_counter(); data = read_store(a.users); ms = (time.perf_counter()-t)*1000
+        users = data["users"].values(); grades = [g for u in users for g in (u.get("state") or {}).get("grades") or []]
+        print(f"{a.users}: {fmt}, {os.path.getsize(a.users)/1024:.1f} KiB, {len(data['users'])} accounts, "
+              f"{len(grades)} grades ({len({g.get('title') for g in grades})} distinct titles), read in {ms:.1f} ms")
+    elif a.cmd=="export":
+        write_store(a.output, read_store(a.users), "json")
+        print(f"{a.users} -> {a.output} ({os.path.getsize(a.output)/1024:.1f} KiB)", file=sys.stderr)
+    elif a.cmd=="role":
+        store = UserStore(a.users)
+        try: store.set_role(a.username, a.role)
+        except ValueError as e: sys.exit(str(e))
+        print(f"{a.username}: {a.role}", file=sys.stderr)
+    else:
+        store = UserStore(a.users, fmt=a.to); before = os.path.getsize(a.users)
+        with store._transaction(): pass   # re-read under the lock, write once in the new format
+        print(f"{a.users}: {before/1024:.1f} KiB -> {os.path.getsize(a.users)/1024:.1f} KiB ({a.to})", file=sys.stderr)
+
+if __name__=="__main__":
+    main()
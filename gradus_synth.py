@@ -0,0 +1,208 @@
+# file: gradus_synth.py
+# -*- coding: utf-8 -*-
+"""
+Gradus synthetic data + scale harness — production-sized stores on demand, and the
+numbers that say where things stop scaling.
+
+  python gradus_synth.py generate -o big_users.gus --accounts 20000 --grades 40 --chat 300
+  python gradus_synth.py generate -o s.json --accounts 500 --fixtures fixtures_big --pages 200
+  python gradus_synth.py run --users big_users.gus                # throughput + peak RSS per phase (on a copy)
+  python gradus_synth.py sweep --sizes 1000,5000,20000 --grades 40 # one fresh process per size
+
+Accounts get grades drawn from ncea_standards.csv (titled the way the Grades page's
+autocomplete fills them in), concentrated at one year level with an NCEA-like grade mix,
+and FROST transcripts made of real ChatBot replies. Every account's password is
+--password; one salt/hash is shared so generating 100k accounts takes seconds.
+"""
+
+import argparse, json, os, random, shutil, subprocess, sys, tempfile, time
+try: import resource   # peak RSS; POSIX only
+except ImportError: resource = None
+
+from version4_Peter_Zhang import (STANDARDS_CSV, CATALOGUE, METRICS, UserStore, ChatBot, BotPool, RankScore,
+                                  StandardsIndex, grade_totals, endorsements, subject_strengths, make_grade,
+                                  iter_store_users, write_store, _hash_pw)
+
+GRADE_MIX = (("A",0.14), ("M",0.30), ("E",0.42), ("N",0.14))
+MESSAGES = ["What is NCEA?", "What is a rank score?", "My name is {name}", "I like {field}", "suggest a job",
+            "My score is {score} for {course}", "my score for {course}", "what careers are there", "hello", "/help"]
+NAMES = ["Aroha", "Wiremu", "Mere", "Tama", "Olivia", "Jack", "Sione", "Mei", "Priya", "Liam", "Ana", "Noah"]
+
+def peak_rss_mb()->float|None:
+    if resource is None: return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb/1024/1024 if sys.platform=="darwin" else kb/1024   # bytes on macOS, KiB elsewhere
+
+# ---------------- generation ----------------
+def standard_pool(path:str=STANDARDS_CSV)->dict:# level -> [(title, credits)]
+    ix = StandardsIndex.read_csv(path); pool = {1:[], 2:[], 3:[]}
+    for i, (_, _, _, _, level, credits) in enumerate(ix.entries): pool[int(level)].append((ix.label(i), int(credits)))
+    return pool
+
+def synth_grades(rng:random.Random, pool:dict, n:int)->list:
+    year = rng.choices((1,2,3), (0.3,0.35,0.35))[0]; letters, weights = zip(*GRADE_MIX)
+    out, seen = [], set()
+    for _ in range(n * 3):   # distinct standards; small pools just give fewer grades
+        if len(out)>=n: break
+        lvl = year if rng.random()<0.7 else rng.randint(1, year)
+        title, credits = rng.choice(pool[lvl])
+        if title in seen: continue
+        seen.add(title); out.append(make_grade(title, lvl, credits, rng.choices(letters, weights)[0]))
+    return out
+
+def synth_chat(rng:random.Random, lines:int)->tuple[str,dict]:# (transcript, bot snapshot) from a real ChatBot
+    bot = ChatBot(); out = []; minute = rng.randint(0, 600)
+    courses, fields = list(CATALOGUE.courses) or ["Science"], list(CATALOGUE.careers) or ["Science"]
+    while len(out) < lines:
+        msg = rng.choice(MESSAGES).format(name=rng.choice(NAMES), field=rng.choice(fields),
+                                          course=rng.choice(courses), score=rng.randint(120, 320))
+        minute += rng.randint(0, 3); stamp = f"[{minute//60%24:02d}:{minute%60:02d}]"
+        out.append(f"{stamp} You: {msg}\n")
+        for part in bot.reply(msg).splitlines(): out.append(f"{stamp} FROST: {part}\n")
+    return "".join(out[:lines]), bot.snapshot()
+
+def generate(path:str, accounts:int, grades:int, chat:int, seed:int=1, password:str="student123",
+             iterations:int=1000, fmt:str="binary")->dict:
+    """Write a store of `accounts` users (plus demo) in one go; returns counts and timings."""
+    t = time.perf_counter(); rng = random.Random(seed); pool = standard_pool()
+    salt = "5e" * 16; pw = _hash_pw(password, salt, iterations)
+    users = {}
+    for i in range(accounts):
+        text, bot = synth_chat(rng, rng.randint(chat//2, chat*3//2)) if chat else ("", {})
+        users[f"student{i:06d}"] = {"salt":salt, "pw":pw, "v":1, "state":{
+            "dark": rng.random()<0.3, "chat_history": text, "bot": bot,
+            "grades": synth_grades(rng, pool, max(0, int(rng.gauss(grades, grades/4))) if grades else 0)}}
+    users["demo"] = {"salt":salt, "pw":pw, "v":1, "state":{"dark":False, "chat_history":"", "grades":[]}}
+    gen_s = time.perf_counter()-t
+    write_store(path, {"users": users}, fmt)
+    return {"accounts": len(users), "grades": sum(len(u["state"]["grades"]) for u in users.values()),
+            "bytes": os.path.getsize(path), "generate_s": gen_s, "write_s": time.perf_counter()-t-gen_s}
+
+def generate_fixtures(folder:str, pages:int, links:int=12, seed:int=1)->int:
+    """Study-option pages shaped like benchmarks/fixtures (listing-item__link anchors, site chrome)."""
+    rng = random.Random(seed); os.makedirs(folder, exist_ok=True)
+    kinds = ["Bachelor of", "Master of", "Postgraduate Certificate in", "Graduate Diploma in", "Doctor of"]
+    subjects = sorted({t.split(" ")[0] for lvl in standard_pool().values() for t,_ in lvl}) + ["Engineering", "Commerce", "Science"]
+    for i in range(pages):
+        items = []
+        for _ in range(links):
+            name = f"{rng.choice(kinds)} {rng.choice(subjects)}"; slug = name.lower().replace(" ", "-")
+            items.append(f'<li class="listing-item"><a class="listing-item__link" href="/en/study/study-options/'
+                         f'find-a-study-option/{slug}.html"><span class="listing-item__title">{name}</span></a></li>')
+        nav = "".join(f'<li><a href="/en/{p}.html">{p.title()}</a></li>' for p in ("study","research","about","news"))
+        html = (f'<!DOCTYPE html><html lang="en"><head><title>Study option {i}</title></head><body>'
+                f'<header><nav><ul>{nav}</ul></nav></header><main><h1>Study option {i}</h1>'
+                f'<p>{" ".join(rng.choice(subjects).lower() for _ in range(60))}</p><ul class="listing">{"".join(items)}</ul>'
+                f'</main><footer><a href="/en/contact.html">Contact</a></footer></body></html>')
+        with open(os.path.join(folder, f"study_option_{i:05d}.html"), "w", encoding="utf-8") as f: f.write(html)
+    return pages
+
+# ---------------- harness ----------------
+class Harness:
+    """Runs phases against one store and records ops, seconds and peak RSS after each."""
+    def __init__(self): self.rows = []
+    def phase(self, name:str, fn, ops):# ops: a count, or a callable asked after fn has run
+        t = time.perf_counter(); fn(); dt = time.perf_counter()-t
+        if callable(ops): ops = ops()
+        self.rows.append({"phase":name, "ops":ops, "s":dt, "ops_s":ops/dt if dt else float("inf"), "peak_rss_mb":peak_rss_mb()})
+
+def run(path:str, sample:int=200, replies:int=20000, seed:int=2, scratch:bool=False)->dict:
+    """Measure every phase on the store at path; it is saved to, so unless scratch a temporary copy is used."""
+    if not scratch:
+        with tempfile.TemporaryDirectory() as tmp:
+            work = os.path.join(tmp, os.path.basename(path)); shutil.copyfile(path, work)
+            res = run(work, sample, replies, seed, scratch=True); res["store"] = path
+            return res
+    h = Harness(); rng = random.Random(seed); box = {}
+    h.phase("store.open", lambda: box.setdefault("store", UserStore(path)), lambda: len(box["store"].data["users"]))
+    store = box["store"]; names = list(store.data["users"]); picked = rng.sample(names, min(sample, len(names)))
+    def roundtrip():   # each save rewrites the whole file: this is the per-save cost at this size
+        for u in picked:
+            st = store.get_state(u); st["grades"].append(make_grade("Synthetic 3.9 Harness check", 3, 4, "M"))
+            store.save_state(u, st)
+    h.phase("state.get+save", roundtrip, len(picked))
+    states = [(u["state"].get("grades") or []) for u in store.data["users"].values()]
+    def logic():
+        for g in states: RankScore(g).score; grade_totals(g); endorsements(g); subject_strengths(g)
+    h.phase("grades.logic", logic, len(states))
+    def chat():
+        pool = BotPool(max_sessions=1000); ranks = {}
+        for i in range(replies):
+            u = names[i % len(names)]
+            if u not in ranks: ranks[u] = RankScore(store.data["users"][u]["state"].get("grades") or [])
+            pool.reply(u, rng.choice(MESSAGES).format(name="Aroha", field="Science", course="Engineering", score=250), ranks[u])
+    h.phase("bot.reply", chat, replies)
+    store.data.pop("cohort", None)
+    h.phase("cohort.build", store.cohort, len(names))
+    h.phase("cohort.query", lambda: [store.cohort().summary(CATALOGUE.courses) for _ in range(1000)], 1000)
+    h.phase("store.stream", lambda: sum(1 for _ in iter_store_users(path)), len(names))
+    lat = {k: {f: round(v[f]*1000, 3) for f in ("p50","p95","max")} for k,v in METRICS.snapshot()["stats"].items()
+           if k in ("store.save","bot.reply")}
+    return {"store": path, "accounts": len(names), "bytes": os.path.getsize(path), "phases": h.rows, "latency_ms": lat}
+
+def print_run(res:dict):
+    print(f"{res['store']}: {res['accounts']} accounts, {res['bytes']/2**20:.1f} MiB")
+    print(f"{'phase':<16}{'ops':>8}{'seconds':>10}{'ops/s':>12}{'peak RSS MB':>13}")
+    for r in res["phases"]:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        print(f"{r['phase']:<16}{r['ops']:>8}{r['s']:>10.3f}{r['ops_s']:>12.0f}{rss:>13}")
+    for k, v in res["latency_ms"].items(): print(f"{k:<16} p50 {v['p50']} ms  p95 {v['p95']} ms  max {v['max']} ms")
+
+def sweep(sizes, grades:int, chat:int, sample:int, replies:int, fmt:str)->list:
+    """Generate and measure each size in a fresh interpreter, so peak RSS belongs to that size alone."""
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"users_{n}.store")
+            gen = generate(path, n, grades, chat, fmt=fmt)
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "run", "--users", path, "--json", "--scratch",
+                                   "--sample", str(sample), "--replies", str(replies)],
+                                  capture_output=True, text=True, check=True, env=dict(os.environ, GRADUS_STORE_FORMAT=fmt))
+            res = json.loads(proc.stdout); res["generate"] = gen; out.append(res); os.remove(path)
+            print(f"{n} accounts done", file=sys.stderr)
+    return out
+
+def print_sweep(results:list):
+    names = [r["phase"] for r in results[0]["phases"]]
+    print(f"{'accounts':>9}{'MiB':>8}" + "".join(f"{p:>16}" for p in names) + f"{'peak RSS MB':>13}")
+    for r in results:
+        rss = r["phases"][-1]["peak_rss_mb"]
+        print(f"{r['accounts']:>9}{r['bytes']/2**20:>8.1f}" + "".join(f"{p['ops_s']:>14.0f}/s" for p in r["phases"])
+              + (f"{rss:>13.0f}" if rss is not None else f"{'-':>13}"))
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Generate synthetic Gradus data and measure it at scale.")
+    sub=ap.add_subparsers(dest="cmd", required=True)
+    g=sub.add_parser("generate"); g.add_argument("-o","--output", required=True)
+    g.add_argument("--accounts", type=int, default=1000); g.add_argument("--grades", type=int, default=30, help="mean grades per account")
+    g.add_argument("--chat", type=int, default=200, help="mean transcript lines per account")
+    g.add_argument("--seed", type=int, default=1); g.add_argument("--password", default="student123")
+    g.add_argument("--format", choices=["binary","json"], default="binary")
+    g.add_argument("--fixtures", help="also write scraped-page fixtures into this folder")
+    g.add_argument("--pages", type=int, default=100)
+    r=sub.add_parser("run"); r.add_argument("--users", required=True)
+    r.add_argument("--sample", type=int, default=200, help="accounts to load+save"); r.add_argument("--replies", type=int, default=20000)
+    r.add_argument("--json", action="store_true")
+    r.add_argument("--scratch", action="store_true", help="measure the store in place (it gets modified)")
+    s=sub.add_parser("sweep"); s.add_argument("--sizes", default="1000,5000,20000")
+    s.add_argument("--grades", type=int, default=30); s.add_argument("--chat", type=int, default=200)
+    s.add_argument("--sample", type=int, default=50); s.add_argument("--replies", type=int, default=20000)
+    s.add_argument("--format", choices=["binary","json"], default="binary"); s.add_argument("--json", help="write results here")
+    a=ap.parse_args(argv)
+    if a.cmd=="generate":
+        res = generate(a.output, a.accounts, a.grades, a.chat, a.seed, a.password, fmt=a.format)
+        print(f"{res['accounts']} accounts, {res['grades']} grades -> {a.output} ({res['bytes']/2**20:.1f} MiB); "
+              f"generate {res['generate_s']:.1f}s, write {res['write_s']:.2f}s", file=sys.stderr)
+        if a.fixtures: print(f"{generate_fixtures(a.fixtures, a.pages)} fixture pages -> {a.fixtures}", file=sys.stderr)
+    elif a.cmd=="run":
+        res = run(a.users, a.sample, a.replies, scratch=a.scratch)
+        if a.json: print(json.dumps(res))
+        else: print_run(res)
+    else:
+        results = sweep([int(x) for x in a.sizes.split(",")], a.grades, a.chat, a.sample, a.replies, a.format)
+        print_sweep(results)
+        if a.json:
+            with open(a.json,"w",encoding="utf-8") as f: json.dump(results, f, indent=2)
+
+if __name__=="__main__":
+    main()
@@ -1,17 +1,32 @@
 # file: gradus_twostage.py
 # -*- coding: utf-8 -*-
 """
-Gradus — two-stage startup:
-1) A dedicated LoginApp(Tk) starts first (centered), handles Login/Register
-2) On success: destroy LoginApp, then create MainApp(Tk) for the real UI
+Gradus — two-stage startup in one Tk root:
+1) Session(Tk) shows the LoginApp view first (centered), handles Login/Register
+2) On success: LoginApp is torn down and the MainApp view takes its place;
+   logout swaps back the same way, so the interpreter is never recreated
 Also: softer dark theme palette.
 """
 
+import time
+_T0 = time.perf_counter()   # startup clock starts before the heavy imports
+
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
-import re, datetime, csv, os, json, sys, hashlib, secrets
+from tkinter import ttk, messagebox
+import re, datetime, os, json, sys, base64, bisect, copy, collections, collections.abc, contextlib, functools, hashlib, heapq, hmac, itertools, mmap, secrets, struct, threading, zlib
+from array import array
+try: import fcntl               # advisory file locks (POSIX); without it the store is single-process
+except ImportError: fcntl = None
+from concurrent.futures import ThreadPoolExecutor
+from gradus_perf import METRICS, LagWatchdog
+try: import numpy as np   # optional: career scoring uses it when present
+except ImportError: np = None
+# csv, tkinter.filedialog and tkinter.scrolledtext are imported where used (CSV helpers, FROST)
 
 USERS_FILE  = "gradus_users.json"
+CAREER_CSV  = os.path.join(os.path.dirname(os.path.abspath(__file__)), "career_subjects.csv")   # .gmx next to it once built
+STALL_MS    = float(os.environ.get("GRADUS_STALL_MS", "200"))   # UI stalls longer than this are logged
+PERF_DUMP   = os.environ.get("GRADUS_PERF_DUMP") or next((a.split("=",1)[1] for a in sys.argv if a.startswith("--perf-dump=")), None)
 
 COURSES = {"Science": 280, "Commerce": 210, "Engineering": 260}
 CAREERS  = {
@@ -23,6 +38,11 @@ FAQ = {
     "What is NCEA?": "NCEA is New Zealand’s main school qualification.",
     "What is a rank score?": "It's a number based on your Level 3 results for uni entry.",
 }
+# the dicts above are the fallback; normally they come from the catalogue file (see CATALOGUE below)
+CATALOGUE_FILE = os.environ.get("GRADUS_CATALOGUE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogue.json")
+CATALOGUE_POLL_MS = 1000
+STORE_FORMAT = os.environ.get("GRADUS_STORE_FORMAT", "json")   # for new stores; "binary" is opt-in (gradus_store.py convert)
+STANDARDS_CSV = os.environ.get("GRADUS_STANDARDS") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "ncea_standards.csv")
 
 # ---------------- utils ----------------
 def center_window(win: tk.Tk | tk.Toplevel):
@@ -35,9 +55,402 @@ def center_window(win: tk.Tk | tk.Toplevel):
     y = max(0, (sh - h)//2)
     win.geometry(f"{w}x{h}+{x}+{y}")
 
+# ---------------- catalogue (courses / careers / FAQ) ----------------
+CATALOGUE_SECTIONS = ("courses", "careers", "faq")
+_CAT_HEAD, _CAT_SEC, _CAT_ENT = struct.Struct("<4sHH"), struct.Struct("<16sII"), struct.Struct("<IIII")
+
+def compile_catalogue(src:dict, path:str):
+    """
+    {"courses": {...}, "careers": {...}, "faq": {...}} -> .gcat, written atomically:
+      b"GCAT", u16 version, u16 sections | per section: name[16], u32 count, u32 table offset
+      per section table: count × (key off, key len, value off, value len) in file order,
+                         then count × u32 entry numbers sorted by key bytes (for bisection)
+      blobs: UTF-8 keys and JSON values
+    """
+    secs = [(n, list((src.get(n) or {}).items())) for n in CATALOGUE_SECTIONS]
+    at = _CAT_HEAD.size + _CAT_SEC.size*len(secs); tables = []
+    for _, items in secs: tables.append(at); at += (_CAT_ENT.size+4)*len(items)
+    out = bytearray(_CAT_HEAD.pack(b"GCAT", 1, len(secs))); blob = bytearray(); body = bytearray()
+    for (name, items), off in zip(secs, tables):
+        out += _CAT_SEC.pack(name.encode("ascii"), len(items), off)
+        keys = [k.encode("utf-8") for k,_ in items]
+        for k, (_, v) in zip(keys, items):
+            val = json.dumps(v, ensure_ascii=False).encode("utf-8")
+            body += _CAT_ENT.pack(at+len(blob), len(k), at+len(blob)+len(k), len(val)); blob += k + val
+        body += struct.pack(f"<{len(keys)}I", *sorted(range(len(keys)), key=keys.__getitem__))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp,"wb") as f: f.write(out + body + blob)
+    os.replace(tmp, path)
+
+class CatalogueSection(collections.abc.Mapping):# read-only dict view over one section of a mapped .gcat
+    def __init__(self, buf, count:int, off:int):
+        self.buf, self.n, self.off = buf, count, off; self._vals = {}
+    def _ent(self, j:int): return _CAT_ENT.unpack_from(self.buf, self.off + _CAT_ENT.size*j)
+    def _key(self, j:int)->bytes:
+        ko, kl, _, _ = self._ent(j); return self.buf[ko:ko+kl]
+    def _find(self, key:str)->int:
+        kb = key.encode("utf-8"); lo, hi = 0, self.n; sorted_at = self.off + _CAT_ENT.size*self.n
+        while lo < hi:
+            mid = (lo+hi)//2
+            if self._key(struct.unpack_from("<I", self.buf, sorted_at+4*mid)[0]) < kb: lo = mid+1
+            else: hi = mid
+        if lo < self.n:
+            j = struct.unpack_from("<I", self.buf, sorted_at+4*lo)[0]
+            if self._key(j)==kb: return j
+        return -1
+    def __getitem__(self, key):
+        if key in self._vals: return self._vals[key]
+        j = self._find(key) if isinstance(key, str) else -1
+        if j < 0: raise KeyError(key)
+        _, _, vo, vl = self._ent(j); v = self._vals[key] = json.loads(self.buf[vo:vo+vl].decode("utf-8"))
+        return v
+    def __iter__(self): return (self._key(j).decode("utf-8") for j in range(self.n))
+    def __len__(self): return self.n
+
+NAME_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _osa(a:str, b:str, limit:int)->int:# edit distance with adjacent swaps; limit+1 as soon as it is exceeded
+    if abs(len(a)-len(b)) > limit: return limit+1
+    prev2, prev = None, list(range(len(b)+1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0]*len(b)
+        for j, cb in enumerate(b, 1):
+            d = min(prev[j]+1, cur[j-1]+1, prev[j-1]+(ca!=cb))
+            if i>1 and j>1 and ca==b[j-2] and a[i-2]==cb: d = min(d, prev2[j-2]+1)
+            cur[j] = d
+        if min(cur) > limit: return limit+1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+class NameMatcher:
+    """
+    Typo-tolerant lookup of catalogue names in free text. The words of all names form a
+    small vocabulary that is indexed SymSpell style: every word under each variant with up
+    to MAX_EDITS characters deleted. A message word generates its own deletion variants,
+    and only vocabulary words that share one get a bounded edit-distance check. Names are
+    word-id sequences, keyed by their first word. A hit is a run of message words that
+    spells a whole name within MAX_EDITS edits in total. Each word may take none below 5
+    characters, one below 9, then two. `names` maps a lower-case name to what a hit
+    resolves to.
+    """
+    MAX_EDITS = 2
+    def __init__(self, names:dict):
+        self.vocab, self.names, self.starts, self.index = {}, [], {}, {}
+        for name, target in names.items():
+            ids = tuple(self.vocab.setdefault(w, len(self.vocab)) for w in name.split())
+            self.starts.setdefault(ids[0], []).append(len(self.names)); self.names.append((ids, name, target))
+        self.words = list(self.vocab)
+        for w, i in self.vocab.items():
+            for v in self._variants(w, self.MAX_EDITS): self.index.setdefault(v, []).append(i)
+        self._word = functools.lru_cache(maxsize=4096)(self._match_word)
+
+    @staticmethod
+    def _variants(s:str, edits:int)->set:
+        out = level = {s}
+        for _ in range(edits):
+            level = {w[:k]+w[k+1:] for w in level for k in range(len(w))}; out |= level
+        return out
+
+    @staticmethod
+    def allowed(n:int)->int: return 0 if n<5 else 1 if n<9 else 2
+
+    def _match_word(self, tok:str)->dict:# vocabulary word id -> edits, for one message word
+        limit = self.allowed(len(tok)); out = {}
+        if tok in self.vocab: out[self.vocab[tok]] = 0
+        if limit:
+            for v in self._variants(tok, limit):
+                for i in self.index.get(v, ()):
+                    if i not in out and (d := _osa(tok, self.words[i], limit)) <= limit: out[i] = d
+        return out
+
+    def find(self, text:str)->tuple|None:# -> (edits, name, target); fewest edits, then the longest name
+        toks = NAME_WORD_RE.findall(text.lower()); cands = [self._word(t) for t in toks]; best = None
+        for i, first in enumerate(cands):
+            for wid, d0 in first.items():
+                for ni in self.starts.get(wid, ()):
+                    ids, name, target = self.names[ni]
+                    if i+len(ids) > len(toks): continue
+                    d = d0
+                    for k in range(1, len(ids)):
+                        dk = cands[i+k].get(ids[k])
+                        if dk is None: break
+                        d += dk
+                    else:
+                        if d<=self.MAX_EDITS and (best is None or (d, -len(ids)) < (best[0], -best[3])):
+                            best = (d, name, target, len(ids))
+        return best[:3] if best else None
+
+class Catalogue:
+    """One loaded catalogue version: .courses, .careers and .faq are read-only mappings."""
+    def __init__(self, sections:dict, source:str):
+        self.courses, self.careers, self.faq = (sections.get(n, {}) for n in CATALOGUE_SECTIONS)
+        self.source = source; self._names = self._matcher = None
+
+    @classmethod
+    def open(cls, path:str):# mmap a compiled .gcat read-only; lookups read the pages they touch
+        with open(path,"rb") as f: buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n = _CAT_HEAD.unpack_from(buf, 0)
+        if magic!=b"GCAT" or version!=1: raise ValueError(f"{path}: not a catalogue file")
+        secs = {}
+        for i in range(n):
+            name, count, off = _CAT_SEC.unpack_from(buf, _CAT_HEAD.size + _CAT_SEC.size*i)
+            secs[name.rstrip(b"\0").decode("ascii")] = CatalogueSection(buf, count, off)
+        return cls(secs, path)
+
+    def names(self)->tuple[re.Pattern, dict]:# regex over course/field names + lower-case -> canonical name
+        if self._names is None:
+            canon = {k.lower(): k for k in itertools.chain(self.careers, self.courses)}
+            alt = "|".join(sorted(map(re.escape, canon), key=len, reverse=True)) or r"(?!)"
+            self._names = (re.compile(rf"\b({alt})\b", re.I), canon)
+        return self._names
+
+    def matcher(self)->NameMatcher:# course and field names resolve to themselves, career titles to their field
+        if self._matcher is None:   # first misspelt reply against this version pays for it
+            names = {}
+            for field, titles in self.careers.items():
+                for t in titles: names.setdefault(" ".join(NAME_WORD_RE.findall(t.lower())), field)
+            for k in itertools.chain(self.careers, self.courses): names[" ".join(NAME_WORD_RE.findall(k.lower()))] = k
+            names.pop("", None)
+            self._matcher = NameMatcher(names)
+        return self._matcher
+
+class CatalogueRef:
+    """
+    The live catalogue. Source is a JSON file (CATALOGUE_FILE); it is compiled to a .gcat
+    next to it whenever the JSON is newer, and the .gcat is memory-mapped, so every
+    process shares the same pages. reload_if_changed() (polled from the Tk loop or the
+    server's event loop) stats both files and swaps `current` in one assignment; readers
+    that need several lookups to agree take `cat = CATALOGUE.current` once. Nothing is
+    read or compiled until `current` is first used, so importing this module never writes.
+    """
+    def __init__(self, path:str=CATALOGUE_FILE):
+        self.path = path; self.gcat = os.path.splitext(path)[0]+".gcat"; self.version = 0
+        self._lock = threading.Lock(); self._stamp = None; self._current = None
+
+    @property
+    def current(self)->Catalogue:
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self._stamp = self._stat()
+                    try: self._current = self._load()
+                    except (OSError, ValueError) as e:
+                        print(f"[catalogue] {e}; using built-in data", file=sys.stderr); self._current = self._builtin()
+        return self._current
+    courses = property(lambda self: self.current.courses)
+    careers = property(lambda self: self.current.careers)
+    faq = property(lambda self: self.current.faq)
+
+    def _stat(self):
+        def st(p):
+            try: s = os.stat(p); return (s.st_mtime_ns, s.st_size, s.st_ino)
+            except FileNotFoundError: return None
+        return st(self.path), st(self.gcat)
+
+    @staticmethod
+    def _builtin(): return Catalogue({"courses":COURSES, "careers":CAREERS, "faq":FAQ}, "built-in")
+
+    def _load(self)->Catalogue:
+        src, bin_ = self._stamp
+        if src and (not bin_ or src[0] > bin_[0]):   # JSON edited since the last compile
+            with open(self.path,"r",encoding="utf-8") as f: data = json.load(f)
+            try: compile_catalogue(data, self.gcat)
+            except OSError: return Catalogue(data, self.path)   # read-only install: serve the JSON as parsed
+            self._stamp = self._stat()
+        if os.path.exists(self.gcat): return Catalogue.open(self.gcat)
+        return self._builtin()
+
+    def reload_if_changed(self)->bool:
+        if self._current is None: return False   # not loaded yet: first use reads the files as they are then
+        with self._lock:
+            st = self._stat()
+            if st==self._stamp: return False
+            self._stamp = st
+            try: new = self._load()
+            except (OSError, ValueError) as e:   # half-written edit etc.: keep serving the old one
+                print(f"[catalogue] reload failed: {e}", file=sys.stderr); return False
+            self._current = new; self.version += 1
+            return True
+
+CATALOGUE = CatalogueRef()
+
+# ---------------- startup profile ----------------
+class StartupProfile:
+    """
+    Per-phase startup timings. Enabled by --profile-startup or GRADUS_PROFILE_STARTUP
+    (1, or a path for the JSON report; default gradus_startup.json).
+    GRADUS_STARTUP_BUDGET_MS sets the budget checked in the report.
+    """
+    def __init__(self, argv=None, env=None):
+        argv = sys.argv if argv is None else argv; env = os.environ if env is None else env
+        flag = env.get("GRADUS_PROFILE_STARTUP","")
+        self.enabled = "--profile-startup" in argv or flag not in ("","0")
+        self.path = flag if flag not in ("","0","1") else "gradus_startup.json"
+        self.budget_ms = float(env.get("GRADUS_STARTUP_BUDGET_MS","0") or 0)
+        self.phases = []; self.pages = {}; self._t = _T0; self.done = False
+
+    def mark(self, name:str):# the phase `name` ends now; no-op after the report (e.g. relogin)
+        if self.done: return
+        t = time.perf_counter(); self.phases.append((name, (t-self._t)*1000)); self._t = t
+
+    def skip(self): self._t = time.perf_counter()   # exclude time spent waiting on the user
+
+    def page(self, name:str, ms:float):# page builds overlap main_window / idle time, so kept apart from the total
+        if not self.done: self.pages[name] = ms
+
+    def report(self):
+        if not self.enabled or self.done: return
+        self.done = True
+        total = sum(ms for _,ms in self.phases)
+        out = {"phases": {k: round(ms,2) for k,ms in self.phases}, "total_ms": round(total,2),
+               "pages": {k: round(ms,2) for k,ms in self.pages.items()}}
+        if self.budget_ms: out["budget_ms"] = self.budget_ms; out["over_budget"] = total > self.budget_ms
+        for k,ms in self.phases: print(f"[startup] {k:<16}{ms:9.1f} ms", file=sys.stderr)
+        for k,ms in self.pages.items(): print(f"[startup]   page {k:<11}{ms:9.1f} ms", file=sys.stderr)
+        print(f"[startup] {'total':<16}{total:9.1f} ms" + (f" (budget {self.budget_ms:.0f} ms)" if self.budget_ms else ""), file=sys.stderr)
+        try:
+            with open(self.path,"w",encoding="utf-8") as f: json.dump(out,f,indent=2)
+        except OSError as e:
+            print(f"[startup] could not write {self.path}: {e}", file=sys.stderr)
+
+STARTUP = StartupProfile()
+STARTUP.mark("imports")
+
 # ---------------- user store ----------------
 USERNAME_RE = re.compile(r"^[A-Za-z0-9_]{3,32}$")
-def _hash_pw(pw: str, salt: str)->str: return hashlib.sha256((salt+pw).encode("utf-8")).hexdigest()
+ROLES = ("student", "adviser")   # advisers also see cohort-wide analytics; set with gradus_store.py role
+KDF_NAME = "pbkdf2_sha256"
+KDF_ITERATIONS = int(os.environ.get("GRADUS_KDF_ITERATIONS", "200000"))   # tune with --calibrate-kdf
+
+def _legacy_hash(pw: str, salt: str)->str: return hashlib.sha256((salt+pw).encode("utf-8")).hexdigest()
+
+def _hash_pw(pw: str, salt: str, iterations:int|None=None)->str:# "pbkdf2_sha256$<iterations>$<hex>"
+    it = iterations or KDF_ITERATIONS
+    dk = hashlib.pbkdf2_hmac("sha256", pw.encode("utf-8"), salt.encode("utf-8"), it)
+    return f"{KDF_NAME}${it}${dk.hex()}"
+
+def _check_pw(pw: str, salt: str, stored: str)->bool:# accepts legacy single-SHA-256 hashes too
+    if "$" not in stored: return hmac.compare_digest(_legacy_hash(pw,salt), stored)
+    try: name, it, _ = stored.split("$", 2); it = int(it)
+    except ValueError: return False   # malformed record: a failed login, not a crash
+    return name==KDF_NAME and it>0 and hmac.compare_digest(_hash_pw(pw,salt,it), stored)
+
+def _needs_rehash(stored: str)->bool:
+    try: return "$" not in stored or int(stored.split("$")[1]) < KDF_ITERATIONS
+    except (ValueError, IndexError): return True
+
+def calibrate_kdf(target_ms:float=250.0, probe:int=20000)->int:
+    """Iterations for which one hash takes about target_ms on this machine."""
+    t = time.perf_counter(); _hash_pw("calibrate", "0"*32, probe); dt = time.perf_counter()-t
+    return max(10000, int(probe * target_ms / 1000 / dt) // 1000 * 1000)
+
+# --- binary store codec ---
+STORE_MAGIC, STORE_VERSION = b"GUS", 1
+
+class StoreFormatError(ValueError):
+    """A store this Gradus must not read (newer format, not a store): left alone, never renamed."""
+_STORE_HEAD = struct.Struct("<3sBIII")        # magic, version, titles, users, meta bytes
+_STORE_REC  = struct.Struct("<IHHHIBIII")     # record bytes after this field, name, salt, pw, v, flags, chat, grades, extra
+_STORE_GRADE = struct.Struct("<IBBB")         # title index, level, credits, grade code
+_GRADE_CODES = "AMEN"
+_REC_KEYS, _STATE_KEYS = ("salt","pw","v","state"), ("dark","chat_history","grades")
+
+def _packable(g)->bool:# grades make_grade would produce; anything else goes into the record's JSON extra
+    return (type(g) is dict and len(g)==4 and type(g.get("title")) is str and "\0" not in g["title"]
+            and type(g.get("level")) is int and 0<=g["level"]<256 and type(g.get("credits")) is int
+            and 0<=g["credits"]<256 and g.get("grade") in ("A","M","E","N"))
+
+def encode_store(data:dict)->bytes:
+    """
+    STORE_MAGIC store file:
+      header   _STORE_HEAD; then top-level keys other than "users" as JSON (meta)
+      titles   u32 length + NUL-joined UTF-8: every distinct grade title once
+      records  per user: _STORE_REC, name, salt, pw, chat, grades (_STORE_GRADE each), extra JSON
+    The extra JSON carries everything without a packed field (bot, chat_archive, chat_days,
+    unknown keys, unusual grades), so any store survives a round trip.
+    """
+    users = data["users"]; titles = {}; out = bytearray()
+    for name, u in users.items():
+        st = u.get("state") or {}; grades = st.get("grades") or []
+        xu = {k:v for k,v in u.items() if k not in _REC_KEYS}
+        xs = {k:v for k,v in st.items() if k not in _STATE_KEYS}
+        if not all(map(_packable, grades)): xs["grades"] = grades; grades = ()
+        packed = b"".join([_STORE_GRADE.pack(titles.setdefault(g["title"], len(titles)), g["level"], g["credits"],
+                                             _GRADE_CODES.index(g["grade"])) for g in grades])
+        extra = json.dumps({"u":xu, "s":xs}, ensure_ascii=False, separators=(",",":")).encode("utf-8") if xu or xs else b""
+        nb, sb, pb = name.encode("utf-8"), str(u.get("salt","")).encode("utf-8"), str(u.get("pw","")).encode("utf-8")
+        cb = (st.get("chat_history") or "").encode("utf-8")
+        size = _STORE_REC.size-4 + len(nb)+len(sb)+len(pb)+len(cb)+len(packed)+len(extra)
+        out += _STORE_REC.pack(size, len(nb), len(sb), len(pb), u.get("v",0), bool(st.get("dark")),
+                               len(cb), len(grades), len(extra))
+        out += nb; out += sb; out += pb; out += cb; out += packed; out += extra
+    meta = json.dumps({k:v for k,v in data.items() if k!="users"}, separators=(",",":")).encode("utf-8")
+    blob = "\0".join(titles).encode("utf-8")
+    return b"".join((_STORE_HEAD.pack(STORE_MAGIC, STORE_VERSION, len(titles), len(users), len(meta)), meta,
+                     len(blob).to_bytes(4,"little"), blob, out))
+
+def _decode_record(mv:memoryview, off:int, titles:list)->tuple[str,dict,int]:# -> (name, record, next offset)
+    size, nl, sl, pl, v, flags, cl, ng, xl = _STORE_REC.unpack_from(mv, off)
+    end = off+4+size; p = off+_STORE_REC.size
+    name = str(mv[p:p+nl], "utf-8"); p += nl
+    salt = str(mv[p:p+sl], "utf-8"); p += sl
+    pw = str(mv[p:p+pl], "utf-8"); p += pl
+    chat = str(mv[p:p+cl], "utf-8"); p += cl
+    grades = [{"title":titles[t], "level":l, "credits":c, "grade":_GRADE_CODES[g]}
+              for t,l,c,g in _STORE_GRADE.iter_unpack(mv[p:p+ng*_STORE_GRADE.size])]
+    p += ng*_STORE_GRADE.size
+    st = {"dark":bool(flags & 1), "chat_history":chat, "grades":grades}; u = {"salt":salt, "pw":pw, "v":v, "state":st}
+    if xl:
+        x = json.loads(str(mv[p:p+xl], "utf-8")); st.update(x["s"]); u.update(x["u"])
+    if p+xl!=end: raise ValueError(f"store record for {name!r} is {end-p-xl:+d} bytes off")
+    return name, u, end
+
+def _decode_head(mv:memoryview)->tuple[dict,list,int,int]:# -> (meta, titles, users, first record offset)
+    magic, ver, nt, nu, ml = _STORE_HEAD.unpack_from(mv, 0)
+    if magic!=STORE_MAGIC: raise StoreFormatError("not a binary Gradus store")
+    if ver>STORE_VERSION: raise StoreFormatError(f"store format v{ver} is newer than this Gradus (v{STORE_VERSION})")
+    p = _STORE_HEAD.size; meta = json.loads(str(mv[p:p+ml], "utf-8")); p += ml
+    bl = int.from_bytes(mv[p:p+4], "little"); p += 4
+    titles = str(mv[p:p+bl], "utf-8").split("\0") if nt else []
+    if len(titles)!=nt: raise ValueError("store title table is damaged")
+    return meta, titles, nu, p+bl
+
+def decode_store(buf)->dict:# bytes / mmap -> store dict; fields are sliced from one memoryview, never copied first
+    with memoryview(buf) as mv:
+        meta, titles, nu, p = _decode_head(mv); users = {}
+        for _ in range(nu):
+            name, u, p = _decode_record(mv, p, titles); users[name] = u
+        if p!=len(mv): raise ValueError("trailing bytes after the last store record")
+    meta["users"] = users
+    return meta
+
+def store_format(path:str)->str|None:# "binary" / "json" from the first bytes; None if there is no file
+    try:
+        with open(path, "rb") as f: return "binary" if f.read(len(STORE_MAGIC))==STORE_MAGIC else "json"
+    except FileNotFoundError: return None
+
+def read_store(path:str)->dict:# either format, sniffed from the first bytes
+    with open(path, "rb") as f:
+        if f.read(len(STORE_MAGIC))!=STORE_MAGIC:
+            f.seek(0); return json.loads(f.read().decode("utf-8"))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m: return decode_store(m)
+
+def iter_store_users(path:str):# (username, record) one at a time: big stores are never decoded whole
+    with open(path, "rb") as f:
+        if f.read(len(STORE_MAGIC))!=STORE_MAGIC:
+            f.seek(0); yield from json.loads(f.read().decode("utf-8")).get("users",{}).items(); return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m, memoryview(m) as mv:
+            _, titles, nu, p = _decode_head(mv)
+            for _ in range(nu):
+                name, u, p = _decode_record(mv, p, titles); yield name, u
+
+def write_store(path:str, data:dict, fmt:str="json"):# atomic; "json" is the export / debugging format
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if fmt=="json":
+        with open(tmp,"w",encoding="utf-8") as f: json.dump(data,f,indent=2)
+    else:
+        with open(tmp,"wb") as f: f.write(encode_store(data))
+    os.replace(tmp, path)
 
 class UserStore:
     """
@@ -45,109 +458,1040 @@ class UserStore:
       "users": {
         "<username>": {
           "salt": "...",
-          "pw": "...sha256...",
-          "state": {"dark": false, "chat_history": "", "grades": []}
+          "pw": "pbkdf2_sha256$<iterations>$<hex>",   (legacy: plain sha256 hex)
+          "v": 3,                                      (bumped on every write of this record)
+          "state": {"dark": false, "chat_history": "", "grades": [], "bot": {"name": null, "field": null}},
+          "chat_archive": [{"codec": "zlib", "lines": 1000, "data": "<base64>"}, ...],  (optional)
+          "chat_days": [[<date ordinal>, <first line no.>], ...]     (which day each chat line was saved)
+          "role": "adviser"                                           (optional; absent = student)
         }
-      }
+      },
+      "cohort": {"version": 1, "users": 2, "n": {"credits.1": 40, "rank.212": 1, ...}}   (see CohortStats)
     }
+    On disk this is the dict above as JSON, or the binary layout of encode_store; either is
+    read, and a store is always written back in the format it already has. New stores use
+    GRADUS_STORE_FORMAT (json unless set to binary); gradus_store.py convert switches one.
+    With a chat codec (GRADUS_CHAT_CODEC=zlib|lzma), only the last `chat_hot` lines stay
+    in state.chat_history; older lines are compressed once into append-only archive
+    segments of at least CHAT_SEGMENT lines. chat_full() joins archive + hot text.
+    The chat search index for a user lives next to the store, in chat_index_path().
+    Cohort rollups are adjusted by each save_state from the grades it replaces, so
+    cohort() answers without reading every account.
+    Several processes may share one file: every write takes an advisory lock on
+    <path>.lock, re-reads the file only if its (mtime, size, inode) stamp moved, and
+    replaces it atomically. save_state merges field-by-field against the state this
+    process last saw, so concurrent sessions don't drop each other's changes.
     """
-    def __init__(self, path=USERS_FILE):
+    def __init__(self, path=USERS_FILE, chat_codec:str|None=None, chat_hot:int|None=None, fmt:str|None=None):
         self.path = path
+        self.fmt = fmt            # None: keep the file's own format (STORE_FORMAT for a new file)
+        if (fmt or STORE_FORMAT) not in ("binary","json"): raise ValueError(f"Unknown store format: {fmt or STORE_FORMAT}")
+        self._disk_fmt = None     # format of the file as we last read it
+        self.chat_codec = (chat_codec if chat_codec is not None else os.environ.get("GRADUS_CHAT_CODEC","")).lower() or None
+        if self.chat_codec not in (None,"zlib","lzma"): raise ValueError(f"Unknown chat codec: {self.chat_codec}")
+        self.chat_hot = chat_hot if chat_hot is not None else int(os.environ.get("GRADUS_CHAT_HOT","500"))
         self.data = {"users": {}}
+        self._stamp = None        # stat of the file as we last read/wrote it
+        self._seen = {}           # username -> record version this process last saw
+        self._base = {}           # username -> copy of the state as last seen (merge base)
+        self._segs = {}           # username -> chat archive segments as last seen
+        self._mx = threading.RLock(); self._depth = 0; self._lockf = None
         self._load_or_init()
 
-    def _load_or_init(self):
-        if os.path.exists(self.path):
-            try:
-                with open(self.path,"r",encoding="utf-8") as f:
-                    self.data = json.load(f)
+    # --- locking / change detection ---
+    def _stat(self):
+        try: st = os.stat(self.path); return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError: return None
+
+    @contextlib.contextmanager
+    def _locked(self):# re-entrant; flock on a side file because the data file gets replaced
+        with self._mx:
+            if self._depth==0:
+                self._lockf = open(self.path+".lock","a+")
+                if fcntl: fcntl.flock(self._lockf, fcntl.LOCK_EX)
+            self._depth += 1
+            try: yield
+            finally:
+                self._depth -= 1
+                if self._depth==0:
+                    if fcntl: fcntl.flock(self._lockf, fcntl.LOCK_UN)
+                    self._lockf.close(); self._lockf = None
+
+    def _read(self):
+        stamp = self._stat()
+        if stamp is None: self.data = {"users": {}}
+        else:
+            try: self.data = read_store(self.path); self._disk_fmt = store_format(self.path)
+            except StoreFormatError: raise   # readable by something else: keep the file where it is
             except Exception:
                 try: os.replace(self.path, self.path+".corrupt.bak")
                 except: pass
-                self.data = {"users": {}}
+                self.data = {"users": {}}; stamp = None
         if "users" not in self.data: self.data["users"]={}
-        if "demo" not in self.data["users"]:
-            self.create_user("demo","student123")
-        self._save()
+        self._stamp = stamp
 
-    def _save(self):
-        with open(self.path,"w",encoding="utf-8") as f: json.dump(self.data,f,indent=2)
+    def _refresh(self):# cheap when nobody else wrote: one stat()
+        if self._stat()!=self._stamp:
+            with self._locked(): self._read()
 
-    def create_user(self, username:str, password:str):
+    def _load_or_init(self):
+        with self._locked():
+            self._read()
+            if "demo" not in self.data["users"]:
+                self.create_user("demo","student123")
+            if self._stamp is None: self._save()
+
+    @METRICS.timed("store.save")
+    def _save(self):# caller holds the lock
+        self._disk_fmt = self.fmt or self._disk_fmt or STORE_FORMAT
+        write_store(self.path, self.data, self._disk_fmt)
+        self._stamp = self._stat(); METRICS.observe("store.bytes", self._stamp[1])
+
+    @contextlib.contextmanager
+    def _transaction(self):# lock, pick up other processes' writes, mutate, write once
+        with self._locked():
+            self._refresh()
+            yield self.data["users"]
+            self._save()
+
+    # --- accounts ---
+    def check_new_user(self, username:str, password:str):# raises ValueError; no hashing
         if not USERNAME_RE.match(username):
             raise ValueError("Username must be 3–32 chars (letters/digits/_).")
+        self._refresh()
         if username in self.data["users"]:
             raise ValueError("Username already exists.")
         if len(password)<8:
             raise ValueError("Password must be at least 8 characters.")
+
+    def create_user(self, username:str, password:str):
+        self.check_new_user(username, password)
         salt = secrets.token_hex(16)
-        self.data["users"][username] = {"salt":salt, "pw":_hash_pw(password,salt),
-                                        "state":{"dark":False,"chat_history":"","grades":[]}}
-        self._save()
+        self.add_user(username, salt, _hash_pw(password,salt))
 
-    def verify(self, username:str, password:str)->bool:
+    def add_user(self, username:str, salt:str, pw_hash:str):# commit an already hashed account
+        with self._transaction() as users:
+            if username in users:
+                raise ValueError("Username already exists.")
+            users[username] = {"salt":salt, "pw":pw_hash, "v":1,
+                               "state":{"dark":False,"chat_history":"","grades":[]}}
+            self._cohort_users(1)
+
+    def add_users(self, accounts)->list[str]:# bulk add_user in one write; returns names that already existed
+        taken = []
+        with self._transaction() as users:
+            n = len(users)
+            for username, salt, pw_hash in accounts:
+                if username in users: taken.append(username); continue
+                users[username] = {"salt":salt, "pw":pw_hash, "v":1,
+                                   "state":{"dark":False,"chat_history":"","grades":[]}}
+            self._cohort_users(len(users)-n)
+        return taken
+
+    def credentials(self, username:str)->tuple[str,str]|None:# (salt, stored hash)
+        self._refresh()
         u = self.data["users"].get(username)
-        if not u: return False
-        return _hash_pw(password,u["salt"])==u["pw"]
+        return (u["salt"], u["pw"]) if u else None
+
+    def set_password(self, username:str, salt:str, pw_hash:str):
+        with self._transaction() as users:
+            u = users[username]; u["salt"]=salt; u["pw"]=pw_hash; u["v"]=u.get("v",0)+1
+            if self._seen.get(username)==u["v"]-1: self._seen[username] = u["v"]   # state untouched: base still valid
+
+    def role(self, username:str)->str:# one of ROLES
+        self._refresh()
+        return (self.data["users"].get(username) or {}).get("role", "student")
+
+    def set_role(self, username:str, role:str):
+        if role not in ROLES: raise ValueError(f"Role must be one of {', '.join(ROLES)}.")
+        with self._transaction() as users:
+            u = users.get(username)
+            if not u: raise ValueError("User does not exist.")
+            if role=="student": u.pop("role", None)
+            else: u["role"] = role
+            u["v"] = u.get("v",0)+1
+            if self._seen.get(username)==u["v"]-1: self._seen[username] = u["v"]   # state untouched: base still valid
+
+    def verify(self, username:str, password:str)->bool:
+        c = self.credentials(username)
+        return bool(c) and _check_pw(password, *c)
 
     def change_password(self, username:str, old_pw:str, new_pw:str):
         if not self.verify(username, old_pw): raise ValueError("Current password incorrect.")
         if len(new_pw)<8: raise ValueError("New password must be at least 8 characters.")
         salt = secrets.token_hex(16)
-        self.data["users"][username]["salt"]=salt
-        self.data["users"][username]["pw"]=_hash_pw(new_pw,salt)
-        self._save()
+        self.set_password(username, salt, _hash_pw(new_pw,salt))
 
+    # --- per-user state ---
     def get_state(self, username:str)->dict:
+        self._refresh()
         u = self.data["users"].get(username)
         if not u: raise ValueError("User does not exist.")
         st = u.get("state") or {}
-        st.setdefault("dark", False); st.setdefault("chat_history",""); st.setdefault("grades",[])
+        st.setdefault("dark", False); st.setdefault("chat_history",""); st.setdefault("grades",[]); st.setdefault("bot",{})
+        self._seen[username] = u.get("v",0); self._base[username] = copy.deepcopy(st)
+        self._segs[username] = len(u.get("chat_archive",[]))
         return st
 
     def save_state(self, username:str, state:dict):
-        if username not in self.data["users"]: raise ValueError("User does not exist.")
-        self.data["users"][username]["state"] = {
+        grades = state.get("grades")
+        ours = {
             "dark": bool(state.get("dark", False)),
             "chat_history": state.get("chat_history","") or "",
-            "grades": state.get("grades",[]) or []
+            "grades": grades if grades is not None else [],   # the caller's list itself, even when empty
+            "bot": dict(state.get("bot") or {})
         }
-        self._save()
+        with self._transaction() as users:
+            u = users.get(username)
+            if u is None: raise ValueError("User does not exist.")
+            v = u.get("v",0)
+            if username in self._seen and v!=self._seen[username]:
+                # another process saved this user since we last looked
+                base, theirs = self._base.get(username,{}), u.get("state") or {}
+                moved = "".join(map(_unpack_chat, u.get("chat_archive",[])[self._segs.get(username,0):]))
+                if moved:   # they archived lines we still hold: merge against their full text
+                    theirs = dict(theirs, chat_history=moved+(theirs.get("chat_history") or ""))
+                for k in ours:
+                    if k in theirs: ours[k] = _merge_field(k, base.get(k), ours[k], theirs[k])
+                if moved and ours["chat_history"].startswith(moved): ours["chat_history"] = ours["chat_history"][len(moved):]
+            self._note_chat_day(u, ours["chat_history"])
+            if self.chat_codec: self._archive_chat(u, ours)
+            # get_state hands out the live dict, so u["state"] may already hold our edits;
+            # what was last written is the merge base, unless the record was just re-read
+            old = (self._base[username] if self._seen.get(username)==v and username in self._base
+                   else u.get("state") or {}).get("grades") or []
+            if old!=ours["grades"] and (r := self._cohort_live()):
+                _cohort_apply(r["n"], cohort_counts(old), -1); _cohort_apply(r["n"], cohort_counts(ours["grades"]), +1)
+            u["state"] = ours; u["v"] = v+1
+            self._seen[username] = v+1; self._base[username] = copy.deepcopy(ours)
+            self._segs[username] = len(u.get("chat_archive",[]))
+        return ours
+
+    # --- cohort rollups ---
+    def _cohort_live(self)->dict|None:# the rollups, if present and current; caller holds the lock
+        r = self.data.get("cohort")
+        return r if r and r.get("version")==COHORT_VERSION else None
+
+    def _cohort_users(self, added:int):# new accounts have no grades: only the head count moves
+        if added and (r := self._cohort_live()): r["users"] += added
+
+    def cohort(self)->"CohortStats":
+        """
+        The cohort rollups. They are rebuilt with one scan of every account when missing,
+        from an older version, or when the head count disagrees (accounts written by
+        something that bypasses save_state); otherwise this costs one stat().
+        """
+        self._refresh()
+        r = self._cohort_live()
+        if r is None or r["users"]!=len(self.data["users"]):
+            with self._transaction() as users:
+                self.data["cohort"] = r = build_cohort(users)
+        return CohortStats(r)
+
+    # --- chat retention ---
+    def _archive_chat(self, u:dict, state:dict):# move all but the last chat_hot lines into a new segment
+        hot = state["chat_history"]; extra = hot.count("\n") - self.chat_hot
+        if extra < CHAT_SEGMENT: return
+        cut = -1
+        for _ in range(extra): cut = hot.index("\n", cut+1)
+        u.setdefault("chat_archive", []).append(_pack_chat(hot[:cut+1], self.chat_codec))
+        state["chat_history"] = hot[cut+1:]
+
+    def _note_chat_day(self, u:dict, hot:str):# start a chat_days run when today's first new lines are saved
+        days = u.setdefault("chat_days", []); today = datetime.date.today().toordinal()
+        if days and days[-1][0]==today: return
+        old = ((u.get("state") or {}).get("chat_history") or "").count("\n")
+        if hot.count("\n") > old: days.append([today, sum(s["lines"] for s in u.get("chat_archive",[])) + old])
+
+    def chat_archived(self, username:str, lines:int|None=None)->str:# decompressed archive segments, oldest first
+        self._refresh()
+        u = self.data["users"].get(username)
+        if not u: raise ValueError("User does not exist.")
+        text = "".join(map(_unpack_chat, u.get("chat_archive",[])))
+        return text if lines is None else "".join(text.splitlines(True)[:lines])
+
+    def chat_archived_lines(self, username:str)->int:# archived lines that precede this process's in-memory chat
+        u = self.data["users"].get(username) or {}
+        return sum(s["lines"] for s in u.get("chat_archive",[])[:self._segs.get(username,0)])
+
+    def chat_full(self, username:str)->str:
+        return self.chat_archived(username) + ((self.data["users"][username].get("state") or {}).get("chat_history") or "")
+
+    def chat_days(self, username:str)->list:
+        return list((self.data["users"].get(username) or {}).get("chat_days",[]))
+
+    def chat_index_path(self, username:str)->str:
+        return os.path.join(self.path+".chatidx", username+".json")
+
+    def clear_chat(self, username:str):
+        with contextlib.suppress(FileNotFoundError): os.remove(self.chat_index_path(username))
+        with self._transaction() as users:
+            u = users[username]; u.pop("chat_archive", None); u.pop("chat_days", None)
+            (u.setdefault("state",{}))["chat_history"] = ""; u["v"] = u.get("v",0)+1
+            self._seen[username] = u["v"]; self._base.setdefault(username,{})["chat_history"] = ""; self._segs[username] = 0
+
+CHAT_SEGMENT = 1000   # minimum lines per compressed chat segment
+
+def _pack_chat(text:str, codec:str)->dict:
+    raw = text.encode("utf-8")
+    if codec=="lzma":
+        import lzma; data = lzma.compress(raw, preset=6)
+    else: data = zlib.compress(raw, 9)
+    return {"codec":codec, "lines":text.count("\n"), "data":base64.b64encode(data).decode("ascii")}
+
+def _unpack_chat(seg:dict)->str:
+    data = base64.b64decode(seg["data"])
+    if seg.get("codec")=="lzma":
+        import lzma; return lzma.decompress(data).decode("utf-8")
+    return zlib.decompress(data).decode("utf-8")
+
+def _merge_field(key, base, ours, theirs):# 3-way merge of one state field
+    if ours==base: return theirs
+    if theirs==base: return ours
+    if key=="grades":   # apply our adds/removes on top of theirs
+        k = lambda g: (g["title"], g["level"], g["credits"], g["grade"])
+        gone = collections.Counter(map(k, base or [])); gone.subtract(map(k, ours))
+        out = []
+        for g in theirs:
+            if gone[k(g)]>0: gone[k(g)] -= 1
+            else: out.append(g)
+        added = collections.Counter(map(k, ours)); added.subtract(map(k, base or []))
+        for g in ours:
+            if added[k(g)]>0: added[k(g)] -= 1; out.append(g)
+        return out
+    if key=="chat_history" and base is not None and ours.startswith(base) and theirs.startswith(base):
+        return theirs + ours[len(base):]
+    return ours
+
+# ---------------- credentials (hashing off the UI thread) ----------------
+class Credentials:
+    """
+    Runs KDF work in a small thread pool (pbkdf2_hmac releases the GIL) and hands
+    results back through `done` callbacks. Store writes happen in the callbacks, i.e.
+    on the caller's (Tk) thread: pass `after=root.after` to get that; without it the
+    callback runs on the worker thread once the KDF finishes, and the *_async call
+    returns at once. Successful verifies are cached under a keyed digest of
+    the password, so a relogin skips the KDF; old hashes are upgraded on login.
+    `done` is always called: if the KDF or a store read/write raises, it gets the
+    failure result with an error message for the user.
+    """
+    def __init__(self, store:UserStore, workers:int=2, after=None, cache_size:int=256):
+        self.store = store
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gradus-kdf")
+        self.after = after
+        self._key = secrets.token_bytes(16)
+        self._ok = collections.OrderedDict(); self._lock = threading.Lock(); self._size = cache_size
+
+    def close(self): self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _deliver(self, fut, finish, fail):# finish(result), or fail(exc) if the job or finish raised
+        def run(f):
+            try: finish(f.result())
+            except Exception as e: fail(e)
+        if self.after is None: fut.add_done_callback(run); return
+        def poll():
+            if fut.done(): run(fut)
+            else: self.after(15, poll)
+        self.after(15, poll)
+
+    def _cache_key(self, username, stored, pw):
+        return (username, stored, hashlib.blake2b(pw.encode("utf-8"), key=self._key, digest_size=16).digest())
+
+    def _verify_job(self, username, pw, salt, stored):# worker: (ok, upgraded (salt, hash) | None)
+        k = self._cache_key(username, stored, pw)
+        with self._lock:
+            if k in self._ok: self._ok.move_to_end(k); return True, None
+        if not _check_pw(pw, salt, stored): return False, None
+        new = None
+        if _needs_rehash(stored):
+            salt = secrets.token_hex(16); new = (salt, _hash_pw(pw, salt)); stored = new[1]
+        with self._lock:
+            self._ok[self._cache_key(username, stored, pw)] = True
+            while len(self._ok) > self._size: self._ok.popitem(last=False)
+        return True, new
+
+    def verify_async(self, username:str, pw:str, done):# done(ok: bool, error message | None)
+        fail = lambda e: done(False, f"Could not check the password: {e}")
+        try: c = self.store.credentials(username)
+        except Exception as e: fail(e); return
+        if not c: done(False, None); return
+        def finish(res):
+            ok, new = res
+            if ok and new and self.store.credentials(username)==c: self.store.set_password(username, *new)
+            done(ok, None)
+        self._deliver(self.pool.submit(self._verify_job, username, pw, *c), finish, fail)
+
+    def verify_future(self, username:str, pw:str):# Future[bool]; store read, KDF and upgrade all on a worker (asyncio)
+        def job():
+            c = self.store.credentials(username)
+            if not c: return False
+            ok, new = self._verify_job(username, pw, *c)
+            if ok and new and self.store.credentials(username)==c: self.store.set_password(username, *new)
+            return ok
+        return self.pool.submit(job)
+
+    def create_async(self, username:str, pw:str, done):# done(error message | None)
+        try: self.store.check_new_user(username, pw)
+        except ValueError as e: done(str(e)); return
+        except Exception as e: done(f"Could not create the account: {e}"); return
+        def job():
+            salt = secrets.token_hex(16); return salt, _hash_pw(pw, salt)
+        def finish(res):
+            try: self.store.add_user(username, *res)
+            except ValueError as e: done(str(e)); return
+            done(None)
+        self._deliver(self.pool.submit(job), finish, lambda e: done(f"Could not create the account: {e}"))
+
+    def change_async(self, username:str, old_pw:str, new_pw:str, done):# done(error message | None)
+        if len(new_pw)<8: done("New password must be at least 8 characters."); return
+        fail = lambda e: done(f"Could not change the password: {e}")
+        try: c = self.store.credentials(username)
+        except Exception as e: fail(e); return
+        if not c: done("User does not exist."); return
+        def job():
+            if not _check_pw(old_pw, *c): return None
+            salt = secrets.token_hex(16); return salt, _hash_pw(new_pw, salt)
+        def finish(res):
+            if res is None: done("Current password incorrect."); return
+            self.store.set_password(username, *res); done(None)
+        self._deliver(self.pool.submit(job), finish, fail)
+
+# ---------------- rank score ----------------
+GRADE_POINTS = {"A":4, "M":3, "E":2}   # points per credit; N earns nothing
+RANK_CREDITS = 80                      # best 80 Level 3 credits count
+SUBJECT_CAP  = 24                      # at most 24 credits from one subject
+SUBJECT_RE   = re.compile(r"^\s*([^\d\s].*?)\s*(?:\b(?:AS|US)?\d|[:(\-–]|$)")
+
+def subject_of(title:str)->str:# "Physics 3.1 Mechanics" -> "physics"
+    m = SUBJECT_RE.match(title)
+    return (m.group(1) if m else title).strip().lower()
+
+class RankScore:
+    """
+    Incremental NCEA rank score over a list of grade dicts.
+    Points only take a handful of values, so each subject keeps a credit count per
+    point value; add/remove re-caps one subject and adjusts the global buckets: O(1).
+    """
+    def __init__(self, grades=()):
+        self._pts = sorted(set(GRADE_POINTS.values()), reverse=True)
+        self.reset(grades)
+
+    def reset(self, grades=()):
+        self._raw = {}                          # subject -> {points: credits}
+        self._tot = {p:0 for p in self._pts}    # capped credits per points, all subjects
+        for g in grades: self.add(g)
+
+    def _capped(self, raw:dict)->dict:# best SUBJECT_CAP credits of one subject
+        out, left = {}, SUBJECT_CAP
+        for p in self._pts:
+            take = min(raw.get(p,0), left); out[p] = take; left -= take
+        return out
+
+    def _update(self, g:dict, sign:int):
+        p = GRADE_POINTS.get(str(g.get("grade","")).upper())
+        if not p or int(g.get("level",0))!=3: return
+        subj = subject_of(str(g.get("title","")))
+        raw = self._raw.setdefault(subj, {})
+        for q,c in self._capped(raw).items(): self._tot[q] -= c
+        raw[p] = raw.get(p,0) + sign*int(g.get("credits",0))
+        if not any(raw.values()): del self._raw[subj]; return
+        for q,c in self._capped(raw).items(): self._tot[q] += c
+
+    def add(self, g:dict): self._update(g, +1)
+    def remove(self, g:dict): self._update(g, -1)
+
+    @property
+    def credits(self)->int: return min(RANK_CREDITS, sum(self._tot.values()))
+
+    @property
+    def score(self)->int:
+        total, left = 0, RANK_CREDITS
+        for p in self._pts:
+            take = min(self._tot[p], left); total += take*p; left -= take
+        return total
+
+# ---------------- totals / endorsements (UI-free) ----------------
+ENDORSE_CERT   = 50   # credits at M/A at a level (or above) to endorse the certificate
+ENDORSE_COURSE = 14   # credits at M/A in one subject to endorse the course
+
+def make_grade(title, level, credits, grade)->dict:# validated grade record; ValueError otherwise
+    title=str(title).strip(); level=int(level); credits=int(credits); grade=str(grade).strip().upper()
+    if not title: raise ValueError("Enter title.")
+    if level not in (1,2,3) or not (1<=credits<=24): raise ValueError("Level 1–3; Credits 1–24.")
+    if grade not in ("A","M","E","N"): raise ValueError("Grade must be A/M/E/N.")
+    return {"title":title,"level":level,"credits":credits,"grade":grade}
+
+CSV_HEADER = ["Title","Level","Credits","Grade"]
+
+@METRICS.timed("csv.export")
+def write_grades_csv(path:str, grades):
+    import csv
+    with open(path,"w",newline="",encoding="utf-8") as f:
+        w=csv.writer(f); w.writerow(CSV_HEADER)
+        w.writerows([g["title"],g["level"],g["credits"],g["grade"]] for g in grades)
+
+@METRICS.timed("csv.import")
+def read_grades_csv(path:str)->list:# valid rows only; a non-numeric Level/Credits raises ValueError
+    import csv
+    loaded=[]
+    with open(path,"r",encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            title=row.get("Title","").strip()
+            level=int(row.get("Level","0")); credits=int(row.get("Credits","0"))
+            grade=row.get("Grade","A").strip().upper()
+            if title and level in (1,2,3) and 1<=credits<=24 and grade in ("A","M","E","N"):
+                loaded.append({"title":title,"level":level,"credits":credits,"grade":grade})
+    return loaded
+
+# --- bulk ingest: many CSVs, parsed concurrently, deduplicated against what's recorded ---
+def grade_key(g:dict)->tuple:# identity of a result for duplicate detection
+    return (" ".join(g["title"].split()).casefold(), int(g["level"]), int(g["credits"]), g["grade"])
+
+def parse_grades_csv(path:str)->tuple[list,list]:# like read_grades_csv, but bad rows are reported, not raised
+    import csv
+    rows, rejected = [], []
+    try:
+        with open(path,"r",encoding="utf-8-sig",newline="") as f:
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                try: rows.append(make_grade(row.get("Title") or "", row.get("Level") or 0,
+                                            row.get("Credits") or 0, row.get("Grade") or "A"))
+                except ValueError as e: rejected.append((path, line, str(e)))
+    except (OSError, UnicodeDecodeError) as e: rejected.append((path, None, str(e)))
+    return rows, rejected
+
+def csv_paths(paths)->list[str]:# files as given; folders expand to their *.csv, sorted
+    out = []
+    for p in paths:
+        if os.path.isdir(p): out += sorted(os.path.join(p, n) for n in os.listdir(p) if n.lower().endswith(".csv"))
+        else: out.append(p)
+    return out
+
+@METRICS.timed("grades.ingest")
+def ingest_grades(paths, existing:list, workers:int|None=None, processes:bool=False)->dict:
+    """
+    Parse every CSV (threads, or processes for big CLI batches) and keep rows whose
+    grade_key is not already recorded or earlier in the batch. Re-running the same files
+    inserts nothing. -> {"inserted": [...], "duplicates": n, "rejected": [(file, line, why)], "files": n}
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    files = csv_paths(paths)
+    pool = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=workers)
+    with pool: parsed = list(pool.map(parse_grades_csv, files))
+    seen = set(map(grade_key, existing)); inserted, dup, rejected = [], 0, []
+    for rows, bad in parsed:
+        rejected += bad
+        for g in rows:
+            k = grade_key(g)
+            if k in seen: dup += 1
+            else: seen.add(k); inserted.append(g)
+    return {"inserted": inserted, "duplicates": dup, "rejected": rejected, "files": len(files)}
+
+def grade_totals(grades)->dict:# {1: L1 credits, 2: ..., 3: ..., "all": total}
+    lv={1:0,2:0,3:0,"all":0}
+    for g in grades:
+        l=int(g["level"]); c=int(g["credits"]); lv[l]+=c; lv["all"]+=c
+    return lv
+
+def endorsements(grades)->dict:
+    """
+    {"cert": {level: "Excellence"|"Merit"}, "course": {(level, subject): "Excellence"|"Merit"}}
+    Grade A counts as Excellence, M as Merit.
+    """
+    hi={1:[0,0],2:[0,0],3:[0,0]}; course={}
+    for g in grades:
+        gr=str(g["grade"]).upper()
+        if gr not in ("A","M"): continue
+        l=int(g["level"]); c=int(g["credits"]); k=0 if gr=="A" else 1
+        for lv in range(1,l+1): hi[lv][k]+=c   # higher-level credits count toward lower certificates
+        course.setdefault((l,subject_of(g["title"])),[0,0])[k]+=c
+    def grade(a,m,need): return "Excellence" if a>=need else "Merit" if a+m>=need else None
+    return {"cert":{l:e for l,(a,m) in hi.items() if (e:=grade(a,m,ENDORSE_CERT))},
+            "course":{k:e for k,(a,m) in course.items() if (e:=grade(a,m,ENDORSE_COURSE))}}
+
+# ---------------- cohort analytics ----------------
+COHORT_VERSION = 1
+COHORT_BUCKET  = 10   # credits per histogram bucket
+COHORT_BUCKETS = 12   # buckets 0–9 … 110–119, then one open-ended 120+
+
+def cohort_counts(grades)->dict:
+    """
+    One account's contribution to the cohort rollups, as flat counters:
+    graded, credits.<level>, mix.<level>.<grade> (credits), hist.<level>.<bucket>, rank.<score>.
+    An account without grades contributes nothing (it is only in the head count).
+    """
+    if not grades: return {}
+    n = {"graded": 1}; lv = grade_totals(grades)
+    for g in grades:
+        k = f"mix.{int(g['level'])}.{str(g['grade']).upper()}"; n[k] = n.get(k,0)+int(g["credits"])
+    for l in (1,2,3):
+        n[f"credits.{l}"] = lv[l]; n[f"hist.{l}.{min(lv[l]//COHORT_BUCKET, COHORT_BUCKETS)}"] = 1
+    n[f"rank.{RankScore(grades).score}"] = 1
+    return n
+
+def _cohort_apply(n:dict, counts:dict, sign:int):# add (+1) or take back (-1) one account's counters
+    for k,v in counts.items():
+        v = n.get(k,0) + sign*v
+        if v: n[k] = v
+        else: n.pop(k, None)
+
+def build_cohort(users:dict)->dict:# full scan; UserStore keeps the result current from then on
+    n = {}
+    for u in users.values(): _cohort_apply(n, cohort_counts((u.get("state") or {}).get("grades") or []), +1)
+    return {"version": COHORT_VERSION, "users": len(users), "n": n}
+
+class CohortStats:
+    """
+    Queries over the cohort rollups. Nothing here depends on the number of accounts:
+    histograms have COHORT_BUCKETS+1 bins and rank scores only run from 0 to 320.
+    Means and rates are over accounts with at least one grade.
+    """
+    def __init__(self, r:dict): self.users = r["users"]; self.n = dict(r["n"])
+
+    @property
+    def graded(self)->int: return self.n.get("graded", 0)
+
+    def credits(self)->dict:# {level: {"total", "mean", "hist": [accounts per bucket]}}
+        out = {}
+        for l in (1,2,3):
+            tot = self.n.get(f"credits.{l}", 0)
+            out[l] = {"total": tot, "mean": tot/self.graded if self.graded else 0.0,
+                      "hist": [self.n.get(f"hist.{l}.{b}", 0) for b in range(COHORT_BUCKETS+1)]}
+        return out
+
+    def mix(self)->dict:# {level: {"A": credits, "M": ..., "E": ..., "N": ...}}
+        return {l: {gr: self.n.get(f"mix.{l}.{gr}", 0) for gr in "AMEN"} for l in (1,2,3)}
+
+    def eligibility(self, courses)->dict:# {course: {"need", "eligible", "rate"}} against rank-score thresholds
+        ranks = [(int(k[5:]), c) for k,c in self.n.items() if k.startswith("rank.")]
+        return {course: {"need": need, "eligible": (k := sum(c for s,c in ranks if s>=need)),
+                         "rate": k/self.graded if self.graded else 0.0}
+                for course, need in courses.items()}
+
+    def summary(self, courses)->dict:
+        return {"users": self.users, "graded": self.graded, "credits": self.credits(),
+                "mix": self.mix(), "eligibility": self.eligibility(courses)}
+
+# ---------------- standards autocomplete ----------------
+STANDARD_WORD_RE = re.compile(r"[a-z0-9]+")
+
+class StandardsIndex:
+    """
+    As-you-type lookup over the standards list (number, subject, code, title, level, credits).
+    Every word of an entry's label, plus its bare number, goes into one sorted key list with
+    a parallel array('I') of entry ids. A query bisects the key range of its most selective
+    word prefix and checks its other words against that entry's word set. At most SCAN
+    entries of that range are examined, so a query like "a b" stays cheap on any list size.
+    """
+    SCAN = 4096
+    def __init__(self, entries:list[tuple]):
+        self.entries = entries; self.words = []; pairs = []
+        for i,e in enumerate(entries):
+            ws = set(STANDARD_WORD_RE.findall(self.label(i).lower())) | {e[0].lower().lstrip("asu")}
+            self.words.append(tuple(ws)); pairs += ((w,i) for w in ws)
+        pairs.sort(); self.keys = [w for w,_ in pairs]; self.ids = array("I", (i for _,i in pairs))
+
+    @classmethod
+    def read_csv(cls, path:str):# number,subject,code,title,level,credits
+        import csv
+        with open(path,"r",newline="",encoding="utf-8-sig") as f:
+            return cls([(r["number"].strip(), r["subject"].strip(), r["code"].strip(), r["title"].strip(),
+                         int(r["level"]), int(r["credits"])) for r in csv.DictReader(f)])
+
+    def label(self, i:int)->str:# the grade title a pick fills in: "Physics 3.4 Demonstrate … (AS91524)"
+        number, subject, code, title, _, _ = self.entries[i]
+        return f"{subject} {code} {title} ({number})"
+
+    @METRICS.timed("standards.suggest")
+    def suggest(self, text:str, limit:int=8)->list[int]:# entry ids whose words start with every query word
+        qs = STANDARD_WORD_RE.findall(text.lower())
+        if not qs: return []
+        spans = [(bisect.bisect_left(self.keys, q), bisect.bisect_left(self.keys, q+"\uffff"), q) for q in qs]
+        lo, hi, q0 = min(spans, key=lambda r: r[1]-r[0]); rest = [q for q in qs if q!=q0]
+        out, seen = [], set()
+        for j in range(lo, min(hi, lo+self.SCAN)):
+            i = self.ids[j]
+            if i in seen: continue
+            seen.add(i)
+            if all(any(w.startswith(q) for w in self.words[i]) for q in rest):
+                out.append(i)
+                if len(out)>=limit: break
+        return out
+
+_STANDARDS = {}
+
+def standards_index(path:str=STANDARDS_CSV)->StandardsIndex|None:# cached; None when there is no list
+    if path not in _STANDARDS:
+        try: _STANDARDS[path] = StandardsIndex.read_csv(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[standards] {e}", file=sys.stderr); _STANDARDS[path] = None
+    return _STANDARDS[path]
+
+# ---------------- career recommender ----------------
+LEVEL_WEIGHT = {1:0.5, 2:0.75, 3:1.0}
+SUBJECT_ALIASES = {"maths":"mathematics", "math":"mathematics", "stats":"statistics", "calc":"calculus",
+                   "bio":"biology", "chem":"chemistry", "phys":"physics", "pe":"physical education",
+                   "dvc":"design and visual communication", "digital technology":"digital technologies",
+                   "computer science":"digital technologies", "programming":"digital technologies",
+                   "business":"business studies", "accountancy":"accounting", "econ":"economics",
+                   "visual arts":"art", "te reo":"te reo maori", "te reo māori":"te reo maori", "media":"media studies"}
+
+def subject_strengths(grades:list)->dict:
+    """subject -> share of the student's weighted achievement (credits × grade points × level weight)."""
+    acc = collections.defaultdict(float)
+    for g in grades:
+        pts = GRADE_POINTS.get(g["grade"], 0)
+        if pts:   # Not Achieved says little about aptitude
+            s = subject_of(g["title"]); acc[SUBJECT_ALIASES.get(s, s)] += g["credits"]*pts*LEVEL_WEIGHT.get(g["level"],1.0)
+    total = sum(acc.values())
+    return {s: v/total for s,v in acc.items()} if total else {}
+
+class CareerMatrix:
+    """
+    Career × subject weights, each career's weights scaled to unit length, so a student's
+    match is the cosine of their (unit) subject vector with the career's. Stored
+    subject-major: one float32 column over all careers per subject, so scoring touches only
+    the handful of subjects a student has. Built offline from career_subjects.csv by
+    `python gradus_careers.py build`; the .gmx file is
+      b"GMX1" + u32 header length + JSON {careers, fields, subjects} + float32[subjects][careers]
+    """
+    MAGIC = b"GMX1"
+    def __init__(self, careers:list, fields:list, subjects:list, data:array):
+        self.careers, self.fields, self.subjects = careers, fields, subjects
+        n = len(careers); self.col = {s: data[i*n:(i+1)*n] for i,s in enumerate(subjects)}
+        self.by_field = collections.defaultdict(list)
+        for i,f in enumerate(fields): self.by_field[f].append(i)
+        self._np = np.frombuffer(data.tobytes(), dtype=np.float32).reshape(len(subjects), n) if np is not None and n else None
+        self._row = {s:i for i,s in enumerate(subjects)}
+        # without numpy: each column as its non-zero (career, weight) pairs; careers list only a few subjects
+        self._nz = {s: [(i,x) for i,x in enumerate(c) if x] for s,c in self.col.items()} if self._np is None else None
+
+    @classmethod
+    def from_rows(cls, rows):# rows of (career, field, {subject: weight})
+        rows = list(rows); subjects = sorted({s for _,_,w in rows for s in w}); n = len(rows)
+        at = {s:i*n for i,s in enumerate(subjects)}; data = array("f", bytes(4*n*len(subjects)))
+        for j,(_,_,w) in enumerate(rows):
+            norm = sum(x*x for x in w.values())**0.5 or 1.0
+            for s,x in w.items(): data[at[s]+j] = x/norm
+        return cls([r[0] for r in rows], [r[1] for r in rows], subjects, data)
+
+    @classmethod
+    def read_csv(cls, path:str):# career,field,subjects  with subjects like "physics:4;calculus:3"
+        import csv
+        rows = []
+        with open(path,"r",newline="",encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                w = {}
+                for part in (r.get("subjects") or "").split(";"):
+                    s, _, x = part.rpartition(":")
+                    if s.strip(): s = s.strip().lower(); w[SUBJECT_ALIASES.get(s, s)] = float(x)
+                rows.append((r["career"].strip(), (r.get("field") or "").strip(), w))
+        return cls.from_rows(rows)
+
+    def save(self, path:str):
+        head = json.dumps({"careers":self.careers, "fields":self.fields, "subjects":self.subjects}).encode("utf-8")
+        data = array("f")
+        for s in self.subjects: data.extend(self.col[s])
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp,"wb") as f: f.write(self.MAGIC + len(head).to_bytes(4,"little") + head + data.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path:str):
+        with open(path,"rb") as f: raw = f.read()
+        if raw[:4]!=cls.MAGIC: raise ValueError(f"{path}: not a career matrix")
+        n = int.from_bytes(raw[4:8],"little"); head = json.loads(raw[8:8+n])
+        data = array("f"); data.frombytes(raw[8+n:])
+        return cls(head["careers"], head["fields"], head["subjects"], data)
+
+    @METRICS.timed("careers.recommend")
+    def recommend(self, strengths:dict, k:int=10, field:str|None=None)->list[dict]:
+        """Top-k careers for a subject_strengths() dict: {career, field, score 0..1, because [(subject, share)]}."""
+        known = [(s,x) for s,x in strengths.items() if s in self.col]
+        norm = sum(x*x for _,x in known)**0.5
+        if not norm: return []
+        cand = self.by_field.get(field, []) if field else range(len(self.careers))
+        if self._np is not None:
+            v = np.zeros(len(self.subjects), dtype=np.float32)
+            for s,x in known: v[self._row[s]] = x/norm
+            scores = v @ self._np
+            idx = np.asarray(cand, dtype=np.intp)
+            if len(idx) > k: idx = idx[np.argpartition(-scores[idx], k)[:k]]
+            top = sorted(idx.tolist(), key=lambda i: -scores[i])
+        else:
+            scores = [0.0]*len(self.careers)
+            for s,x in known:
+                w = x/norm
+                for i,b in self._nz[s]: scores[i] += w*b
+            top = heapq.nlargest(k, cand, key=scores.__getitem__)
+        out = []
+        for i in top:
+            sc = float(scores[i])
+            if sc <= 0: break
+            parts = sorted(((s, x/norm*self.col[s][i]) for s,x in known if self.col[s][i]), key=lambda p: -p[1])
+            out.append({"career":self.careers[i], "field":self.fields[i], "score":sc,
+                        "because":[(s, c/sc) for s,c in parts[:3]]})
+        return out
+
+_CAREER_MATRICES = {}
+
+def career_matrix(csv_path:str=CAREER_CSV)->CareerMatrix|None:# the built .gmx if fresh, else parse the CSV; cached
+    if csv_path not in _CAREER_MATRICES:
+        gmx = os.path.splitext(csv_path)[0]+".gmx"; m = None
+        try:
+            if os.path.exists(gmx) and (not os.path.exists(csv_path) or os.path.getmtime(gmx) >= os.path.getmtime(csv_path)):
+                m = CareerMatrix.load(gmx)
+            elif os.path.exists(csv_path): m = CareerMatrix.read_csv(csv_path)
+        except (OSError, ValueError, KeyError) as e: print(f"[careers] {e}", file=sys.stderr)
+        _CAREER_MATRICES[csv_path] = m
+    return _CAREER_MATRICES[csv_path]
+
+# ---------------- chat search ----------------
+CHAT_ROLE_RE = re.compile(r"^\[\d\d:\d\d\] (You|FROST|System): ")
+CHAT_ROLES = {"You":"user", "FROST":"bot", "System":"sys"}
+ROLE_CODES = {"user":1, "bot":2, "sys":3}
+QUERY_ROLES = {"you":"user", "user":"user", "frost":"bot", "bot":"bot", "system":"sys", "sys":"sys"}
+CHAT_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def _query_day(val:str, today:datetime.date)->int:# ISO date | today | yesterday | 7d | 2w -> date ordinal
+    v = val.lower()
+    if v=="today": return today.toordinal()
+    if v=="yesterday": return today.toordinal()-1
+    m = re.fullmatch(r"(\d+)([dw])", v)
+    if m: return today.toordinal() - int(m.group(1))*(7 if m.group(2)=="w" else 1)
+    try: return datetime.date.fromisoformat(val).toordinal()
+    except ValueError: raise ValueError(f"Bad date: {val} (use YYYY-MM-DD, today, yesterday, 7d, 2w)")
+
+def parse_chat_query(text:str, today:datetime.date|None=None)->dict:
+    """'engin* role:frost since:7d' -> {"terms", "prefixes", "role", "since", "until"} (dates as ordinals)."""
+    today = today or datetime.date.today()
+    q = {"terms":[], "prefixes":[], "role":None, "since":None, "until":None}
+    for w in text.split():
+        key, sep, val = w.partition(":"); key = key.lower()
+        if sep and key=="role":
+            if val.lower() not in QUERY_ROLES: raise ValueError(f"Unknown role: {val} (you, frost or system)")
+            q["role"] = QUERY_ROLES[val.lower()]
+        elif sep and key in ("since","until"): q[key] = _query_day(val, today)
+        else:
+            toks = CHAT_TOKEN_RE.findall(w.lower())
+            if toks and w.endswith("*") and len(toks[-1])>=2: q["prefixes"].append(toks.pop())
+            q["terms"] += toks
+    return q
+
+def chat_day(days:list, i:int)->int|None:# date ordinal of transcript line i, from UserStore.chat_days runs
+    j = bisect.bisect_right([first for _,first in days], i) - 1
+    return days[j][0] if j>=0 else None
+
+def _has(p, i:int)->bool:
+    j = bisect.bisect_left(p, i); return j<len(p) and p[j]==i
+
+class ChatIndex:
+    """
+    Inverted index over one user's chat transcript. Message ids are line numbers in the
+    full transcript (archive + hot text); each token maps to an ascending array of ids and
+    each line has a role byte. Dates come from the store's chat_days runs, so a date range
+    is an id range. Built incrementally with add(); saved to one JSON file with the
+    postings packed as zlib'd arrays.
+    """
+    VERSION = 1
+    def __init__(self):
+        self.n = 0; self.post = {}; self.roles = bytearray(); self.tail = ""; self._vocab = None; self._unions = {}
+
+    def add(self, lines):
+        role = self.roles[-1] if self.roles else ROLE_CODES["sys"]   # continuation lines keep the speaker
+        self._unions.clear()
+        for ln in lines:
+            m = CHAT_ROLE_RE.match(ln)
+            if m: role = ROLE_CODES[CHAT_ROLES[m.group(1)]]
+            for tok in set(CHAT_TOKEN_RE.findall(ln[m.end() if m else 0:].lower())):
+                p = self.post.get(tok)
+                if p is None: p = self.post[tok] = array("I"); self._vocab = None
+                p.append(self.n)
+            self.roles.append(role); self.n += 1; self.tail = ln
+        return self
+
+    def _prefix(self, pre:str)->list:# postings of every token starting with `pre` (merged if there are many)
+        if self._vocab is None: self._vocab = sorted(self.post)
+        keys = []
+        for t in self._vocab[bisect.bisect_left(self._vocab, pre):]:
+            if not t.startswith(pre): break
+            keys.append(t)
+        return [self.post[k] for k in keys]
+
+    def _union(self, pre:str, group:list):# one merged postings array for a wide prefix, cached until add()
+        if pre not in self._unions: self._unions[pre] = array("I", sorted(set().union(*group)))
+        return [self._unions[pre]]
+
+    @METRICS.timed("chat.search")
+    def search(self, q:dict, days:list=(), limit:int=100)->list[int]:# matching ids, newest first
+        lo, hi = 0, self.n
+        if q["since"] is not None or q["until"] is not None:   # lines saved before chat_days existed have no date
+            lo = days[0][1] if days else self.n
+        if q["since"] is not None:
+            j = bisect.bisect_left(days, [q["since"], -1]); lo = max(lo, days[j][1] if j<len(days) else self.n)
+        if q["until"] is not None:
+            j = bisect.bisect_right(days, [q["until"], float("inf")]); hi = days[j][1] if j<len(days) else self.n
+        # each condition is a group of postings, any of which may match (a prefix has several);
+        # the smallest group is walked newest-first, the others are probed by bisection
+        groups = [(None, [self.post.get(t, ())]) for t in q["terms"]] + [(p, self._prefix(p)) for p in q["prefixes"]]
+        if groups:
+            groups.sort(key=lambda g: sum(map(len, g[1]))); first = groups[0][1]
+            others = [self._union(pre, g) if len(g) > 32 else g for pre, g in groups[1:]]
+            runs = [reversed(p[bisect.bisect_left(p, lo):bisect.bisect_left(p, hi)]) for p in first]
+            cand = runs[0] if len(runs)==1 else (i for i,_ in itertools.groupby(heapq.merge(*runs, reverse=True)))
+        else: cand, others = range(hi-1, lo-1, -1), []
+        role = ROLE_CODES[q["role"]] if q["role"] else 0
+        out = []
+        for i in cand:
+            if role and self.roles[i]!=role: continue
+            if all(any(_has(p, i) for p in g) for g in others):
+                out.append(i)
+                if len(out)>=limit: break
+        return out
+
+    def save(self, path:str):
+        vocab = sorted(self.post); ids = array("I")
+        for t in vocab: ids.extend(self.post[t])
+        b64 = lambda b: base64.b64encode(zlib.compress(b, 1)).decode("ascii")
+        doc = {"version":self.VERSION, "n":self.n, "tail":self.tail, "vocab":vocab,
+               "counts":b64(array("I", (len(self.post[t]) for t in vocab)).tobytes()),
+               "ids":b64(ids.tobytes()), "roles":b64(bytes(self.roles))}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp,"w",encoding="utf-8") as f: json.dump(doc, f, separators=(",",":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path:str):# None if missing, unreadable or from another version
+        try:
+            with open(path,"r",encoding="utf-8") as f: doc = json.load(f)
+            if doc.get("version")!=cls.VERSION: return None
+            unb = lambda k: zlib.decompress(base64.b64decode(doc[k]))
+            counts = array("I"); counts.frombytes(unb("counts")); ids = array("I"); ids.frombytes(unb("ids"))
+            idx = cls(); idx.n = doc["n"]; idx.tail = doc["tail"]; idx.roles = bytearray(unb("roles")); at = 0
+            for t, c in zip(doc["vocab"], counts): idx.post[t] = ids[at:at+c]; at += c
+            return idx
+        except (OSError, ValueError, KeyError, TypeError, zlib.error): return None
 
 # ---------------- tiny bot ----------------
 class ChatBot:
-    def __init__(self): self.name=None; self.field=None
+    __slots__ = ("name","field","rank","seen")   # compact: thousands live in a BotPool
+    def __init__(self, rank:RankScore|None=None): self.name=None; self.field=None; self.rank=rank; self.seen=0.0
+    def snapshot(self)->dict: return {"name":self.name, "field":self.field}
+    def restore(self, snap:dict|None):
+        snap = snap or {}; self.name = snap.get("name"); self.field = snap.get("field")
+        if self.field not in CATALOGUE.careers: self.field = None
+        return self
+    @METRICS.timed("bot.reply")
     def reply(self, text:str)->str:
         t=text.strip()
         if not t: return ""
+        cat=CATALOGUE.current; names, canon=cat.names()   # one catalogue version for the whole reply
         if t.lower()=="/help":
             return "Commands: /help /clear /save\nTry: I like Science; My score is 300 for Engineering; What is NCEA?"
         if "name is" in t.lower():
             self.name = re.split(r"name is", t, flags=re.I)[-1].strip().split()[0].capitalize()
-            return f"Hi {self.name}! What are you into (Science/Commerce/Engineering)?"
-        m=re.search(r"(science|commerce|engineering)", t, re.I)
-        if "like" in t.lower() and m:
-            self.field=m.group(1).capitalize()
-            return "Careers in "+self.field+": "+", ".join(CAREERS[self.field])
+            return f"Hi {self.name}! What are you into ({'/'.join(cat.careers)})?"
+        m=names.search(t); c=canon[m.group(1).lower()] if m else None
+        if c is None and re.search(r"like|score", t, re.I) and (hit:=cat.matcher().find(t)): c=hit[2]   # "enginering"; "acountant" -> Commerce
+        if "like" in t.lower() and c in cat.careers:
+            self.field=c
+            return "Careers in "+self.field+": "+", ".join(cat.careers[self.field])
         if "score" in t.lower():
-            sm=re.search(r"(\d+)", t); cm=m or re.search(r"(science|commerce|engineering)", t, re.I)
-            if sm and cm:
-                s=int(sm.group()); c=cm.group(1).capitalize(); need=COURSES[c]
+            sm=re.search(r"(\d+)", t)
+            if c in cat.courses and (sm or self.rank):
+                s=int(sm.group()) if sm else self.rank.score; need=cat.courses[c]
                 return f"✔ Enough for {c} (need {need})." if s>=need else f"✘ Need {need-s} more for {c}."
-        for q,a in FAQ.items():
+            if self.rank and re.search(r"\bmy\b", t, re.I):
+                return f"Your rank score from recorded grades is {self.rank.score} (best {self.rank.credits} L3 credits)."
+        for q,a in cat.faq.items():
             if q.lower().replace("?","") in t.lower(): return a
-        if self.field and re.search(r"(career|job|suggest)", t, re.I):
-            return "More: "+", ".join(CAREERS[self.field])
+        if self.field in cat.careers and re.search(r"(career|job|suggest)", t, re.I):
+            return "More: "+", ".join(cat.careers[self.field])
         return "I’m FROST 🤖 Ask NCEA / rank score / careers. Type /help."
 
-# ---------------- Login root app ----------------
-class LoginApp(tk.Tk):
+class BotPool:
+    """
+    Conversation state for many concurrent chats, keyed by session id. Least recently
+    used bots sit at the front of the OrderedDict; sessions idle longer than `ttl`
+    seconds, or beyond `max_sessions`, are evicted on the next access and handed to
+    `on_evict(sid, snapshot)` so they can be written back to the user store.
+    """
+    def __init__(self, ttl:float=1800, max_sessions:int=10000, on_evict=None, clock=time.monotonic):
+        self.ttl = ttl; self.max = max_sessions; self.on_evict = on_evict; self.clock = clock
+        self.bots = collections.OrderedDict()
+
+    def __len__(self): return len(self.bots)
+
+    def get(self, sid, rank:RankScore|None=None, restore:dict|None=None)->ChatBot:
+        now = self.clock(); bot = self.bots.get(sid)
+        if bot is None: bot = self.bots[sid] = ChatBot(rank).restore(restore)
+        else: self.bots.move_to_end(sid)
+        if rank is not None: bot.rank = rank
+        bot.seen = now
+        self.evict(now)
+        return bot
+
+    def reply(self, sid, text:str, rank:RankScore|None=None, restore:dict|None=None)->str:
+        return self.get(sid, rank, restore).reply(text)
+
+    def snapshot(self, sid)->dict|None:
+        bot = self.bots.get(sid); return bot.snapshot() if bot else None
+
+    def drop(self, sid)->dict|None:# end a session; returns its snapshot
+        bot = self.bots.pop(sid, None); return bot.snapshot() if bot else None
+
+    def evict(self, now:float|None=None)->int:
+        now = self.clock() if now is None else now; n = 0
+        while self.bots:
+            sid, bot = next(iter(self.bots.items()))
+            if len(self.bots)<=self.max and now-bot.seen<=self.ttl: break
+            del self.bots[sid]; n += 1
+            if self.on_evict: self.on_evict(sid, bot.snapshot())
+        return n
+
+# ---------------- session root ----------------
+class Session(tk.Tk):
+    """The only Tk root: swaps the LoginApp / MainApp views and tears the old one down."""
     def __init__(self, store:UserStore):
         super().__init__()
         self.store = store
-        self.result_username = None
-        self.title("Sign in • Gradus")
-        self.resizable(False, False)
+        self.creds = Credentials(store, after=self.after)
+        self.view = None
+        self.protocol("WM_DELETE_WINDOW", self.quit_app)
+
+    def _swap(self, make):# old view goes first, so the new one never picks up its styles
+        old, self.view = self.view, None
+        if old is not None: old.teardown(); old.destroy()
+        self.view = make(); self.view.pack(fill="both", expand=True)
+
+    def show_login(self):
+        self.title("Sign in • Gradus"); self.minsize(1,1); self.geometry(""); self.resizable(False, False)
+        self._swap(lambda: LoginApp(self, self.store))
+        center_window(self)
+
+    def show_main(self, username:str):
+        STARTUP.skip()   # time spent typing credentials is not startup
+        self.resizable(True, True)
+        self._swap(lambda: MainApp(self, username, self.store))
+        STARTUP.mark("main_window")
+        self.update_idletasks(); STARTUP.mark("first_paint")
+
+    def quit_app(self):
+        if self.view is not None: self.view.teardown()
+        self.creds.close()
+        if PERF_DUMP:
+            w = getattr(self.view, "watchdog", None)
+            try: METRICS.dump_json(PERF_DUMP, stalls=list(w.stalls) if w else [])
+            except OSError as e: print(f"perf dump failed: {e}", file=sys.stderr)
+        self.destroy()
+
+# ---------------- Login view ----------------
+class LoginApp(ttk.Frame):
+    def __init__(self, session:Session, store:UserStore):
+        super().__init__(session)
+        self.session = session
+        self.store = store
+        self.busy = False   # a hash is running in the background
 
         nb = ttk.Notebook(self)
         f_login = ttk.Frame(nb, padding=12)
@@ -166,6 +1510,8 @@ class LoginApp(tk.Tk):
         ttk.Button(row, text="Login", style="Accent.TButton", command=self._do_login).pack(side="left", padx=(0,6))
         ttk.Button(row, text="Exit",  command=self._exit).pack(side="left")
         e_pw.bind("<Return>", lambda e: self._do_login())
+        self.msg=tk.StringVar()
+        ttk.Label(f_login, textvariable=self.msg, foreground="#6b7280").grid(row=3,column=1,sticky="w")
 
         # register tab
         self.u_reg=tk.StringVar(); self.p_reg=tk.StringVar(); self.p_reg2=tk.StringVar()
@@ -185,14 +1531,24 @@ class LoginApp(tk.Tk):
         try: s.theme_use("clam")
         except: pass
 
-        center_window(self)
+    def teardown(self): pass
+
+    def _set_busy(self, msg:str):
+        self.busy = bool(msg); self.msg.set(msg)
+        self.configure(cursor="watch" if msg else "")
 
     def _do_login(self):
         u,p = self.u_login.get().strip(), self.p_login.get()
         if not u or not p: messagebox.showwarning("Login","Enter both username and password."); return
-        if not self.store.verify(u,p): messagebox.showerror("Login failed","Invalid username or password."); return
-        self.result_username = u
-        self.destroy()  #  destroys the login root; we'll start MainApp afterwards
+        if self.busy: return
+        self._set_busy("Signing in…")
+        self.session.creds.verify_async(u, p, lambda ok, err: self._login_done(u, ok, err))
+
+    def _login_done(self, u, ok, err=None):
+        if not self.winfo_exists(): return
+        self._set_busy("")
+        if not ok: messagebox.showerror("Login failed", err or "Invalid username or password."); return
+        self.session.show_main(u)  # replaces (and destroys) this view
 
     def _do_register(self):# register a new user
         u,p1,p2 = self.u_reg.get().strip(), self.p_reg.get(), self.p_reg2.get()
@@ -200,29 +1556,41 @@ class LoginApp(tk.Tk):
             messagebox.showwarning("Register","Username must be 3–32 chars (letters/digits/_)."); return
         if len(p1)<8: messagebox.showwarning("Register","Password must be at least 8 characters."); return
         if p1!=p2: messagebox.showwarning("Register","Passwords do not match."); return
-        try:
-            self.store.create_user(u,p1)
-        except ValueError as e:
-            messagebox.showerror("Register", str(e)); return
+        if self.busy: return
+        self._set_busy("Creating account…")
+        self.session.creds.create_async(u, p1, self._register_done)
+
+    def _register_done(self, err):
+        if not self.winfo_exists(): return
+        self._set_busy("")
+        if err: messagebox.showerror("Register", err); return
         messagebox.showinfo("Register","Account created. Please login on the Login tab.")
 
-    def _exit(self):
-        self.result_username = None
-        self.destroy()
+    def _exit(self): self.session.quit_app()
 
-# ---------------- Main root app ----------------
-class MainApp(tk.Tk):
-    def __init__(self, username:str, store:UserStore):
-        super().__init__()
-        self.title("Gradus"); self.geometry("980x660"); self.minsize(880,580)
+# ---------------- Main view ----------------
+class MainApp(ttk.Frame):
+    PREFETCH = ("Check", "FROST", "Grades")   # built at idle after first paint, in this order
+    SHORTCUTS = ("<Control-s>","<Control-l>","<Control-e>","<Control-q>","<Control-D>")
+
+    def __init__(self, session:Session, username:str, store:UserStore, prefetch:bool=True):
+        super().__init__(session)
+        self.session = session
+        session.title("Gradus"); session.geometry("980x660"); session.minsize(880,580)
         self.username = username
         self.store = store
+        self.adviser = store.role(username)=="adviser"   # the Cohort page shows every account's data
 
         st = store.get_state(username)
         self.dark = bool(st.get("dark", False))
         self.chat_history = st.get("chat_history","")
         self.grades = st.get("grades",[])
+        self.bot_state = st.get("bot",{})   # FROST's remembered name/field
+        self.rank = RankScore(self.grades)
+        self.rank_var = tk.StringVar()
+        self._grades_changed()
 
+        self._root_bg = session.cget("bg")   # put back on logout, with the theme and option database
         self._build_style()
 
         # Layout
@@ -234,7 +1602,8 @@ class MainApp(tk.Tk):
         ttk.Label(side, text="Gradus", font=("Segoe UI",16,"bold")).pack(anchor="w", pady=(4,2))
         ttk.Label(side, text="NZ study • career helper", style="Sub.TLabel").pack(anchor="w", pady=(0,8))
         for name,cmd in [("🏠  Home",self.to_home),("📏  Check",self.to_check),("🧭  Careers",self.to_career),
-                         ("❄️  FROST",self.to_frost),("📄  Grades",self.to_grades),("👤  Profile",self.to_profile)]:
+                         ("❄️  FROST",self.to_frost),("📄  Grades",self.to_grades),
+                         *([("📊  Cohort",self.to_cohort)] if self.adviser else []),("👤  Profile",self.to_profile)]:
             ttk.Button(side, text=name, command=cmd).pack(fill="x", pady=4)
         ttk.Separator(side).pack(fill="x", pady=8)
         self.user_lbl = ttk.Label(side, text=f"User: {self.username}", style="Sub.TLabel")
@@ -252,25 +1621,34 @@ class MainApp(tk.Tk):
         self.status = tk.StringVar(value="Ready. Ctrl+S save chat • Ctrl+L clear chat • Ctrl+E export CSV • Ctrl+Q quit")
         ttk.Label(root, textvariable=self.status, anchor="w", padding=(10,4)).grid(row=2,column=0,columnspan=2,sticky="ew")
 
-        # shortcuts
+        # shortcuts (app-wide; removed again in teardown)
         self.bind_all("<Control-s>", lambda e: self._delegate("save_chat"))
         self.bind_all("<Control-l>", lambda e: self._delegate("clear_chat"))
         self.bind_all("<Control-e>", lambda e: self._delegate("export_csv"))
         self.bind_all("<Control-q>", lambda e: self.on_quit())
+        self.bind_all("<Control-D>", lambda e: self._show("Diagnostics"))   # Ctrl+Shift+D; not in the sidebar
+        self._after = None   # pending prefetch callback
+        self._cat = self.after(CATALOGUE_POLL_MS, self._poll_catalogue)
+        self.watchdog = LagWatchdog(self.after, self.after_cancel, threshold=STALL_MS/1000,
+                                    log=self._log_stall).start()
 
-        # pages
-        self.pages = {cls.__name__: cls(self.host, self) for cls in (Home, Check, Careers, FROST, Grades, Profile)}
-        for w in self.pages.values(): w.grid(row=0,column=0,sticky="nsew")
+        # pages are built on first navigation (see _page); only Home exists before first paint
+        self.pages = {}; self.current = None
+        self.host.rowconfigure(0, weight=1); self.host.columnconfigure(0, weight=1)
 
-        center_window(self)
         self.to_home()
-        self.protocol("WM_DELETE_WINDOW", self.on_quit)
+        center_window(session)
+        self._after = self.after_idle(self._prefetch, list(self.PREFETCH) if prefetch else [])
 
     # theme
+    THEME = "gradus"   # derived from clam; styles below go here, so the login view keeps plain clam
+
     def _build_style(self):
         s=ttk.Style(self)
-        try: s.theme_use("clam")
-        except: pass
+        try:
+            if self.THEME not in s.theme_names(): s.theme_create(self.THEME, parent="clam")
+            s.theme_use(self.THEME)
+        except tk.TclError: pass
         self._apply_colors()
         s.configure("Header.TLabel", font=("Segoe UI",18,"bold"), background=self.bg)
         s.configure("Sub.TLabel",    font=("Segoe UI",10), foreground=self.sub, background=self.bg)
@@ -295,7 +1673,7 @@ class MainApp(tk.Tk):
             self.accent = "#4f46e5"  # vibrant indigo
             self.accent2= "#4338ca"  # darker indigo
             fg          = "#111827"   # very dark gray
-        self.configure(bg=self.bg); self.option_add("*Foreground", fg); self.option_add("*Background", self.bg)
+        self.session.configure(bg=self.bg); self.option_add("*Foreground", fg); self.option_add("*Background", self.bg)
 
     def toggle_theme(self):
         self.dark = not self.dark
@@ -303,47 +1681,93 @@ class MainApp(tk.Tk):
         self.set_status("Theme: Dark" if self.dark else "Theme: Light")
         self._save_state()
 
+    def _log_stall(self, msg:str):# called from the watchdog thread: stderr only, no Tk calls
+        print(msg, file=sys.stderr)
+
     # persistence
+    @METRICS.timed("app.save_state")
     def _save_state(self):
         try:
-            self.store.save_state(self.username, {
+            st = self.store.save_state(self.username, {
                 "dark": self.dark,
                 "chat_history": self.chat_history,
-                "grades": self.grades
+                "grades": self.grades,
+                "bot": self.pages["FROST"].bot.snapshot() if "FROST" in self.pages else self.bot_state
             })
         except Exception as e:
-            self.set_status(f"Save failed: {e}")
+            self.set_status(f"Save failed: {e}"); return
+        if st["grades"] is not self.grades and st["grades"]!=self.grades:   # another session changed grades; adopt the merged list
+            self.grades = st["grades"]; self.rank.reset(self.grades); self._grades_changed()
+            if "Grades" in self.pages: self.pages["Grades"].refresh()
+        self.chat_history = st["chat_history"]
+
+    # grades -> rank score (Check and FROST read self.rank / self.rank_var)
+    def _grades_changed(self, added=(), removed=()):
+        for g in added: self.rank.add(g)
+        for g in removed: self.rank.remove(g)
+        self.rank_var.set(f"From your grades: {self.rank.score} (best {self.rank.credits} L3 credits)")
+
+    def full_chat(self)->str:# archived segments (if any) + what's in memory
+        n = self.store.chat_archived_lines(self.username)
+        return (self.store.chat_archived(self.username, n) if n else "") + self.chat_history
 
     # nav / status
-    def _show(self, k): self.pages[k].tkraise()
+    def _page(self, k):# build page k on first use
+        w = self.pages.get(k)
+        if w is None:
+            t = time.perf_counter()
+            w = self.pages[k] = PAGES[k](self.host, self)
+            w.grid(row=0,column=0,sticky="nsew")
+            STARTUP.page(k, (time.perf_counter()-t)*1000)
+        return w
+    def _prefetch(self, todo):# one page per idle slot so input events still get through
+        while todo and todo[0] in self.pages: todo.pop(0)
+        if not todo: self._after = None; STARTUP.report(); return
+        self._page(todo.pop(0))
+        if self.current: self.pages[self.current].tkraise()   # a freshly gridded page lands on top
+        self._after = self.after_idle(self._prefetch, todo) if todo else None
+    def _show(self, k): self._page(k).tkraise(); self.current = k
     def to_home(self): self._show("Home")
     def to_check(self): self._show("Check")
     def to_career(self): self._show("Careers")
     def to_frost(self): self._show("FROST")
     def to_grades(self): self._show("Grades")
+    def to_cohort(self):
+        if self.adviser: self._show("Cohort")
     def to_profile(self): self._show("Profile")
     def set_status(self, msg): self.status.set(msg)
 
     # shortcuts
     def _delegate(self, action):
-        cur = self.pages.get("FROST")
-        if action=="save_chat" and cur and cur.winfo_ismapped(): cur.save_chat(); return "break"
-        if action=="clear_chat" and cur and cur.winfo_ismapped(): cur.clear(); return "break"
-        grd = self.pages.get("Grades")
-        if action=="export_csv" and grd and grd.winfo_ismapped(): grd.export_csv(); return "break"
+        if action=="save_chat" and self.current=="FROST": self.pages["FROST"].save_chat(); return "break"
+        if action=="clear_chat" and self.current=="FROST": self.pages["FROST"].clear(); return "break"
+        if action=="export_csv" and self.current=="Grades": self.pages["Grades"].export_csv(); return "break"
 
     # logout / quit
-    def logout(self):
-        # Destroy current main root and re-run the whole two-stage flow
-        self.on_quit()
-        # Relaunch login -> main
-        run_app(self.store)
+    def _poll_catalogue(self):# pick up catalogue edits without a restart
+        if CATALOGUE.reload_if_changed():
+            for page in self.pages.values():
+                if hasattr(page, "on_catalogue"): page.on_catalogue()
+            self.set_status("Course / career catalogue updated.")
+        self._cat = self.after(CATALOGUE_POLL_MS, self._poll_catalogue)
 
-    def on_quit(self):
+    def teardown(self):# drop everything this user's session hung on the shared root
+        if self._after: self.after_cancel(self._after); self._after = None
+        self.after_cancel(self._cat)
+        self.watchdog.stop()
+        for seq in self.SHORTCUTS: self.unbind_all(seq)
+        try: ttk.Style(self).theme_use("clam")
+        except tk.TclError: pass
+        self.option_clear(); self.session.configure(bg=self._root_bg)
         self._save_state()
-        self.destroy()
+
+    def logout(self): self.session.show_login()   # swap views in the same root
+
+    def on_quit(self): self.session.quit_app()
 
 # ---------------- pages ----------------
+INGEST_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gradus-ingest")   # runs ingest_grades, which fans out itself
+
 class Home(ttk.Frame):
     def __init__(self, parent, app:MainApp):
         super().__init__(parent, padding=16)
@@ -360,61 +1784,185 @@ class Check(ttk.Frame):#    simple uni entry check
         ttk.Label(self,text="Rank score").grid(row=1,column=0,sticky="e",padx=6,pady=8)
         self.e = ttk.Entry(self,width=10); self.e.grid(row=1,column=1,sticky="w")
         ttk.Label(self,text="Target course").grid(row=1,column=2,sticky="e",padx=6)
-        self.var=tk.StringVar(value=list(COURSES.keys())[0])
-        ttk.Combobox(self,textvariable=self.var,values=list(COURSES.keys()),state="readonly",width=18).grid(row=1,column=3,sticky="w")
+        self.var=tk.StringVar(value=next(iter(CATALOGUE.courses),""))
+        self.cb=ttk.Combobox(self,textvariable=self.var,values=list(CATALOGUE.courses),state="readonly",width=18)
+        self.cb.grid(row=1,column=3,sticky="w")
         ttk.Button(self,text="Check",style="Accent.TButton",command=self.run).grid(row=2,column=0,pady=6,sticky="w")
-    def run(self):
+        ttk.Label(self,textvariable=app.rank_var,style="Sub.TLabel").grid(row=2,column=1,columnspan=3,sticky="w",padx=6)
+    def run(self):# blank entry -> use the score computed from Grades
         try:
-            s=int(self.e.get()); c=self.var.get(); need=COURSES[c]
+            raw=self.e.get().strip()
+            s=int(raw) if raw else self.app.rank.score; c=self.var.get(); need=CATALOGUE.courses[c]
             messagebox.showinfo("Result", f"✔ Enough for {c} (need {need}).") if s>=need \
                 else messagebox.showwarning("Result", f"✘ Need {need-s} more for {c}.")
         except ValueError:
             messagebox.showerror("Error","Enter a whole number.")
+        except KeyError:
+            messagebox.showerror("Error","Pick a target course.")
+    def on_catalogue(self):# catalogue reloaded: courses may have been added / renamed
+        self.cb.configure(values=list(CATALOGUE.courses))
+        if self.var.get() not in CATALOGUE.courses: self.var.set(next(iter(CATALOGUE.courses),""))
 
-class Careers(ttk.Frame):#  career suggestions for interest areas
+class Careers(ttk.Frame):#  career suggestions: ranked by recorded grades when there are any
+    ANY = "Any field"
     def __init__(self, parent, app:MainApp):
-        super().__init__(parent, padding=16)
+        super().__init__(parent, padding=16); self.app=app; self.matrix=career_matrix()
         ttk.Label(self,text="Career Ideas",style="Header.TLabel").pack(anchor="w")
         row=ttk.Frame(self); row.pack(anchor="w", pady=8)
-        self.var=tk.StringVar(value=list(CAREERS.keys())[0])
+        self.var=tk.StringVar()
         ttk.Label(row,text="Interest").pack(side="left",padx=(0,6))
-        ttk.Combobox(row,textvariable=self.var,values=list(CAREERS.keys()),state="readonly",width=20).pack(side="left")
+        self.cb=ttk.Combobox(row,textvariable=self.var,state="readonly",width=20); self.cb.pack(side="left")
+        self.on_catalogue()
         ttk.Button(row,text="Suggest",style="Accent.TButton",command=self.suggest).pack(side="left",padx=8)
         self.out=tk.Text(self,height=10,wrap="word",borderwidth=0)
         self.out.pack(fill="both",expand=True); self.out.configure(state="disabled")
-    def suggest(self):# suggest careers for selected interest
-        f=self.var.get()
+        self.out.tag_config("why",foreground="#6b7280")
+    def on_catalogue(self):# (re)fill the interest list from the matrix + catalogue fields
+        fields=[self.ANY]+sorted(set(self.matrix.fields) | set(CATALOGUE.careers)) if self.matrix else list(CATALOGUE.careers)
+        self.cb.configure(values=fields)
+        if self.var.get() not in fields: self.var.set(fields[0] if fields else "")
+    def suggest(self):# top careers for the student's grades (in the chosen field), else the static list
+        f=self.var.get(); field=None if f==self.ANY else f
+        recs=self.matrix.recommend(subject_strengths(self.app.grades), 10, field) if self.matrix else []
         self.out.configure(state="normal"); self.out.delete("1.0","end")
-        self.out.insert("end","• "+ "\n• ".join(CAREERS[f])); self.out.configure(state="disabled")
+        if recs:
+            self.out.insert("end", "Ranked by your recorded grades:\n\n")
+            for r in recs:
+                why=", ".join(f"{s.title()} {share:.0%}" for s,share in r["because"])
+                self.out.insert("end", f"• {r['career']} ({r['field']}) — {r['score']:.0%} match\n")
+                self.out.insert("end", f"    because of {why}\n", "why")
+        else:
+            if self.matrix and field is None: names=self.matrix.careers
+            elif field in CATALOGUE.careers: names=CATALOGUE.careers[field]
+            elif self.matrix: names=[self.matrix.careers[i] for i in self.matrix.by_field[field]]
+            else: names=[]
+            if self.app.grades: self.out.insert("end", "None of your subjects match our career data yet.\n\n", "why")
+            else: self.out.insert("end", "Add grades to get suggestions ranked for you.\n\n", "why")
+            self.out.insert("end","• "+ "\n• ".join(names))
+        self.out.configure(state="disabled")
 
 class FROST(ttk.Frame):# simple chatbot interface
+    """
+    The transcript is kept as a list of lines (`_lines`); the widget only holds the slice
+    [_top, _end), at most CHAT_WINDOW lines. Older lines are paged in CHAT_PAGE at a time
+    when the view is scrolled to the top (the compressed archive is read on first need),
+    and evicted from the far end. New messages are queued and inserted, saved and
+    scrolled once per idle pass. Ctrl+F searches the whole transcript through a ChatIndex
+    that is loaded (and caught up) on first use and saved when the page goes away.
+    """
+    CHAT_PAGE, CHAT_WINDOW = 200, 1000
     def __init__(self, parent, app:MainApp):
-        super().__init__(parent, padding=12); self.app=app; self.bot=ChatBot()
+        super().__init__(parent, padding=12); self.app=app; self.bot=ChatBot(app.rank).restore(app.bot_state)
         ttk.Label(self,text="FROST Chat",style="Header.TLabel").grid(row=0,column=0,sticky="w")
-        ttk.Label(self,text="Ask NCEA • rank score • careers. Enter=send; Shift+Enter=new line.",style="Sub.TLabel")\
+        ttk.Label(self,text="Ask NCEA • rank score • careers. Enter=send; Shift+Enter=new line; Ctrl+F=search.",style="Sub.TLabel")\
             .grid(row=1,column=0,sticky="w",pady=(0,6))
         chips=ttk.Frame(self); chips.grid(row=2,column=0,sticky="w",pady=(0,4))
         for t in ["What is NCEA?","I like Science","My score is 300 for Engineering"]:
             ttk.Button(chips,text=t,command=lambda s=t:self._quick(s)).pack(side="left",padx=4)
+        from tkinter import scrolledtext
         self.chat=scrolledtext.ScrolledText(self,wrap="word",height=16,state="disabled",borderwidth=0)
         self.chat.grid(row=3,column=0,sticky="nsew"); self.rowconfigure(3,weight=1)
         self.chat.tag_config("user",foreground="#1f2937"); self.chat.tag_config("bot",foreground="#0b5394"); self.chat.tag_config("sys",foreground="#6b7280")
+        self.chat.tag_config("found",background="#fde68a")
+        self.chat.configure(yscrollcommand=self._on_scroll)
+        self._lines = app.chat_history.splitlines(True); self._top = self._end = len(self._lines)
+        self._offset = app.store.chat_archived_lines(app.username)   # archived lines not read into _lines yet
+        self._queue = []; self._flush_id = self._page_id = None
+        self.index = None; self._index_dirty = False
+        self._render()
         row=ttk.Frame(self); row.grid(row=4,column=0,sticky="ew",pady=(6,0)); row.columnconfigure(0,weight=1)
         self.entry=tk.Text(row,height=3,wrap="word"); self.entry.grid(row=0,column=0,sticky="ew")
         btns=ttk.Frame(row); btns.grid(row=0,column=1,sticky="e",padx=(6,0))
         ttk.Button(btns,text="Send ▶",style="Accent.TButton",command=self.send).pack(side="left")
         ttk.Button(btns,text="Clear",command=self.clear).pack(side="left",padx=6)
         ttk.Button(btns,text="Copy",command=self.copy_chat).pack(side="left",padx=6)
+        ttk.Button(btns,text="Search",command=self.open_search).pack(side="left")
         self.entry.bind("<Return>", self._on_enter); self.entry.bind("<Shift-Return>", lambda e: None)
+        self.entry.bind("<Control-f>", lambda e: (self.open_search(), "break"))
         self.entry.bind("<Control-s>", self.save_chat); self.entry.bind("<Control-l>", lambda e: (self.clear(), "break"))
         self._append("sys","Hi, I’m FROST. /help for help.")
-    def _append(self, role, msg):# append a message to chat area and history
-        self.chat.configure(state="normal")
+    def _append(self, role, msg):# append a message to history; the widget catches up at idle
         ts=datetime.datetime.now().strftime("%H:%M")
         lab={"user":"You","bot":"FROST","sys":"System"}[role]
         line=f"[{ts}] {lab}: {msg}\n"
-        self.chat.insert("end", line, role); self.chat.configure(state="disabled"); self.chat.see("end")
-        self.app.chat_history += line; self.app._save_state()
+        self.app.chat_history += line; self._queue.extend(line.splitlines(True))
+        if self._flush_id is None: self._flush_id = self.after_idle(self._flush)
+    @METRICS.timed("chat.flush")
+    def _flush(self):# one insert + one save for everything queued since the last pass
+        self._flush_id = None
+        if not self._queue: return
+        new, self._queue = self._queue, []
+        if self.index is not None: self.index.add(new); self._index_dirty = True
+        if self._end < len(self._lines): self._lines += new; self._render()   # scrolled far up: jump back down
+        else:
+            self._lines += new; self._insert("end", self._lines[self._end:]); self._end = len(self._lines)
+            self._evict(top=True)
+        self.chat.see("end"); self.app._save_state()
+    def _insert(self, where, lines):# one Text.insert for a run of lines, tagged by speaker
+        args, role = [], "sys"
+        for ln in lines:
+            m = CHAT_ROLE_RE.match(ln)
+            if m: role = CHAT_ROLES[m.group(1)]
+            if args and args[-1]==role: args[-2] += ln
+            else: args += [ln, role]
+        if not args: return
+        self.chat.configure(state="normal"); self.chat.insert(where, *args); self.chat.configure(state="disabled")
+    def _evict(self, top:bool):# keep at most CHAT_WINDOW lines in the widget
+        n = self._end - self._top - self.CHAT_WINDOW
+        if n <= 0: return
+        self.chat.configure(state="normal")
+        if top: self.chat.delete("1.0", f"{n+1}.0"); self._top += n
+        else: self.chat.delete(f"{self._end-self._top-n+1}.0", "end"); self._end -= n
+        self.chat.configure(state="disabled")
+    def _render(self, at:int|None=None):# widget = the last CHAT_PAGE lines, or CHAT_PAGE lines around line `at`
+        self.chat.configure(state="normal"); self.chat.delete("1.0","end"); self.chat.configure(state="disabled")
+        if at is None: self._end = len(self._lines); self._top = max(0, self._end-self.CHAT_PAGE)
+        else: self._top = max(0, at-self.CHAT_PAGE//2); self._end = min(len(self._lines), self._top+self.CHAT_PAGE)
+        self._insert("end", self._lines[self._top:self._end])
+    def _on_scroll(self, lo, hi):
+        self.chat.vbar.set(lo, hi)
+        if self._page_id is None and ((float(lo)<=0.0 and (self._top or self._offset)) or (float(hi)>=1.0 and self._end<len(self._lines))):
+            self._page_id = self.after_idle(self._page_in, float(lo)<=0.0)
+    def _page_in(self, up:bool):# scrolled to an edge: bring in the next page of history there
+        self._page_id = None
+        if up:
+            if not self._top and self._offset: self._load_archive()
+            n = min(self.CHAT_PAGE, self._top)
+            if not n: return
+            self._top -= n; self._insert("1.0", self._lines[self._top:self._top+n])
+            self._evict(top=False); self.chat.yview(f"{n+1}.0")   # keep the line that was on top in place
+        else:
+            n = min(self.CHAT_PAGE, len(self._lines)-self._end)
+            self._insert("end", self._lines[self._end:self._end+n]); self._end += n; self._evict(top=True)
+    def _load_archive(self):# prepend the archived lines this history follows on from
+        old = self.app.store.chat_archived(self.app.username, self._offset).splitlines(True)
+        self._lines[0:0] = old; self._top += len(old); self._end += len(old); self._offset = 0
+    def _ensure_index(self)->ChatIndex:# saved index, caught up with (or rebuilt from) the transcript
+        if self.index is None:
+            idx = ChatIndex.load(self.app.store.chat_index_path(self.app.username))
+            if idx is not None and (idx.n > self._offset+len(self._lines) or
+                                    (idx.n > self._offset and self._lines[idx.n-self._offset-1]!=idx.tail)): idx = None
+            idx = idx or ChatIndex(); n = idx.n
+            if n < self._offset: self._load_archive()
+            self.index = idx.add(self._lines[n-self._offset:]); self._index_dirty = idx.n!=n
+        return self.index
+    def search(self, q:dict, limit:int=100)->list[tuple[int,str,int|None]]:# (line no., text, date ordinal)
+        days = self.app.store.chat_days(self.app.username); ids = self._ensure_index().search(q, days, limit)
+        if ids and min(ids) < self._offset: self._load_archive()
+        return [(i, self._lines[i-self._offset], chat_day(days, i)) for i in ids]
+    def goto(self, i:int):# show transcript line i in the chat view
+        if i < self._offset: self._load_archive()
+        at = i-self._offset; self._render(at); self.app._show("FROST")
+        self.chat.tag_add("found", f"{at-self._top+1}.0", f"{at-self._top+2}.0"); self.chat.see(f"{at-self._top+1}.0")
+    def open_search(self): ChatSearch(self)
+    def destroy(self):
+        for job in (self._flush_id, self._page_id):
+            if job is not None: self.after_cancel(job)
+        self._flush_id = self._page_id = None
+        if self._index_dirty:
+            try: self.index.save(self.app.store.chat_index_path(self.app.username)); self._index_dirty = False
+            except OSError as e: print(f"[chat] index not saved: {e}", file=sys.stderr)
+        super().destroy()
     def _get(self): return self.entry.get("1.0","end").strip()# get input box text
     def _clr_input(self): self.entry.delete("1.0","end")# clear input box
     def _quick(self, text): self._append("user", text); self._append("bot", self.bot.reply(text))# quick button
@@ -430,25 +1978,60 @@ class FROST(ttk.Frame):# simple chatbot interface
         self._clr_input(); self.app.set_status("Sent. Ctrl+S save, Ctrl+L clear.")
     def clear(self):# clear chat history
         if not messagebox.askyesno("Confirm","Clear the chat?"): return
-        self.chat.configure(state="normal"); self.chat.delete("1.0","end"); self.chat.configure(state="disabled")
+        self.app.chat_history = ""; self.app.store.clear_chat(self.app.username)
+        self._lines, self._queue, self._offset = [], [], 0; self._render()
+        if self.index is not None: self.index, self._index_dirty = ChatIndex(), True
         self._clr_input(); self._append("sys","Chat cleared."); self.app.set_status("Chat cleared.")
-        self.app.chat_history = ""; self.app._save_state()
     def copy_chat(self):# copy chat to clipboard
         try:
-            data = self.app.chat_history or self.chat.get("1.0","end")
+            data = self.app.full_chat() or self.chat.get("1.0","end")
             self.clipboard_clear(); self.clipboard_append(data)
             self.app.set_status("Chat copied to clipboard.")
         except Exception as e:
             self.app.set_status(f"Copy failed: {e}")
     def save_chat(self, event=None):
+        from tkinter import filedialog
         path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text","*.txt")], initialfile="frost_chat.txt")
         if not path: return
         try:
-            with open(path,"w",encoding="utf-8") as f: f.write(self.app.chat_history or self.chat.get("1.0","end"))
+            with METRICS.timer("export.chat"), open(path,"w",encoding="utf-8") as f:
+                f.write(self.app.full_chat() or self.chat.get("1.0","end"))
             self.app.set_status(f"Saved chat → {os.path.basename(path)}")
         except Exception as e:
             messagebox.showerror("Save failed", str(e))
 
+class ChatSearch(tk.Toplevel):# Ctrl+F on FROST: keyword / role / date search, double-click jumps to the line
+    HELP = "words  •  engin*  •  role:you|frost|system  •  since:2026-10-01  •  until:yesterday  •  since:7d"
+    def __init__(self, frost:FROST):
+        super().__init__(frost); self.frost=frost; self.title("Search chat"); self.transient(frost.winfo_toplevel())
+        top=ttk.Frame(self,padding=(8,8,8,2)); top.pack(fill="x")
+        self.q=ttk.Entry(top,width=48); self.q.pack(side="left",fill="x",expand=True)
+        ttk.Button(top,text="Find",style="Accent.TButton",command=self.find).pack(side="left",padx=(6,0))
+        ttk.Label(self,text=self.HELP,style="Sub.TLabel").pack(anchor="w",padx=8)
+        self.out=tk.Text(self,wrap="word",height=18,width=90,state="disabled",cursor="arrow",borderwidth=0)
+        self.out.pack(fill="both",expand=True,padx=8,pady=6)
+        self.out.tag_config("hit",background="#fde68a"); self.out.tag_config("meta",foreground="#6b7280")
+        self.status=ttk.Label(self,style="Sub.TLabel"); self.status.pack(anchor="w",padx=8,pady=(0,8))
+        self.q.bind("<Return>", lambda e: self.find()); self.bind("<Escape>", lambda e: self.destroy())
+        self.q.focus_set()
+    def find(self):
+        try: q = parse_chat_query(self.q.get())
+        except ValueError as e: self.status.configure(text=str(e)); return
+        t = time.perf_counter(); hits = self.frost.search(q); ms = (time.perf_counter()-t)*1000
+        words = [re.escape(w) for w in q["terms"]] + [re.escape(p)+"[a-z0-9]*" for p in q["prefixes"]]
+        mark = re.compile(rf"(?<![a-z0-9])(?:{'|'.join(words)})(?![a-z0-9])", re.I) if words else None
+        self.out.configure(state="normal"); self.out.delete("1.0","end")
+        for i, line, day in hits:
+            tag = f"r{i}"; start = self.out.index("end-1c")
+            self.out.insert("end", (datetime.date.fromordinal(day).isoformat() if day else "—")+"  ", ("meta",tag))
+            body = self.out.index("end-1c"); self.out.insert("end", line, tag)
+            for m in (mark.finditer(line) if mark else ()):
+                self.out.tag_add("hit", f"{body}+{m.start()}c", f"{body}+{m.end()}c")
+            self.out.tag_bind(tag, "<Double-Button-1>", lambda e, i=i: self.frost.goto(i))
+        self.out.configure(state="disabled")
+        more = "+" if len(hits)>=100 else ""
+        self.status.configure(text=f"{len(hits)}{more} matches in {ms:.1f} ms • double-click a line to jump to it")
+
 class Grades(ttk.Frame):# NCEA grades manager
     def __init__(self, parent, app:MainApp):
         super().__init__(parent, padding=12); self.app=app
@@ -465,6 +2048,13 @@ class Grades(ttk.Frame):# NCEA grades manager
         ttk.Label(form,text="Grade").grid(row=0,column=6,sticky="e"); self.var_g=tk.StringVar(value="A")
         ttk.Combobox(form,textvariable=self.var_g,values=["A","M","E","N"],state="readonly",width=5).grid(row=0,column=7,padx=6)
         ttk.Button(form,text="Add",style="Accent.TButton",command=self.add).grid(row=0,column=8,padx=(8,0))
+        # standards autocomplete: the list is indexed in the background, suggestions show under Title
+        self.sugg=tk.Listbox(form,height=6,activestyle="dotbox",exportselection=False); self._hits=[]
+        self.sugg.grid(row=1,column=1,columnspan=8,sticky="ew",padx=6); self.sugg.grid_remove()
+        self._std = INGEST_POOL.submit(standards_index)
+        self.e_title.bind("<KeyRelease>", self._on_title_key)
+        for seq in ("<Down>","<Up>","<Return>","<Escape>"): self.e_title.bind(seq, self._on_title_nav)
+        self.sugg.bind("<ButtonRelease-1>", lambda e: self._pick())
         self.tree=ttk.Treeview(self,columns=("Title","Level","Credits","Grade"),show="headings",height=11)
         for col,w in [("Title",380),("Level",60),("Credits",80),("Grade",80)]:
             self.tree.heading(col,text=col); self.tree.column(col,width=w,anchor="center")
@@ -472,14 +2062,17 @@ class Grades(ttk.Frame):# NCEA grades manager
         self.lbl_tot=ttk.Label(self,text="Totals: L1 0 | L2 0 | L3 0 | All 0"); self.lbl_tot.grid(row=4,column=0,sticky="w")
         btns=ttk.Frame(self); btns.grid(row=5,column=0,sticky="w",pady=6)
         ttk.Button(btns,text="Import CSV",command=self.import_csv).pack(side="left")
+        ttk.Button(btns,text="Import folder",command=lambda: self.import_csv(folder=True)).pack(side="left",padx=(6,0))
         ttk.Button(btns,text="Export CSV",command=self.export_csv).pack(side="left",padx=6)
         ttk.Button(btns,text="Remove selected",command=self.remove_sel).pack(side="left",padx=6)
         self.refresh()
+    @METRICS.timed("grades.refresh")
     def refresh(self, rows=None):# refresh table contents
         for iid in self.tree.get_children(): self.tree.delete(iid)
         data = rows if rows is not None else self.app.grades
+        self._rows = {}  # tree iid -> grade record, so removals hit the right records
         for g in data:
-            self.tree.insert("", "end", values=(g["title"], g["level"], g["credits"], g["grade"]))
+            self._rows[self.tree.insert("", "end", values=(g["title"], g["level"], g["credits"], g["grade"]))] = g
         self._update_totals()
     def apply_filter(self):#    filter by title substring
         q = self.q.get().strip().lower()
@@ -487,6 +2080,33 @@ class Grades(ttk.Frame):# NCEA grades manager
         rows=[g for g in self.app.grades if q in g["title"].lower()]
         self.refresh(rows)
     def reset_filter(self): self.q.delete(0,"end"); self.refresh()
+    def _on_title_key(self, e):# refresh suggestions as the title is typed
+        if e.keysym in ("Down","Up","Return","Escape") or not self._std.done(): return
+        ix = self._std.result(); text = self.e_title.get()
+        self._hits = ix.suggest(text) if ix and len(text.strip())>=2 else []
+        self.sugg.delete(0,"end")
+        if not self._hits: self.sugg.grid_remove(); return
+        for i in self._hits:
+            _,_,_,_,lvl,cr = ix.entries[i]; self.sugg.insert("end", f"{ix.label(i)}  —  L{lvl}, {cr} cr")
+        self.sugg.configure(height=len(self._hits)); self.sugg.grid()
+    def _on_title_nav(self, e):# arrows move through suggestions, Return picks, Escape closes
+        if not self._hits: return
+        if e.keysym=="Escape": self._hits=[]; self.sugg.grid_remove(); return "break"
+        cur = self.sugg.curselection()
+        if e.keysym=="Return":
+            if cur: self._pick(); return "break"
+            return
+        j = (cur[0] if cur else -1) + (1 if e.keysym=="Down" else -1)
+        j = max(0, min(len(self._hits)-1, j))
+        self.sugg.selection_clear(0,"end"); self.sugg.selection_set(j); self.sugg.see(j)
+        return "break"
+    def _pick(self):# fill Title, Level and Credits from the chosen standard
+        cur = self.sugg.curselection()
+        if not cur or not self._hits: return
+        ix = self._std.result(); i = self._hits[cur[0]]; _,_,_,_,lvl,cr = ix.entries[i]
+        self.e_title.delete(0,"end"); self.e_title.insert(0, ix.label(i))
+        self.var_lvl.set(lvl); self.e_cred.delete(0,"end"); self.e_cred.insert(0, str(cr))
+        self._hits=[]; self.sugg.grid_remove(); self.e_title.focus_set(); self.e_title.icursor("end")
     def add(self):# add a new grade
         title=self.e_title.get().strip()
         if not title: messagebox.showwarning("Missing","Enter title."); return
@@ -498,52 +2118,98 @@ class Grades(ttk.Frame):# NCEA grades manager
             messagebox.showwarning("Invalid","Level 1–3; Credits 1–24."); return
         if grade not in ("A","M","E","N"):
             messagebox.showwarning("Invalid","Grade must be A/M/E/N."); return
-        self.app.grades.append({"title":title,"level":level,"credits":credits,"grade":grade})
-        self.e_title.delete(0,"end"); self.e_cred.delete(0,"end")
+        g={"title":title,"level":level,"credits":credits,"grade":grade}
+        self.app.grades.append(g); self.app._grades_changed(added=[g])
+        self.e_title.delete(0,"end"); self.e_cred.delete(0,"end"); self._hits=[]; self.sugg.grid_remove()
         self.refresh(); self.app._save_state()
     def remove_sel(self):# remove selected rows
         sel=self.tree.selection()
         if not sel: return
         if not messagebox.askyesno("Confirm","Remove selected record(s)?"): return
-        keep=[]; ids=set(sel)
-        for iid in self.tree.get_children():
-            if iid in ids: continue
-            t,l,c,g = self.tree.item(iid,"values")
-            keep.append({"title":t,"level":int(l),"credits":int(c),"grade":g})
-        self.app.grades=keep; self.refresh(); self.app._save_state()
-    def _update_totals(self):# compute and show totals
-        lv={1:0,2:0,3:0}; total=0
-        for iid in self.tree.get_children():
-            _, l, c, _ = self.tree.item(iid,"values")
-            l=int(l); c=int(c); lv[l]+=c; total+=c
-        self.lbl_tot.config(text=f"Totals: L1 {lv[1]} | L2 {lv[2]} | L3 {lv[3]} | All {total}")
+        gone=[self._rows[iid] for iid in sel]; ids={id(g) for g in gone}
+        self.app.grades[:]=[g for g in self.app.grades if id(g) not in ids]
+        self.app._grades_changed(removed=gone); self.refresh(); self.app._save_state()
+    def _update_totals(self):# compute and show totals for the rows on screen
+        lv=grade_totals(self._rows.values())
+        self.lbl_tot.config(text=f"Totals: L1 {lv[1]} | L2 {lv[2]} | L3 {lv[3]} | All {lv['all']}")
     def export_csv(self):# export to a CSV file (Title, Level, Credits, Grade)
+        from tkinter import filedialog
         path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")], initialfile="grades.csv")
         if not path: return
         try:
-            with open(path,"w",newline="",encoding="utf-8") as f:
-                w=csv.writer(f); w.writerow(["Title","Level","Credits","Grade"])
-                for g in self.app.grades: w.writerow([g["title"],g["level"],g["credits"],g["grade"]])
+            write_grades_csv(path, self.app.grades)
             self.app.set_status(f"Exported CSV → {os.path.basename(path)}")
         except Exception as e:
             messagebox.showerror("Export failed", str(e))
-    def import_csv(self):# import from a CSV file (Title, Level, Credits, Grade)
-        path = filedialog.askopenfilename(filetypes=[("CSV","*.csv")])
-        if not path: return
-        try:
-            with open(path,"r",encoding="utf-8") as f:
-                r=csv.DictReader(f)
-                loaded=[]
-                for row in r:
-                    title=row.get("Title","").strip()
-                    level=int(row.get("Level","0")); credits=int(row.get("Credits","0"))
-                    grade=row.get("Grade","A").strip().upper()
-                    if title and level in (1,2,3) and 1<=credits<=24 and grade in ("A","M","E","N"):
-                        loaded.append({"title":title,"level":level,"credits":credits,"grade":grade})
-            self.app.grades.extend(loaded); self.refresh(); self.app._save_state()
-            self.app.set_status(f"Imported {len(loaded)} rows.")
-        except Exception as e:
-            messagebox.showerror("Import failed", str(e))
+    def import_csv(self, folder:bool=False):# import CSVs (Title, Level, Credits, Grade); rows already recorded are skipped
+        from tkinter import filedialog
+        paths = [filedialog.askdirectory()] if folder else list(filedialog.askopenfilenames(filetypes=[("CSV","*.csv")]))
+        paths = [p for p in paths if p]
+        if not paths: return
+        self.app.set_status("Importing…")
+        fut = INGEST_POOL.submit(ingest_grades, paths, list(self.app.grades))   # parsing stays off the UI thread
+        def poll():
+            if not self.winfo_exists(): return   # logged out meanwhile
+            if not fut.done(): self.after(30, poll); return
+            try: res = fut.result()
+            except Exception as e: messagebox.showerror("Import failed", str(e)); return
+            seen = set(map(grade_key, self.app.grades))   # grades added while we parsed
+            new = [g for g in res["inserted"] if grade_key(g) not in seen]; dup = res["duplicates"]+len(res["inserted"])-len(new)
+            if new:
+                self.app.grades.extend(new); self.app._grades_changed(added=new); self.refresh(); self.app._save_state()
+            msg = f"Imported {len(new)} rows from {res['files']} file(s); {dup} duplicate(s), {len(res['rejected'])} rejected."
+            self.app.set_status(msg)
+            if res["rejected"]:
+                shown = "\n".join(f"{os.path.basename(f)}{f':{l}' if l else ''}: {why}" for f,l,why in res["rejected"][:15])
+                more = f"\n… and {len(res['rejected'])-15} more" if len(res["rejected"])>15 else ""
+                messagebox.showwarning("Some rows were rejected", f"{msg}\n\n{shown}{more}")
+        poll()
+
+class Cohort(ttk.Frame):# advisers only (MainApp.adviser): credit, grade and eligibility distributions across every account
+    SPARK = " ▁▂▃▄▅▆▇█"
+    def __init__(self, parent, app:MainApp):
+        super().__init__(parent, padding=16); self.app=app
+        ttk.Label(self,text="Cohort",style="Header.TLabel").grid(row=0,column=0,sticky="w")
+        self.info=ttk.Label(self,style="Sub.TLabel"); self.info.grid(row=1,column=0,sticky="w",pady=(0,6))
+        cols=("Level","Mean credits","Distribution","A","M","E","N")
+        self.levels=ttk.Treeview(self,columns=cols,show="headings",height=3)
+        for col,w in zip(cols,(60,100,200,60,60,60,60)):
+            self.levels.heading(col,text=col); self.levels.column(col,width=w,anchor="w" if col in ("Level","Distribution") else "e")
+        self.levels.grid(row=2,column=0,sticky="ew")
+        ttk.Label(self,text=f"Distribution: accounts per {COHORT_BUCKET} credits, 0 → {COHORT_BUCKET*COHORT_BUCKETS}+ • "
+                            "A/M/E/N: share of credits",style="Sub.TLabel").grid(row=3,column=0,sticky="w",pady=(2,10))
+        cols=("Course","Rank score needed","Eligible","Rate")
+        self.courses=ttk.Treeview(self,columns=cols,show="headings",height=8)
+        for col,w in zip(cols,(160,140,90,90)):
+            self.courses.heading(col,text=col); self.courses.column(col,width=w,anchor="w" if col=="Course" else "e")
+        self.courses.grid(row=4,column=0,sticky="nsew"); self.rowconfigure(4,weight=1); self.columnconfigure(0,weight=1)
+        ttk.Button(self,text="Refresh",command=self.refresh).grid(row=5,column=0,sticky="w",pady=6)
+        self._fut=None
+        self.refresh()
+    def refresh(self):# rollups are O(1) to read; a first-time rebuild runs on the ingest worker
+        if self._fut is not None: return
+        self._fut = INGEST_POOL.submit(self.app.store.cohort)
+        def poll():
+            if not self.winfo_exists(): return
+            if not self._fut.done(): self.after(30, poll); return
+            fut, self._fut = self._fut, None
+            try: self._render(fut.result())
+            except Exception as e: self.app.set_status(f"Cohort failed: {e}")
+        poll()
+    def _render(self, c:CohortStats):
+        self.info.config(text=f"{c.users} accounts • {c.graded} with grades")
+        self.levels.delete(*self.levels.get_children())
+        mix=c.mix()
+        for l,st in c.credits().items():
+            top=max(st["hist"]) or 1; tot=sum(mix[l].values()) or 1
+            spark="".join(self.SPARK[-(-n*(len(self.SPARK)-1)//top)] for n in st["hist"])
+            self.levels.insert("","end",values=(f"L{l}",f"{st['mean']:.1f}",spark,*(f"{mix[l][g]/tot:.0%}" for g in "AMEN")))
+        self.courses.delete(*self.courses.get_children())
+        for course,e in c.eligibility(CATALOGUE.courses).items():
+            self.courses.insert("","end",values=(course,e["need"],e["eligible"],f"{e['rate']:.0%}"))
+    def tkraise(self, *a):
+        super().tkraise(*a); self.refresh()
+    def on_catalogue(self): self.refresh()
 
 class Profile(ttk.Frame):# user settings
     def __init__(self, parent, app:MainApp):
@@ -581,39 +2247,94 @@ class Profile(ttk.Frame):# user settings
         cur, n1, n2 = self.cur_pw.get(), self.new_pw.get(), self.new_pw2.get()
         if n1 != n2:
             messagebox.showwarning("Change password","New passwords do not match."); return
-        try:
-            self.app.store.change_password(self.app.username, cur, n1)
-            self.cur_pw.set(""); self.new_pw.set(""); self.new_pw2.set("")
-            messagebox.showinfo("Change password","Password updated.")
-        except ValueError as e:
-            messagebox.showerror("Change password", str(e))
+        self.app.set_status("Updating password…")
+        self.app.session.creds.change_async(self.app.username, cur, n1, self._pw_done)
+
+    def _pw_done(self, err):
+        if not self.winfo_exists(): return
+        if err: self.app.set_status("Password not changed."); messagebox.showerror("Change password", err); return
+        self.cur_pw.set(""); self.new_pw.set(""); self.new_pw2.set("")
+        self.app.set_status("Password updated."); messagebox.showinfo("Change password","Password updated.")
 
     def export_all(self):# export chat + grades to a folder
+        from tkinter import filedialog
         folder = filedialog.askdirectory()
         if not folder: return
         try:
-            chat_path=os.path.join(folder,"frost_chat.txt")
-            with open(chat_path,"w",encoding="utf-8") as f: f.write(self.app.chat_history)
-            grades_path=os.path.join(folder,"grades.csv")
-            with open(grades_path,"w",newline="",encoding="utf-8") as f:
-                w=csv.writer(f); w.writerow(["Title","Level","Credits","Grade"])
-                for g in self.app.grades: w.writerow([g["title"],g["level"],g["credits"],g["grade"]])
+            with METRICS.timer("export.all"):
+                chat_path=os.path.join(folder,"frost_chat.txt")
+                with open(chat_path,"w",encoding="utf-8") as f: f.write(self.app.full_chat())
+                write_grades_csv(os.path.join(folder,"grades.csv"), self.app.grades)
             self.app.set_status(f"Exported chat & grades → {os.path.basename(folder)}")
         except Exception as e:
             messagebox.showerror("Export failed", str(e))
 
+class Diagnostics(ttk.Frame):# hidden page (Ctrl+Shift+D): live hot-path timings
+    REFRESH_MS = 1000
+    def __init__(self, parent, app:MainApp):
+        super().__init__(parent, padding=12); self.app=app
+        ttk.Label(self,text="Diagnostics",style="Header.TLabel").grid(row=0,column=0,sticky="w")
+        ttk.Label(self,text="Latencies in ms over the most recent samples • store.bytes in KB",style="Sub.TLabel")\
+            .grid(row=1,column=0,sticky="w",pady=(0,6))
+        cols=("Metric","Count","p50","p95","Max","Mean")
+        self.tree=ttk.Treeview(self,columns=cols,show="headings",height=14)
+        for col,w in zip(cols,(220,80,90,90,90,90)):
+            self.tree.heading(col,text=col); self.tree.column(col,width=w,anchor="w" if col=="Metric" else "e")
+        self.tree.grid(row=2,column=0,sticky="nsew"); self.rowconfigure(2,weight=1); self.columnconfigure(0,weight=1)
+        ttk.Label(self,text=f"Recent UI stalls (> {STALL_MS:.0f} ms)",style="Sub.TLabel").grid(row=3,column=0,sticky="w",pady=(8,2))
+        self.stalls=tk.Listbox(self,height=5,borderwidth=0); self.stalls.grid(row=4,column=0,sticky="ew")
+        btns=ttk.Frame(self); btns.grid(row=5,column=0,sticky="w",pady=6)
+        ttk.Button(btns,text="Dump JSON…",command=self.dump).pack(side="left")
+        ttk.Button(btns,text="Reset",command=lambda: (METRICS.reset(), self.refresh())).pack(side="left",padx=6)
+        self._tick=None
+        self.refresh()
+    def refresh(self):# re-render, and keep ticking only while this page is showing
+        self._tick=None
+        snap=METRICS.snapshot()
+        self.tree.delete(*self.tree.get_children())
+        for name,st in snap["stats"].items():
+            k = 1/1024 if name=="store.bytes" else 1000
+            self.tree.insert("","end",values=(name,st["count"],*(f"{st[f]*k:.2f}" for f in ("p50","p95","max","mean"))))
+        for name,n in snap["counters"].items(): self.tree.insert("","end",values=(name,n,"","","",""))
+        self.stalls.delete(0,"end")
+        for r in reversed(self.app.watchdog.stalls):
+            self.stalls.insert("end",f"{r['time']}  {r['ms']:.0f} ms  {r['callback']}  →  {r['where']}")
+        if self.app.current=="Diagnostics": self._tick=self.after(self.REFRESH_MS, self.refresh)
+    def tkraise(self, *a):
+        super().tkraise(*a)
+        if self._tick is None: self._tick=self.after(self.REFRESH_MS, self.refresh)
+    def destroy(self):
+        if self._tick: self.after_cancel(self._tick)
+        super().destroy()
+    def dump(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json")], initialfile="gradus_perf.json")
+        if not path: return
+        try:
+            METRICS.dump_json(path, stalls=list(self.app.watchdog.stalls))
+            self.app.set_status(f"Saved diagnostics → {os.path.basename(path)}")
+        except Exception as e: messagebox.showerror("Save failed", str(e))
+
+PAGES = {cls.__name__: cls for cls in (Home, Check, Careers, FROST, Grades, Cohort, Profile, Diagnostics)}
+
 # ---------------- orchestration ----------------
 def run_app(store:UserStore):
-    # 1) login root
-    login = LoginApp(store)
-    center_window(login)
-    login.mainloop()
-    if not login.result_username:
-        sys.exit(0)
-    # 2) main root
-    app = MainApp(login.result_username, store)
-    app.mainloop()
+    # one root for the whole run: login view first, main view after a successful login
+    session = Session(store)
+    session.show_login()
+    STARTUP.mark("login_window")
+    session.mainloop()
 # ---------------- Run ----------------
+if __name__=="__main__" and "--calibrate-kdf" in sys.argv:
+    # python version4_Peter_Zhang.py --calibrate-kdf [target_ms]  -> value for GRADUS_KDF_ITERATIONS
+    i = sys.argv.index("--calibrate-kdf"); args = sys.argv[i+1:i+2]
+    target = float(args[0]) if args and args[0].replace(".","",1).isdigit() else 250.0
+    it = calibrate_kdf(target)
+    t = time.perf_counter(); _hash_pw("benchmark", secrets.token_hex(16), it); ms = (time.perf_counter()-t)*1000
+    print(f"GRADUS_KDF_ITERATIONS={it}  # {ms:.0f} ms per hash (target {target:.0f} ms)")
+    sys.exit(0)
 if __name__=="__main__":
-    store = UserStore()
+    try: store = UserStore()
+    except StoreFormatError as e: sys.exit(f"Gradus: {USERS_FILE}: {e}")
+    STARTUP.mark("store_load")
     run_app(store)